@@ -1,9 +1,32 @@
-import plab.lasers as lasers
-import plab.power_meters as power_meters
-import plab.config as config
-import plab.smu as smu
-import plab.measurement as measurement
+"""plab: photonics lab drivers.
 
+Subpackages are imported on first access (`plab.smu`, `plab.measurement` ...),
+so `import plab` stays fast and works without the instrument libraries.
+"""
+
+from plab.lazy import lazy_dir, lazy_getattr
+
+_SUBMODULES = {
+    name: None
+    for name in [
+        "lasers",
+        "power_meters",
+        "config",
+        "smu",
+        "measurement",
+        "catalog",
+        "collection",
+        "configs",
+        "grid",
+        "layout",
+        "profiler",
+        "share",
+        "storage",
+        "writer",
+    ]
+}
 
 __all__ = ["lasers", "power_meters", "config", "smu", "measurement"]
 __version__ = "0.0.1"
+__getattr__ = lazy_getattr(__name__, _SUBMODULES)
+__dir__ = lazy_dir(globals(), _SUBMODULES)
@@ -0,0 +1,315 @@
+"""SQLite index of the stored measurements in a labdata directory.
+
+Measurement.write adds every measurement to `catalog.sqlite` next to the data,
+so finding measurements does not need to glob the directory or parse metadata.
+
+- measurements: one row per stored file (name, function, timestamp, path, size)
+- params: flattened settings and config keys (`settings.vmax`, `config.sample`)
+
+Rebuild the index of an existing directory with `python -m plab.catalog rebuild`
+"""
+
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+import contextlib
+import datetime
+import json
+import pathlib
+import sqlite3
+
+import pandas as pd
+from omegaconf import OmegaConf
+from plab.config import CONFIG, PATH, logger
+from plab.configs import resolve
+from plab.storage import (
+    BACKENDS,
+    COMPACTED,
+    COMPACTED_SUFFIX,
+    MEMBER_SEPARATOR,
+    Metadata,
+    backend_for,
+)
+
+CATALOG_FILENAME = "catalog.sqlite"
+TimeType = Union[float, str, datetime.datetime]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS measurements (
+    path TEXT PRIMARY KEY,
+    name TEXT,
+    function TEXT,
+    timestamp TEXT,
+    t0 REAL,
+    t1 REAL,
+    size INTEGER,
+    backend TEXT,
+    memo_key TEXT,
+    metadata TEXT
+);
+CREATE TABLE IF NOT EXISTS params (
+    path TEXT REFERENCES measurements(path) ON DELETE CASCADE,
+    key TEXT,
+    value,
+    PRIMARY KEY (path, key)
+);
+CREATE INDEX IF NOT EXISTS measurements_name ON measurements(name);
+CREATE INDEX IF NOT EXISTS measurements_function_t0 ON measurements(function, t0);
+CREATE INDEX IF NOT EXISTS params_key_value ON params(key, value);
+"""
+
+
+def function_name(metadata: Metadata) -> str:
+    """Returns the measurement function name.
+
+    Older metadata has no `function` key, so it is recovered from the name
+    `{function}_{key}={value}_...`
+    """
+    if metadata.get("function"):
+        return metadata.function
+    name = metadata.name
+    starts = [name.find(f"_{key}=") for key in metadata.get("settings", {}) or {}]
+    starts = [start for start in starts if start > 0]
+    return name[: min(starts)] if starts else name.rstrip("_")
+
+
+def flatten(d: Any, prefix: str = "") -> Dict[str, Any]:
+    """Flattens nested dicts into dotted keys. Lists are stored as JSON."""
+    if not isinstance(d, dict):
+        if isinstance(d, (list, tuple)):
+            d = json.dumps(d, default=str)
+        elif not isinstance(d, (int, float, str, type(None))):
+            d = str(d)
+        return {prefix: d}
+    flat = {}
+    for key, value in d.items():
+        flat.update(flatten(value, f"{prefix}.{key}" if prefix else str(key)))
+    return flat
+
+
+def _epoch(t: TimeType) -> float:
+    if isinstance(t, str):
+        t = datetime.datetime.fromisoformat(t)
+    if isinstance(t, datetime.datetime):
+        return t.timestamp()
+    return float(t)
+
+
+class Catalog:
+    """SQLite index of the measurements stored in dirpath.
+
+    Args:
+        dirpath: labdata directory, the index lives in dirpath/catalog.sqlite
+    """
+
+    def __init__(self, dirpath: Optional[pathlib.Path] = None) -> None:
+        self.dirpath = pathlib.Path(dirpath or PATH.labdata)
+        self.path = self.dirpath / CATALOG_FILENAME
+
+    @contextlib.contextmanager
+    def connect(self) -> Iterator[sqlite3.Connection]:
+        self.dirpath.mkdir(parents=True, exist_ok=True)
+        connection = sqlite3.connect(self.path, timeout=30)
+        try:
+            connection.execute("PRAGMA foreign_keys = ON")
+            connection.executescript(_SCHEMA)
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    def _relative(self, path: pathlib.Path) -> str:
+        path = pathlib.Path(path).absolute()
+        try:
+            return str(path.relative_to(self.dirpath.absolute()))
+        except ValueError:
+            return str(path)
+
+    def _add(
+        self, connection: sqlite3.Connection, path: pathlib.Path, metadata: Metadata
+    ) -> None:
+        backend = backend_for(path)
+        size = sum(p.stat().st_size for p in backend.paths(path) if p.exists())
+        container = OmegaConf.to_container(metadata)
+        key = self._relative(path)
+        connection.execute("DELETE FROM params WHERE path = ?", (key,))
+        connection.execute(
+            "INSERT OR REPLACE INTO measurements VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                key,
+                metadata.name,
+                function_name(metadata),
+                metadata.time.get("timestamp"),
+                metadata.time.get("t0"),
+                metadata.time.get("t1"),
+                size,
+                backend.name,
+                metadata.get("memo_key"),
+                json.dumps(container, default=str),
+            ),
+        )
+        params = flatten(
+            dict(
+                settings=container.get("settings") or {},
+                config=container.get("config") or {},
+            )
+        )
+        connection.executemany(
+            "INSERT INTO params VALUES (?, ?, ?)",
+            [(key, k, v) for k, v in params.items()],
+        )
+
+    def add(self, path: pathlib.Path, metadata: Metadata) -> None:
+        """Adds (or updates) a stored measurement."""
+        with self.connect() as connection:
+            self._add(connection, path, metadata)
+
+    def remove(self, path: pathlib.Path) -> None:
+        with self.connect() as connection:
+            connection.execute(
+                "DELETE FROM measurements WHERE path = ?", (self._relative(path),)
+            )
+
+    def rebuild(self) -> int:
+        """Indexes all stored measurements in dirpath and returns how many."""
+        suffixes = {backend.suffix for backend in BACKENDS.values()}
+        paths = []
+        for path in sorted(self.dirpath.rglob("*")):
+            if path.name.endswith(COMPACTED_SUFFIX):
+                members = COMPACTED.members(path)
+                paths += [pathlib.Path(f"{path}{MEMBER_SEPARATOR}{m}") for m in members]
+            elif path.suffix in suffixes:
+                paths.append(path)
+        n = 0
+        with self.connect() as connection:
+            connection.execute("DELETE FROM measurements")
+            connection.execute("DELETE FROM params")
+            for path in paths:
+                try:
+                    metadata = resolve(backend_for(path).read_metadata(path), path)
+                except Exception as error:
+                    logger.warning(f"Skipping {path}: {error}")
+                    continue
+                self._add(connection, path, metadata)
+                n += 1
+        logger.info(f"Indexed {n} measurements in {self.path}")
+        return n
+
+    def locate(self, filename: str) -> Optional[pathlib.Path]:
+        """Returns the path of a stored measurement by filename (no suffix)."""
+        with self.connect() as connection:
+            rows = connection.execute(
+                "SELECT path FROM measurements WHERE path LIKE ? OR path LIKE ?",
+                (f"%{filename}.%", f"%{MEMBER_SEPARATOR}{filename}"),
+            ).fetchall()
+        for (path,) in rows:
+            path = self.dirpath / path
+            name = path.name.rsplit(MEMBER_SEPARATOR, 1)[-1]
+            if filename in (name, pathlib.Path(name).stem):
+                return path
+        return None
+
+    def _select(
+        self,
+        name: Optional[str] = None,
+        function: Optional[str] = None,
+        since: Optional[TimeType] = None,
+        until: Optional[TimeType] = None,
+        memo_key: Optional[str] = None,
+        params: Optional[Dict[str, Any]] = None,
+    ) -> List[Tuple[str, str]]:
+        where = []
+        values: List[Any] = []
+        for column, value in [
+            ("name", name),
+            ("function", function),
+            ("memo_key", memo_key),
+        ]:
+            if value is not None:
+                where.append(f"{column} = ?")
+                values.append(value)
+        if since is not None:
+            where.append("t0 >= ?")
+            values.append(_epoch(since))
+        if until is not None:
+            where.append("t0 <= ?")
+            values.append(_epoch(until))
+        for key, value in (params or {}).items():
+            keys = [key] if "." in key else [f"settings.{key}", f"config.{key}"]
+            where.append(
+                "path IN (SELECT path FROM params WHERE key IN "
+                f"({', '.join('?' * len(keys))}) AND value = ?)"
+            )
+            values.extend(keys + [value])
+
+        sql = "SELECT path, metadata FROM measurements"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY t0"
+        with self.connect() as connection:
+            return connection.execute(sql, values).fetchall()
+
+    def query(
+        self,
+        name: Optional[str] = None,
+        function: Optional[str] = None,
+        since: Optional[TimeType] = None,
+        until: Optional[TimeType] = None,
+        memo_key: Optional[str] = None,
+        params: Optional[Dict[str, Any]] = None,
+        **kwargs: Any,
+    ) -> List["LazyMeasurement"]:  # noqa: F821
+        """Returns lazy handles to the matching measurements, oldest first.
+
+        Args:
+            name: measurement name
+            function: measurement function name
+            since: t0 lower bound (epoch, datetime or ISO string)
+            until: t0 upper bound (epoch, datetime or ISO string)
+            memo_key: settings and CONFIG hash of memoized measurements
+            params: flattened keys (`config.qontrol.COM3.device_id`) to match
+            **kwargs: settings or config keys to match (`sample="chip3"`)
+        """
+        from plab.measurement import LazyMeasurement
+
+        params = dict(params or {}, **kwargs)
+        rows = self._select(name, function, since, until, memo_key, params)
+        return [
+            LazyMeasurement(
+                metadata=OmegaConf.create(json.loads(metadata)),
+                path=self.dirpath / path,
+            )
+            for path, metadata in rows
+        ]
+
+    def query_df(self, **kwargs: Any) -> pd.DataFrame:
+        """Returns the matching measurements data concatenated by name.
+
+        Takes the same arguments as `Catalog.query`.
+        """
+        measurements = self.query(**kwargs)
+        if not measurements:
+            return pd.DataFrame()
+        return pd.concat(
+            [m.data for m in measurements],
+            keys=[m.metadata.name for m in measurements],
+            names=["name"],
+        )
+
+
+def catalog(dirpath: Optional[pathlib.Path] = None) -> Optional[Catalog]:
+    """Returns the catalog for dirpath, None if disabled with CONFIG.catalog."""
+    if not CONFIG.get("catalog", True):
+        return None
+    return Catalog(dirpath)
+
+
+__all__ = ["Catalog", "catalog", "flatten", "function_name"]
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("command", choices=["rebuild"])
+    parser.add_argument("dirpath", nargs="?", default=str(PATH.labdata))
+    args = parser.parse_args()
+    Catalog(pathlib.Path(args.dirpath)).rebuild()
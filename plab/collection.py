@@ -0,0 +1,339 @@
+"""Lazy collection of stored measurements.
+
+```
+from plab.collection import Collection
+
+c = Collection.from_query(function="sweep_voltage", sample="wafer3")
+c = c.where(vmax=2.0).select("i_0", "i_1").filter([("v", ">", 0.5)])
+c.max()                            # per channel max current, one file at a time
+c.apply(lambda df: df.abs().max())   # one row per measurement
+df = c.to_pandas()                 # everything, keyed by measurement name
+```
+
+Nothing is read until a result is asked for. Then each measurement is one
+chunk, read in a thread pool (at most 2 * max_workers in memory):
+
+- where: settings filter, on the metadata headers only
+- select: columns projection, pushed down to parquet, feather and arrows
+- filter: rows filter as (column, op, value) tuples, all of them must hold.
+  Pushed down to parquet (row group statistics) and feather and arrows
+  (arrow compute), applied after reading for csv and hdf5.
+"""
+
+from typing import (
+    Any,
+    Callable,
+    Deque,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
+import collections
+import concurrent.futures
+import os
+import pathlib
+
+import pandas as pd
+from plab.config import PATH
+from plab.catalog import Catalog
+from plab.layout import find, glob_all
+from plab.storage import (
+    BACKENDS,
+    COMPACTED_SUFFIX,
+    backend_for,
+    csv_index,
+    read_headers,
+)
+
+Filter = Tuple[str, str, Any]
+AGGREGATIONS = ("min", "max", "sum", "count", "mean")
+
+_OPS: Dict[str, Callable[[Any, Any], Any]] = {
+    "==": lambda a, b: a == b,
+    "=": lambda a, b: a == b,
+    "!=": lambda a, b: a != b,
+    "<": lambda a, b: a < b,
+    "<=": lambda a, b: a <= b,
+    ">": lambda a, b: a > b,
+    ">=": lambda a, b: a >= b,
+    "in": lambda a, b: a.isin(b),
+    "not in": lambda a, b: ~a.isin(b),
+}
+
+
+def _values(data: pd.DataFrame, column: str) -> pd.Series:
+    if column in data.columns:
+        return data[column]
+    return pd.Series(data.index.get_level_values(column), index=data.index)
+
+
+def _filter(data: pd.DataFrame, filters: Sequence[Filter]) -> pd.DataFrame:
+    for column, op, value in filters:
+        data = data[_OPS[op](_values(data, column), value).values]
+    return data
+
+
+def read(
+    path: pathlib.Path,
+    columns: Optional[Sequence[str]] = None,
+    filters: Optional[Sequence[Filter]] = None,
+) -> pd.DataFrame:
+    """Reads some columns and rows of a stored measurement.
+
+    Args:
+        path: stored measurement
+        columns: columns to read (the index is always read), None reads all
+        filters: (column, op, value) rows filter
+    """
+    backend = backend_for(path)
+    columns = list(columns) if columns is not None else None
+    filters = [tuple(f) for f in filters or []]
+    for _, op, _ in filters:
+        if op not in _OPS:
+            raise ValueError(f"Unknown filter op {op!r}, try {list(_OPS)}")
+
+    if backend.name == "parquet":
+        import pyarrow.parquet as pq
+
+        table = pq.read_table(
+            path, columns=columns, filters=filters or None, use_pandas_metadata=True
+        )
+        return table.to_pandas()
+
+    if backend.name in ("feather", "arrows"):
+        import pyarrow.parquet as pq
+
+        view = backend.open(path)
+        table = view.table
+        if filters:
+            table = table.filter(pq.filters_to_expression(filters))
+        if columns is not None:
+            table = table.select(columns + view.index_columns)
+        return table.to_pandas()
+
+    data, _ = backend.read(path)
+    if backend.name == "csv":
+        data = csv_index(data)
+    data = _filter(data, filters)
+    return data if columns is None else data[columns]
+
+
+def _imap(
+    func: Callable[[Any], Any], items: Sequence[Any], max_workers: Optional[int]
+) -> Iterator[Any]:
+    """Yields func(item) in order, keeping at most 2 * max_workers in flight."""
+    queued = 2 * (max_workers or min(32, (os.cpu_count() or 1) + 4))
+    with concurrent.futures.ThreadPoolExecutor(max_workers) as pool:
+        futures: Deque[concurrent.futures.Future] = collections.deque()
+        for item in items:
+            futures.append(pool.submit(func, item))
+            if len(futures) >= queued:
+                yield futures.popleft().result()
+        while futures:
+            yield futures.popleft().result()
+
+
+class Collection:
+    """Lazy view of many stored measurements.
+
+    Args:
+        paths: stored measurement paths
+        columns: projection, None reads all columns
+        filters: (column, op, value) rows filter
+        max_workers: I/O threads
+    """
+
+    def __init__(
+        self,
+        paths: Iterable[pathlib.Path],
+        columns: Optional[Sequence[str]] = None,
+        filters: Optional[Sequence[Filter]] = None,
+        max_workers: Optional[int] = None,
+    ) -> None:
+        self.paths = [pathlib.Path(path) for path in paths]
+        self.columns = list(columns) if columns is not None else None
+        self.filters = [tuple(f) for f in filters or []]
+        self.max_workers = max_workers
+        self._headers: Optional[List[Dict[str, Any]]] = None
+
+    @classmethod
+    def from_glob(
+        cls, pattern: str, dirpath: Optional[pathlib.Path] = None, **kwargs: Any
+    ) -> "Collection":
+        """Measurements matching a filename pattern (`*sweep_voltage*`).
+
+        Metadata sidecars and compacted files matching the pattern are left out.
+        """
+        suffixes = {backend.suffix for backend in BACKENDS.values()}
+        paths = [
+            path
+            for path in glob_all(dirpath or PATH.labdata, pattern)
+            if path.suffix in suffixes and not path.name.endswith(COMPACTED_SUFFIX)
+        ]
+        return cls(sorted(paths, key=lambda path: path.name), **kwargs)
+
+    @classmethod
+    def from_query(
+        cls,
+        dirpath: Optional[pathlib.Path] = None,
+        max_workers: Optional[int] = None,
+        **query: Any,
+    ) -> "Collection":
+        """Measurements matching a catalog query (see `Catalog.query`)."""
+        measurements = Catalog(dirpath).query(**query)
+        return cls([m.path for m in measurements], max_workers=max_workers)
+
+    @classmethod
+    def from_names(
+        cls,
+        filenames: Iterable[str],
+        dirpath: Optional[pathlib.Path] = None,
+        **kwargs: Any,
+    ) -> "Collection":
+        """Measurements by filename (without suffix)."""
+        dirpath = dirpath or PATH.labdata
+        return cls([find(name, dirpath)[1] for name in filenames], **kwargs)
+
+    def _copy(self, **kwargs: Any) -> "Collection":
+        collection = Collection(
+            kwargs.get("paths", self.paths),
+            columns=kwargs.get("columns", self.columns),
+            filters=kwargs.get("filters", self.filters),
+            max_workers=self.max_workers,
+        )
+        if "paths" not in kwargs:
+            collection._headers = self._headers
+        return collection
+
+    def __len__(self) -> int:
+        return len(self.paths)
+
+    def __repr__(self) -> str:
+        return (
+            f"Collection({len(self)} measurements, columns={self.columns}, "
+            f"filters={self.filters})"
+        )
+
+    @property
+    def headers(self) -> List[Dict[str, Any]]:
+        """Metadata headers (name, function, time, settings), read once."""
+        if self._headers is None:
+            self._headers = read_headers(self.paths, self.max_workers)
+        return self._headers
+
+    @property
+    def names(self) -> List[str]:
+        return [header["name"] for header in self.headers]
+
+    def where(self, **settings: Any) -> "Collection":
+        """Keeps the measurements whose settings match, reading only metadata."""
+        headers = [
+            header
+            for header in self.headers
+            if all(
+                (header["settings"] or {}).get(key) == value
+                for key, value in settings.items()
+            )
+        ]
+        collection = self._copy(paths=[header["path"] for header in headers])
+        collection._headers = headers
+        return collection
+
+    def select(self, *columns: str) -> "Collection":
+        """Reads only some columns (and the index)."""
+        return self._copy(columns=list(columns))
+
+    def filter(self, filters: Sequence[Filter]) -> "Collection":
+        """Reads only the rows where all (column, op, value) filters hold."""
+        return self._copy(filters=self.filters + [tuple(f) for f in filters])
+
+    def _read(self, path: pathlib.Path) -> pd.DataFrame:
+        return read(path, self.columns, self.filters)
+
+    def chunks(self) -> Iterator[Tuple[str, pd.DataFrame]]:
+        """Yields (name, data) per measurement, read ahead in a thread pool.
+
+        Measurements with unreadable metadata are skipped.
+        """
+        headers = self.headers
+        paths = [header["path"] for header in headers]
+        for header, data in zip(headers, _imap(self._read, paths, self.max_workers)):
+            yield header["name"], data
+
+    def __iter__(self) -> Iterator[Tuple[str, pd.DataFrame]]:
+        return self.chunks()
+
+    def map(self, func: Callable[[pd.DataFrame], Any]) -> Iterator[Any]:
+        """Yields func(data) per measurement."""
+        for _, data in self.chunks():
+            yield func(data)
+
+    def apply(self, func: Callable[[pd.DataFrame], Any]) -> pd.DataFrame:
+        """Returns func(data) per measurement, one row per measurement name.
+
+        Args:
+            func: returns a Series (one column per entry) or a scalar per chunk
+        """
+        names, rows = [], []
+        for name, data in self.chunks():
+            names.append(name)
+            rows.append(func(data))
+        return pd.DataFrame(
+            [
+                row if isinstance(row, pd.Series) else pd.Series(dict(value=row))
+                for row in rows
+            ],
+            index=pd.Index(names, name="name"),
+        )
+
+    def agg(self, how: str) -> pd.Series:
+        """Returns one column aggregation over all measurements, chunk by chunk.
+
+        Args:
+            how: min, max, sum, count or mean
+        """
+        if how not in AGGREGATIONS:
+            raise ValueError(f"Unknown aggregation {how!r}, try {AGGREGATIONS}")
+        parts = ("sum", "count") if how == "mean" else (how,)
+        partials: Dict[str, List[pd.Series]] = {part: [] for part in parts}
+        for _, data in self.chunks():
+            numeric = data.select_dtypes("number")
+            for part in parts:
+                partials[part].append(getattr(numeric, part)())
+        frames = {part: pd.DataFrame(series) for part, series in partials.items()}
+        if how == "mean":
+            return frames["sum"].sum() / frames["count"].sum()
+        combine = "sum" if how == "count" else how
+        return getattr(frames[how], combine)()
+
+    def min(self) -> pd.Series:
+        return self.agg("min")
+
+    def max(self) -> pd.Series:
+        return self.agg("max")
+
+    def sum(self) -> pd.Series:
+        return self.agg("sum")
+
+    def count(self) -> pd.Series:
+        return self.agg("count")
+
+    def mean(self) -> pd.Series:
+        return self.agg("mean")
+
+    def to_pandas(self) -> pd.DataFrame:
+        """Reads everything, concatenated with the measurement name as index level."""
+        names, frames = [], []
+        for name, data in self.chunks():
+            names.append(name)
+            frames.append(data)
+        if not frames:
+            return pd.DataFrame()
+        return pd.concat(frames, keys=names, names=["name"])
+
+
+__all__ = ["Collection", "read"]
@@ -1,5 +1,4 @@
-"""Store CONFIG
-"""
+"""Store CONFIG"""
 
 from typing import Any, Optional, Union
 import os
@@ -52,8 +51,10 @@ CONFIG = read_config()
 
 
 def ls(glob: str = "*.csv") -> None:
-    """List all measured files"""
-    for csv in PATH.labdata.glob(glob):
+    """List all measured files, flat and sharded"""
+    from plab.layout import glob_all
+
+    for csv in glob_all(PATH.labdata, glob):
         print(csv.stem)
 
 
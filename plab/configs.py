@@ -0,0 +1,143 @@
+"""Content addressed store of CONFIG snapshots.
+
+Instead of embedding a copy of CONFIG in every stored measurement, the snapshot
+is written once to `configs/{hash}.yml` next to the data and the metadata only
+keeps its `config_hash`. Reading a measurement resolves the hash back into
+`metadata.config`, parsing each snapshot once (`CONFIG_CACHE_SIZE` most recent).
+
+Disable with `CONFIG.dedupe_config = False` to embed the full CONFIG again.
+Measurements with an embedded config are read as before.
+"""
+
+from typing import Any, Dict, Optional
+import collections
+import hashlib
+import json
+import os
+import pathlib
+import threading
+
+from omegaconf import OmegaConf
+from plab.config import CONFIG, logger
+from plab.storage import Metadata
+
+CONFIGS_DIRNAME = "configs"
+HASH_KEY = "config_hash"
+HASH_LENGTH = 16
+CONFIG_CACHE_SIZE = 256
+
+_parsed: Dict[str, Metadata] = collections.OrderedDict()
+_lock = threading.Lock()
+
+
+def config_hash(config: Metadata) -> str:
+    """Returns the content hash of a config."""
+    container = OmegaConf.to_container(config, resolve=True)
+    text = json.dumps(container, sort_keys=True, default=str)
+    return hashlib.sha256(text.encode()).hexdigest()[:HASH_LENGTH]
+
+
+def store_dirpath(path: pathlib.Path) -> pathlib.Path:
+    """Returns the closest directory above path with a config store.
+
+    Defaults to the directory of path.
+    """
+    path = pathlib.Path(path).absolute()
+    for parent in path.parents:
+        if (parent / CONFIGS_DIRNAME).is_dir():
+            return parent
+    return path.parent
+
+
+class ConfigStore:
+    """Config snapshots stored once per content hash in dirpath/configs.
+
+    Args:
+        dirpath: labdata directory
+    """
+
+    def __init__(self, dirpath: pathlib.Path) -> None:
+        self.dirpath = pathlib.Path(dirpath) / CONFIGS_DIRNAME
+
+    @classmethod
+    def for_path(cls, path: pathlib.Path) -> "ConfigStore":
+        """Returns the closest store above a stored measurement path."""
+        return cls(store_dirpath(path))
+
+    def path(self, key: str) -> pathlib.Path:
+        return self.dirpath / f"{key}.yml"
+
+    def put(self, config: Metadata) -> str:
+        """Stores a config (if new) and returns its hash."""
+        key = config_hash(config)
+        path = self.path(key)
+        if not path.exists():
+            self.dirpath.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            tmp.write_text(OmegaConf.to_yaml(config))
+            os.replace(tmp, path)
+        return key
+
+    def get(self, key: str) -> Metadata:
+        """Returns the config with hash key, parsed once."""
+        with _lock:
+            if key in _parsed:
+                _parsed.move_to_end(key)
+                return _parsed[key]
+        config = OmegaConf.load(self.path(key))
+        with _lock:
+            _parsed[key] = config
+            while len(_parsed) > CONFIG_CACHE_SIZE:
+                _parsed.popitem(last=False)
+        return config
+
+
+def dedupe(metadata: Metadata, dirpath: pathlib.Path) -> Metadata:
+    """Returns metadata to store, with config replaced by its hash.
+
+    Args:
+        metadata: measurement metadata
+        dirpath: labdata directory of the config store
+    """
+    if not CONFIG.get("dedupe_config", True) or metadata.get("config") is None:
+        return metadata
+    key = ConfigStore(dirpath).put(metadata.config)
+    keys = [k for k in metadata if k != "config"]
+    stored = OmegaConf.masked_copy(metadata, keys)
+    stored[HASH_KEY] = key
+    return stored
+
+
+def resolve(metadata: Metadata, path: pathlib.Path) -> Metadata:
+    """Returns read metadata with its config_hash replaced by the config.
+
+    Args:
+        metadata: metadata read from path
+        path: stored measurement path
+    """
+    key: Optional[Any] = metadata.get(HASH_KEY)
+    if key is None or metadata.get("config") is not None:
+        return metadata
+    store = ConfigStore.for_path(path)
+    try:
+        metadata.config = store.get(key)
+    except FileNotFoundError:
+        logger.warning(f"config {key} of {path} not found in {store.dirpath}")
+        return metadata
+    del metadata[HASH_KEY]
+    return metadata
+
+
+def clear_cache() -> None:
+    with _lock:
+        _parsed.clear()
+
+
+__all__ = [
+    "ConfigStore",
+    "clear_cache",
+    "config_hash",
+    "dedupe",
+    "resolve",
+    "store_dirpath",
+]
@@ -0,0 +1,248 @@
+"""Run a @measurement over a parameter space.
+
+```
+from plab.grid import grid, run_grid
+
+m = run_grid(sweep_voltage, grid(vmax=[1, 2, 3], channels=[(0,), (1,)]))
+```
+
+Each point is a regular measurement call. Its data, with the point name and
+settings as extra columns, is streamed into one dataset under PATH.labdata, so
+an interrupted grid can resume by skipping the point names already stored.
+The points are written to the metadata every METADATA_EVERY_POINTS points and
+at the end.
+
+executor:
+
+- serial: one point at a time (single instrument)
+- thread: points in a thread pool (independent instruments)
+- process: points in a process pool (pure compute or simulated functions,
+  the measurement function needs to be importable from its module)
+"""
+
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Union
+import concurrent.futures
+import itertools
+import os
+import pathlib
+import random
+import time
+
+import pandas as pd
+from omegaconf import OmegaConf
+from plab.config import CONFIG, PATH, logger
+from plab.configs import dedupe
+from plab.measurement import (
+    CACHE,
+    LazyMeasurement,
+    Measurement,
+    measurement_name,
+)
+from plab.storage import get_stream_backend
+
+Point = Dict[str, Any]
+EXECUTORS = ("serial", "thread", "process")
+METADATA_EVERY_POINTS = 50
+
+
+def grid(**axes: Iterable[Any]) -> List[Point]:
+    """Returns the cartesian product of the axes values.
+
+    Args:
+        axes: parameter name to values
+    """
+    names = list(axes)
+    return [dict(zip(names, values)) for values in itertools.product(*axes.values())]
+
+
+def random_points(n: int, seed: Optional[int] = None, **axes: Any) -> List[Point]:
+    """Returns n random points.
+
+    Args:
+        n: number of points
+        seed: random seed
+        axes: parameter name to a (min, max) tuple (uniform) or a list to pick from
+    """
+    rng = random.Random(seed)
+    return [
+        {
+            name: (
+                rng.uniform(*values)
+                if isinstance(values, tuple)
+                else rng.choice(values)
+            )
+            for name, values in axes.items()
+        }
+        for _ in range(n)
+    ]
+
+
+def _points(space: Union[Dict[str, Iterable[Any]], Iterable[Point]]) -> List[Point]:
+    if isinstance(space, dict):
+        return grid(**space)
+    return [dict(point) for point in space]
+
+
+def _column(value: Any) -> Any:
+    return value if isinstance(value, (int, float, str, bool)) else repr(value)
+
+
+def _column_types(points: List[Point], keys: List[str]) -> Dict[str, type]:
+    """Returns one type per setting column, common to all points.
+
+    bool, int or float when all the values are, float for ints mixed with
+    floats or missing values, str otherwise.
+    """
+    types = {}
+    for key in keys:
+        values = [_column(point.get(key)) for point in points]
+        kinds = {type(value) for value in values}
+        if kinds == {bool}:
+            types[key] = bool
+        elif kinds == {int}:
+            types[key] = int
+        elif kinds <= {int, float, type(None)}:
+            types[key] = float
+        else:
+            types[key] = str
+    return types
+
+
+def _cast(value: Any, kind: type) -> Any:
+    value = _column(value)
+    if value is None:
+        return float("nan") if kind is float else None
+    return kind(value)
+
+
+def _run(
+    func: Callable, points: List[Point], executor: str, max_workers: Optional[int]
+) -> Iterator[Measurement]:
+    """Yields measurements as they complete, keeping at most 2 * max_workers queued."""
+    if executor == "serial":
+        for point in points:
+            yield func(**point)
+        return
+
+    pool_class = (
+        concurrent.futures.ThreadPoolExecutor
+        if executor == "thread"
+        else concurrent.futures.ProcessPoolExecutor
+    )
+    queued = 2 * (max_workers or os.cpu_count() or 1)
+    with pool_class(max_workers=max_workers) as pool:
+        futures = set()
+        for point in points:
+            futures.add(pool.submit(func, **point))
+            if len(futures) >= queued:
+                done, futures = concurrent.futures.wait(
+                    futures, return_when=concurrent.futures.FIRST_COMPLETED
+                )
+                for future in done:
+                    yield future.result()
+        for future in concurrent.futures.as_completed(futures):
+            yield future.result()
+
+
+def run_grid(
+    func: Callable,
+    space: Union[Dict[str, Iterable[Any]], Iterable[Point]],
+    executor: str = "serial",
+    max_workers: Optional[int] = None,
+    filename: Optional[str] = None,
+    dirpath: Optional[pathlib.Path] = None,
+    backend: Optional[str] = None,
+    resume: bool = True,
+) -> LazyMeasurement:
+    """Runs a measurement over a parameter space into one dataset.
+
+    Args:
+        func: @measurement decorated function
+        space: dict of values per parameter (grid) or list of points (kwargs dicts)
+        executor: serial, thread or process
+        max_workers: pool size for thread and process executors
+        filename: dataset name, defaults to grid_{function}
+        dirpath: directory, defaults to PATH.labdata
+        backend: stream backend (arrows or csv), defaults to CONFIG.stream_storage
+        resume: skip points already stored in the dataset
+    """
+    if executor not in EXECUTORS:
+        raise ValueError(f"executor {executor!r} not in {EXECUTORS}")
+
+    dirpath = dirpath or PATH.labdata
+    store = get_stream_backend(backend)
+    name = filename or f"grid_{func.__name__}"
+    path = dirpath / f"{name}{store.suffix}"
+    points = _points(space)
+    keys = sorted({key for point in points for key in point})
+    types = _column_types(points, keys)
+
+    previous = None
+    done: Dict[str, Any] = {}
+    if resume and path.exists():
+        previous, previous_metadata = store.read(path)
+        if store.name == "csv":
+            previous = previous.set_index(previous.columns[0])
+        stored = set(previous["name"]) if "name" in previous else set()
+        done = {
+            point.name: point
+            for point in previous_metadata.get("points", [])
+            if point.name in stored
+        }
+        logger.info(f"Resuming {path}, {len(done)} points stored")
+
+    pending = [p for p in points if measurement_name(func.__name__, p) not in done]
+    t0 = time.time()
+    metadata = OmegaConf.create(
+        dict(
+            name=name,
+            function=func.__name__,
+            time=dict(
+                t0=t0, t1=t0, dt=0.0, timestamp=time.strftime("%y-%m-%d_%H:%M:%S")
+            ),
+            settings=dict(executor=executor, n=len(points), keys=keys),
+            config=CONFIG,
+            points=list(done.values()),
+        )
+    )
+    m = LazyMeasurement(metadata=metadata)
+
+    def chunks() -> Iterator[pd.DataFrame]:
+        # points missing from the metadata after a crash are measured again
+        if previous is not None and done:
+            yield previous[previous["name"].isin(list(done))]
+        try:
+            for n, result in enumerate(_run(func, pending, executor, max_workers)):
+                point = result.metadata
+                metadata.points.append(
+                    dict(name=point.name, time=point.time, settings=point.settings)
+                )
+                if (n + 1) % METADATA_EVERY_POINTS == 0:
+                    store.write_metadata(dedupe(metadata, dirpath), path)
+                data = result.data.copy()
+                data["name"] = point.name
+                for key in keys:
+                    data[key] = _cast(point.settings.get(key), types[key])
+                yield data
+        finally:
+            store.write_metadata(dedupe(metadata, dirpath), path)
+
+    logger.info(f"Running {len(pending)}/{len(points)} points of {name}")
+    m.write_stream(
+        chunks(),
+        filename=path.name,
+        dirpath=dirpath,
+        overwrite=True,
+        timestamp=False,
+        backend=store.name,
+        layout="flat",
+    )
+    t1 = time.time()
+    metadata.time.t1 = t1
+    metadata.time.dt = t1 - t0
+    m.write_metadata()
+    CACHE[name] = m
+    return m
+
+
+__all__ = ["grid", "random_points", "run_grid"]
@@ -1,5 +1,13 @@
-from plab.lasers.agilent_8164B_laser import LaserAgilent8164B
-from plab.lasers.newport_venturi import NewportVenturi
-from plab.lasers.sacher_lasertechnik import SacherLasertechnik
-from plab.lasers.sacher_maxon_epos2 import MaxonEpos2
-from plab.lasers.tsl550 import TSL550
\ No newline at end of file
+from plab.lazy import lazy_dir, lazy_getattr
+
+_DRIVERS = {
+    "LaserAgilent8164B": "agilent_8164B_laser",
+    "NewportVenturi": "newport_venturi",
+    "SacherLasertechnik": "sacher_lasertechnik",
+    "MaxonEpos2": "sacher_maxon_epos2",
+    "TSL550": "tsl550",
+}
+
+__all__ = list(_DRIVERS)
+__getattr__ = lazy_getattr(__name__, _DRIVERS)
+__dir__ = lazy_dir(globals(), _DRIVERS)
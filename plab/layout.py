@@ -0,0 +1,329 @@
+"""Date sharded labdata layout.
+
+With `CONFIG.layout = "sharded"` (opt-in) Measurement.write stores each
+measurement in `labdata/YYYY/MM/DD/{function}/`, so no directory grows past a
+day of one function. The default `CONFIG.layout = "flat"` writes into the
+given directory directly.
+Reading by filename (`Measurement.read`, `read_metadata`) looks in the flat
+directory, then the catalog, then the shards.
+
+- compact: merges the measurements of each past day and function into one
+  `{function}.compacted.parquet` with a member index (see storage.CompactedBackend)
+- migrate: moves an existing flat labdata into the sharded layout
+
+```
+python -m plab.layout migrate
+python -m plab.layout compact --days 7
+```
+"""
+
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import datetime
+import pathlib
+import time
+
+import pandas as pd
+from omegaconf import OmegaConf
+from plab.catalog import catalog, function_name
+from plab.config import CONFIG, PATH, logger
+from plab.configs import resolve
+from plab.storage import (
+    BACKENDS,
+    COMPACTED,
+    COMPACTED_SUFFIX,
+    MEMBER_SEPARATOR,
+    Backend,
+    Metadata,
+    backend_for,
+    get_backend,
+)
+from plab.storage import find as find_flat
+
+LAYOUTS = ("sharded", "flat")
+SHARD_GLOB = "[0-9][0-9][0-9][0-9]/[0-9][0-9]/[0-9][0-9]/*"
+TIMESTAMP_FORMAT = "%y-%m-%d_%H:%M:%S"
+
+
+def get_layout(name: Optional[str] = None) -> str:
+    """Returns the layout, defaults to CONFIG.layout or flat."""
+    name = name or CONFIG.get("layout", None) or "flat"
+    if name not in LAYOUTS:
+        raise ValueError(f"Unknown layout {name!r}, try {LAYOUTS}")
+    return name
+
+
+def shard(metadata: Metadata) -> pathlib.Path:
+    """Returns the relative shard directory YYYY/MM/DD/function of a measurement.
+
+    The day is the one of the timestamp prefixed to the filenames, or t0.
+    """
+    times = metadata.get("time") or {}
+    day = _day(times.get("timestamp") or "")
+    if day is None:
+        t0 = times.get("t0")
+        day = time.strftime("%Y/%m/%d", time.localtime(t0))
+    return pathlib.Path(day) / function_name(metadata)
+
+
+def measurement_dirpath(
+    dirpath: pathlib.Path, metadata: Metadata, layout: Optional[str] = None
+) -> pathlib.Path:
+    """Returns the directory where a measurement is written.
+
+    Args:
+        dirpath: labdata directory
+        metadata: measurement metadata
+        layout: sharded or flat, defaults to CONFIG.layout
+    """
+    if get_layout(layout) == "flat":
+        return dirpath
+    return dirpath / shard(metadata)
+
+
+def labdata_dirpath(path: pathlib.Path) -> pathlib.Path:
+    """Returns the labdata directory of a stored measurement in any layout."""
+    directory = pathlib.Path(path).parent
+    day = directory.parents[:3] if len(directory.parents) > 3 else ()
+    if [len(p.name) for p in day] == [2, 2, 4] and all(p.name.isdigit() for p in day):
+        return directory.parents[3]
+    return directory
+
+
+def shards(dirpath: pathlib.Path, day: Optional[str] = None) -> List[pathlib.Path]:
+    """Returns the shard directories, optionally only the ones of a day (YYYY/MM/DD)."""
+    pattern = f"{day}/*" if day else SHARD_GLOB
+    return sorted(p for p in pathlib.Path(dirpath).glob(pattern) if p.is_dir())
+
+
+def _day(filename: str) -> Optional[str]:
+    """Returns YYYY/MM/DD of a timestamp prefixed filename."""
+    try:
+        t = time.strptime(filename[: len("yy-mm-dd_HH:MM:SS")], TIMESTAMP_FORMAT)
+    except ValueError:
+        return None
+    return time.strftime("%Y/%m/%d", t)
+
+
+def _find_member(filename: str, dirpath: pathlib.Path) -> Optional[pathlib.Path]:
+    for path in dirpath.glob(f"*{COMPACTED_SUFFIX}"):
+        if filename in COMPACTED.members(path):
+            return pathlib.Path(f"{path}{MEMBER_SEPARATOR}{filename}")
+    return None
+
+
+def find(filename: str, dirpath: pathlib.Path) -> Tuple[Backend, pathlib.Path]:
+    """Returns backend and path of a stored measurement in any layout.
+
+    Args:
+        filename: name with or without the backend suffix
+        dirpath: labdata directory
+    """
+    try:
+        return find_flat(filename, dirpath)
+    except FileNotFoundError:
+        pass
+
+    index = catalog(dirpath)
+    if index is not None and index.path.exists():
+        path = index.locate(filename)
+        if path is not None:
+            return backend_for(path), path
+
+    for directory in shards(dirpath, _day(filename)):
+        try:
+            return find_flat(filename, directory)
+        except FileNotFoundError:
+            path = _find_member(filename, directory)
+            if path is not None:
+                return COMPACTED, path
+    raise FileNotFoundError(f"No stored measurement {filename!r} in {dirpath}")
+
+
+def glob_all(dirpath: pathlib.Path, pattern: str) -> Iterator[pathlib.Path]:
+    """Yields the files matching pattern in the flat directory and the shards."""
+    dirpath = pathlib.Path(dirpath)
+    yield from dirpath.glob(pattern)
+    yield from dirpath.glob(f"{SHARD_GLOB}/{pattern}")
+
+
+def _measurements(dirpath: pathlib.Path) -> List[pathlib.Path]:
+    suffixes = {backend.suffix for backend in BACKENDS.values()}
+    return sorted(
+        p
+        for p in dirpath.iterdir()
+        if p.suffix in suffixes and not p.name.endswith(COMPACTED_SUFFIX)
+    )
+
+
+def _move(path: pathlib.Path, directory: pathlib.Path) -> pathlib.Path:
+    directory.mkdir(parents=True, exist_ok=True)
+    for p in backend_for(path).paths(path):
+        target = directory / p.name
+        if target.exists():
+            raise FileExistsError(f"File {target} exists")
+        p.rename(target)
+    return directory / path.name
+
+
+def migrate(dirpath: Optional[pathlib.Path] = None, dry_run: bool = False) -> int:
+    """Moves the measurements of a flat labdata into shards and returns how many.
+
+    Grid datasets (metadata with points) are appended in place and stay flat.
+
+    Args:
+        dirpath: labdata directory, defaults to PATH.labdata
+        dry_run: only logs the moves
+    """
+    dirpath = pathlib.Path(dirpath or PATH.labdata)
+    index = catalog(dirpath)
+    n = 0
+    for path in _measurements(dirpath):
+        try:
+            metadata = backend_for(path).read_metadata(path)
+        except Exception as error:
+            logger.warning(f"Skipping {path}: {error}")
+            continue
+        if "points" in metadata:
+            continue
+        directory = dirpath / shard(metadata)
+        logger.info(f"Moving {path.name} to {directory}")
+        n += 1
+        if dry_run:
+            continue
+        target = _move(path, directory)
+        if index is not None:
+            index.remove(path)
+            index.add(target, resolve(metadata, target))
+    logger.info(f"Migrated {n} measurements in {dirpath}")
+    return n
+
+
+def _member(data: pd.DataFrame, metadata: Metadata, start: int) -> Dict[str, Any]:
+    return dict(
+        start=start,
+        stop=start + len(data),
+        columns=list(data.columns),
+        index_names=list(data.index.names),
+        metadata=OmegaConf.to_container(metadata),
+    )
+
+
+def _root(directory: pathlib.Path) -> pathlib.Path:
+    """Returns the labdata directory of a shard directory YYYY/MM/DD/function."""
+    return directory.parents[3]
+
+
+def compact_shard(directory: pathlib.Path, min_files: int = 2) -> int:
+    """Merges the measurements of a shard into one compacted file.
+
+    Members of an existing compacted file are kept. Columns missing in some
+    measurements are stored as NaN but read back only for the measurements
+    that have them.
+
+    Args:
+        directory: shard directory YYYY/MM/DD/function
+        min_files: minimum number of measurements to compact
+
+    Returns:
+        number of measurements compacted
+    """
+    paths = _measurements(directory)
+    if len(paths) < min_files:
+        return 0
+
+    target = directory / f"{directory.name}{COMPACTED_SUFFIX}"
+    frames: Dict[str, pd.DataFrame] = {}
+    members: Dict[str, Dict[str, Any]] = {}
+    start = 0
+    if target.exists():
+        for member in COMPACTED.members(target):
+            data, metadata = COMPACTED.read(
+                pathlib.Path(f"{target}{MEMBER_SEPARATOR}{member}")
+            )
+            frames[member] = data
+            members[member] = _member(data, metadata, start)
+            start += len(data)
+    for path in paths:
+        data, metadata = backend_for(path).read(path)
+        frames[path.stem] = data
+        members[path.stem] = _member(data, metadata, start)
+        start += len(data)
+
+    t0 = [m["metadata"]["time"]["t0"] for m in members.values()]
+    t1 = [m["metadata"]["time"]["t1"] for m in members.values()]
+    metadata = OmegaConf.create(
+        dict(
+            name=f"{directory.name}_compacted",
+            function=directory.name,
+            time=dict(t0=min(t0), t1=max(t1), dt=max(t1) - min(t0)),
+            members=members,
+        )
+    )
+    data = pd.concat(frames.values(), keys=list(frames), names=["member"])
+    tmp = target.with_name(f".{target.name}")
+    get_backend("parquet").write(data, metadata, tmp)
+    tmp.rename(target)
+
+    index = catalog(_root(directory))
+    for path in paths:
+        if index is not None:
+            index.remove(path)
+        for p in backend_for(path).paths(path):
+            p.unlink()
+    if index is not None:
+        for member, info in members.items():
+            path = pathlib.Path(f"{target}{MEMBER_SEPARATOR}{member}")
+            index.add(path, resolve(OmegaConf.create(info["metadata"]), target))
+    logger.info(f"Compacted {len(paths)} measurements into {target}")
+    return len(paths)
+
+
+def compact(
+    dirpath: Optional[pathlib.Path] = None, days: int = 1, min_files: int = 2
+) -> int:
+    """Compacts the shards older than days and returns the measurements compacted.
+
+    Recent shards are skipped as they may still be written to.
+
+    Args:
+        dirpath: labdata directory, defaults to PATH.labdata
+        days: minimum age in days of the shards to compact
+        min_files: minimum number of measurements per shard
+    """
+    dirpath = pathlib.Path(dirpath or PATH.labdata)
+    last = (datetime.date.today() - datetime.timedelta(days=days)).strftime("%Y/%m/%d")
+    n = 0
+    for directory in shards(dirpath):
+        day = directory.relative_to(dirpath).parent.as_posix()
+        if day <= last:
+            n += compact_shard(directory, min_files=min_files)
+    return n
+
+
+__all__ = [
+    "compact",
+    "compact_shard",
+    "find",
+    "get_layout",
+    "glob_all",
+    "labdata_dirpath",
+    "measurement_dirpath",
+    "migrate",
+    "shard",
+    "shards",
+]
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("command", choices=["migrate", "compact"])
+    parser.add_argument("dirpath", nargs="?", default=str(PATH.labdata))
+    parser.add_argument("--days", type=int, default=1, help="compact shards older")
+    parser.add_argument("--dry-run", action="store_true", help="migrate: only log")
+    args = parser.parse_args()
+    if args.command == "migrate":
+        migrate(pathlib.Path(args.dirpath), dry_run=args.dry_run)
+    else:
+        compact(pathlib.Path(args.dirpath), days=args.days)
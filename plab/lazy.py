@@ -0,0 +1,75 @@
+"""Lazy attribute loading for packages (PEP 562).
+
+Instrument drivers import their vendor libraries (visa, serial, usb, qontrol)
+at module level, so packages only import a driver module when one of its
+attributes is first accessed.
+"""
+
+from typing import Any, Callable, Dict, List, Optional
+import importlib
+import sys
+import types
+
+
+class _LazyPackage(types.ModuleType):
+    """Package that keeps lazy attributes named like their submodules.
+
+    Importing a submodule binds it on its package, which would hide an
+    attribute of the same name (the plab.smu.sweep_voltage function of the
+    plab.smu.sweep_voltage module). Those bindings are skipped, so the
+    attribute is still loaded by `__getattr__`.
+    """
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        if (
+            name in self.__dict__.get("__lazy_shadowed__", ())
+            and isinstance(value, types.ModuleType)
+            and value.__name__ == f"{self.__name__}.{name}"
+        ):
+            return
+        super().__setattr__(name, value)
+
+
+def lazy_getattr(
+    package: str, attributes: Dict[str, Optional[str]]
+) -> Callable[[str], Any]:
+    """Returns a module `__getattr__` that imports attributes on first access.
+
+    Args:
+        package: package name (`__name__`)
+        attributes: attribute name to the submodule (relative to package)
+            defining it, None if the attribute is the submodule itself.
+            An attribute can be named like its submodule, the package then
+            never binds that submodule (see _LazyPackage).
+    """
+    shadowed = frozenset(
+        name
+        for name, submodule in attributes.items()
+        if submodule is not None and name == submodule.rsplit(".", 1)[-1]
+    )
+    if shadowed:
+        module = sys.modules[package]
+        module.__lazy_shadowed__ = shadowed
+        module.__class__ = _LazyPackage
+
+    def __getattr__(name: str) -> Any:
+        if name not in attributes:
+            raise AttributeError(f"module {package!r} has no attribute {name!r}")
+        submodule = attributes[name]
+        module = importlib.import_module(f"{package}.{submodule or name}")
+        value = module if submodule is None else getattr(module, name)
+        setattr(sys.modules[package], name, value)
+        return value
+
+    return __getattr__
+
+
+def lazy_dir(
+    namespace: Dict[str, Any], attributes: Dict[str, Optional[str]]
+) -> Callable[[], List[str]]:
+    """Returns a module `__dir__` listing the lazy attributes too."""
+
+    def __dir__() -> List[str]:
+        return sorted(set(namespace) | set(attributes))
+
+    return __dir__
@@ -4,15 +4,53 @@
     - stores labstate settings CONFIG
     - timestamps
     - function settings
-- adds the measurement into a CACHE
+- records instrument I/O and sleep time in metadata.time.profile (plab.profiler)
+- adds the measurement into a CACHE (LRU, bounded by CONFIG.cache.max_bytes)
+
+With `@measurement(memoize=True, ttl=3600)` a call whose settings and CONFIG
+hash (memo_key) match a measurement in the CACHE or PATH.labdata younger than
+ttl seconds returns that measurement instead of measuring again. The hash
+leaves out the storage settings and the keys written by instruments while
+measuring (MEMOIZE_IGNORE_CONFIG_KEYS), or only hashes `config_keys`.
+
+`async def` measurement functions return coroutines, use `gather` or `run` to
+run several measurements concurrently.
+
+Measurement functions can also be generators that yield rows (dict) or chunks
+(DataFrame). Each chunk is appended to disk as it arrives and the decorator
+returns a LazyMeasurement that reads the file back on first access.
+
+Measurements called inside another measurement (a per point measurement in a
+scan loop) run in nested mode: no CONFIG snapshot, no CACHE entry and no
+OmegaConf, their metadata is a NestedMetadata dict (name, function, time and
+settings, with attribute access) converted to OmegaConf only when written.
+These are also recorded as columns and attached once to the outer measurement
+in `metadata.nested[function]`.
 """
 
-from typing import Optional, Dict, Union
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Union,
+)
+import asyncio
+import collections
+import concurrent.futures
+import contextvars
 import functools
+import glob
 import inspect
 import hashlib
 import dataclasses
+import json
 import pathlib
+import threading
 
 import time
 from pydantic import validate_arguments
@@ -21,14 +59,59 @@ import numpy as np
 from omegaconf import OmegaConf
 import omegaconf
 from plab.config import PATH, logger, CONFIG
+from plab.catalog import catalog
+from plab.configs import dedupe, resolve, store_dirpath
+from plab.layout import find, glob_all, labdata_dirpath, measurement_dirpath
+from plab.profiler import Profiler, profile
+from plab import storage, writer
+from plab.storage import (
+    BACKENDS,
+    backend_for,
+    csv_index,
+    get_backend,
+    get_stream_backend,
+    MappedData,
+)
 
 MAX_NAME_LENGTH = 64
+CACHE_MAX_BYTES = 2**30
+# storage and runtime keys, the instruments write their info while measuring
+MEMOIZE_IGNORE_CONFIG_KEYS = (
+    "cache",
+    "catalog",
+    "dedupe_config",
+    "layout",
+    "metadata_format",
+    "qontrol",
+    "qontrol_sessions",
+    "share",
+    "storage",
+    "stream_storage",
+    "writer",
+)
+STREAM_CHUNK_ROWS = 100
+STREAM_FLUSH_SECONDS = 10.0
+_NESTED: contextvars.ContextVar = contextvars.ContextVar("nested", default=None)
+
+
+class NestedMetadata(dict):
+    """Metadata of a nested measurement, a dict with attribute access."""
+
+    def __getattr__(self, key: str) -> Any:
+        try:
+            value = self[key]
+        except KeyError:
+            raise AttributeError(key) from None
+        return NestedMetadata(value) if isinstance(value, dict) else value
 
 
 @dataclasses.dataclass
 class Measurement:
-    data: Optional[pd.DataFrame] = None
-    metadata: Optional[Union[omegaconf.DictConfig, omegaconf.ListConfig]] = None
+    data: Optional[Union[pd.DataFrame, MappedData]] = None
+    metadata: Optional[
+        Union[omegaconf.DictConfig, omegaconf.ListConfig, NestedMetadata]
+    ] = None
+    path: Optional[pathlib.Path] = None
 
     def write(
         self,
@@ -36,39 +119,401 @@ class Measurement:
         dirpath: pathlib.Path = PATH.labdata,
         overwrite: bool = False,
         timestamp: bool = True,
+        backend: Optional[str] = None,
+        layout: Optional[str] = None,
+        fsync: bool = False,
     ) -> None:
-        filename = filename or f"{self.metadata.name}.csv"
-        filename = (
-            f"{self.metadata.time.timestamp}_{filename}" if timestamp else filename
-        )
-        csvpath = dirpath / filename
-        yamlpath = csvpath.with_suffix(".yml")
-        if csvpath.exists() and not overwrite:
-            raise FileExistsError(f"File {csvpath} exists")
+        """Writes data and metadata.
+
+        Args:
+            filename: defaults to metadata.name with the backend suffix
+            dirpath: labdata directory
+            overwrite: replaces existing file
+            timestamp: prepends metadata timestamp to the filename
+            backend: csv, parquet, feather or hdf5. Defaults to CONFIG.storage or csv
+            layout: sharded (dirpath/YYYY/MM/DD/function) or flat (dirpath).
+                Defaults to CONFIG.layout or flat
+            fsync: flushes the files to disk before returning
+        """
+        store = get_backend(backend)
+        self._to_config()
+        directory = measurement_dirpath(dirpath, self.metadata, layout)
+        directory.mkdir(parents=True, exist_ok=True)
+        path = self._path(filename, directory, overwrite, timestamp, store.suffix)
+        logger.info(f"Writing {path}")
+        store.write(self.data, dedupe(self.metadata, dirpath), path)
+        if fsync:
+            storage.fsync(store.paths(path) + (directory,))
+        self.path = path
+        self._index(dirpath)
+
+    def write_async(self, **kwargs: Any) -> concurrent.futures.Future:
+        """Queues the measurement to the background WRITER and returns at once.
+
+        Blocks while the WRITER queue is full. Errors of earlier writes are
+        raised here or by `plab.writer.flush()`. The data should not be
+        modified until the returned future is done.
+
+        Args:
+            kwargs: Measurement.write arguments
+        """
+        return writer.WRITER.submit(self, **kwargs)
 
-        logger.info(f"Writing {csvpath}")
-        self.data.to_csv(csvpath)
+    def publish(self, name: Optional[str] = None) -> pathlib.Path:
+        """Publishes the measurement in shared memory for other processes.
 
-        logger.info(f"Writing {yamlpath}")
-        yamlpath.write_text(OmegaConf.to_yaml(self.metadata))
+        See plab.share, consumers use `plab.share.attach(name)`.
 
-    def read(self, filename: str, dirpath: pathlib.Path = PATH.labdata) -> None:
+        Args:
+            name: defaults to metadata.name
         """
+        from plab.share import SHARE
+
+        self._to_config()
+        return SHARE.publish(self, name)
+
+    def write_stream(
+        self,
+        chunks: Iterable[Union[pd.DataFrame, Dict[str, Any]]],
+        filename: Optional[str] = None,
+        dirpath: Optional[pathlib.Path] = None,
+        overwrite: bool = False,
+        timestamp: bool = True,
+        backend: Optional[str] = None,
+        layout: Optional[str] = None,
+    ) -> int:
+        """Appends chunks to disk as they arrive and returns the number of rows.
+
+        Rows (dict) are buffered up to STREAM_CHUNK_ROWS or STREAM_FLUSH_SECONDS,
+        buffered rows are still written if the measurement raises.
+        DataFrame chunks are written straight away.
 
         Args:
-            filename: name without .csv extenstion
+            chunks: iterable of rows (dict) or DataFrames
+            filename: defaults to metadata.name with the backend suffix
+            dirpath: labdata directory, defaults to PATH.labdata
+            overwrite: replaces existing file
+            timestamp: prepends metadata timestamp to the filename
+            backend: csv or arrows. Defaults to CONFIG.stream_storage
+            layout: sharded or flat. Defaults to CONFIG.layout or flat
+        """
+        store = get_stream_backend(backend)
+        self._to_config()
+        dirpath = dirpath or PATH.labdata
+        directory = measurement_dirpath(dirpath, self.metadata, layout)
+        directory.mkdir(parents=True, exist_ok=True)
+        path = self._path(filename, directory, overwrite, timestamp, store.suffix)
+        logger.info(f"Streaming {path}")
+        self.path = path
+
+        rows = []
+        last_flush = time.time()
+        with store.open_stream(path, dedupe(self.metadata, dirpath)) as writer:
+
+            def flush():
+                if rows:
+                    index = pd.RangeIndex(writer.rows, writer.rows + len(rows))
+                    writer.append(pd.DataFrame(rows, index=index))
+                    rows.clear()
+
+            try:
+                for chunk in chunks:
+                    if isinstance(chunk, pd.DataFrame):
+                        flush()
+                        writer.append(chunk)
+                    else:
+                        rows.append(chunk)
+                    if (
+                        len(rows) >= STREAM_CHUNK_ROWS
+                        or time.time() - last_flush > STREAM_FLUSH_SECONDS
+                    ):
+                        flush()
+                        last_flush = time.time()
+            finally:
+                flush()
+        self._index(dirpath)
+        return writer.rows
+
+    def write_metadata(self) -> None:
+        """Updates the metadata of an already written measurement."""
+        self._to_config()
+        metadata = dedupe(self.metadata, store_dirpath(self.path))
+        backend_for(self.path).write_metadata(metadata, self.path)
+        self._index(labdata_dirpath(self.path))
+
+    def _to_config(self) -> None:
+        """Converts NestedMetadata to OmegaConf, once, before storing it."""
+        if isinstance(self.metadata, NestedMetadata):
+            self.metadata = OmegaConf.create(dict(self.metadata))
+
+    def _index(self, dirpath: pathlib.Path) -> None:
+        index = catalog(dirpath)
+        if index is not None:
+            index.add(self.path, self.metadata)
+
+    def _path(
+        self,
+        filename: Optional[str],
+        dirpath: pathlib.Path,
+        overwrite: bool,
+        timestamp: bool,
+        suffix: str,
+    ) -> pathlib.Path:
+        filename = filename or f"{self.metadata.name}{suffix}"
+        filename = (
+            f"{self.metadata.time.timestamp}_{filename}" if timestamp else filename
+        )
+        path = dirpath / filename
+        if path.exists() and not overwrite:
+            raise FileExistsError(f"File {path} exists")
+        return path
+
+    def read(
+        self,
+        filename: str,
+        dirpath: pathlib.Path = PATH.labdata,
+        backend: Optional[str] = None,
+        lazy: bool = False,
+    ) -> None:
+        """Reads data and metadata.
 
+        Args:
+            filename: name without extension (detects the backend from the file found)
+            dirpath: directory
+            backend: csv, parquet, feather or hdf5
+            lazy: data is a MappedData view (feather, arrows and parquet) that
+                reads columns and rows on access instead of a DataFrame
         """
-        self.data = pd.read_csv(dirpath / f"{filename}.csv")
-        self.metadata = OmegaConf.load(dirpath / f"{filename}.yml")
+        if backend:
+            store = get_backend(backend)
+            path = dirpath / f"{filename}{store.suffix}"
+        else:
+            store, path = find(filename, dirpath)
+        if lazy:
+            self.data, self.metadata = store.open(path), store.read_metadata(path)
+        else:
+            self.data, self.metadata = store.read(path)
+        self.metadata = resolve(self.metadata, path)
+        self.path = path
 
     def ls(self, glob: str = "*.csv") -> None:
         """List all measured files"""
-        for csv in PATH.labdata.glob(glob):
+        for csv in glob_all(PATH.labdata, glob):
             print(csv.stem)
 
 
-CACHE = {}
+class LazyMeasurement(Measurement):
+    """Measurement whose data is read from path on first access."""
+
+    @property  # type: ignore
+    def data(self) -> Optional[pd.DataFrame]:
+        if self._data is None and self.path is not None:
+            self._data, _ = backend_for(self.path).read(self.path)
+        return self._data
+
+    @data.setter
+    def data(self, data: Optional[pd.DataFrame]) -> None:
+        self._data = data
+
+
+def read_metadata(
+    filename: str, dirpath: Optional[pathlib.Path] = None
+) -> LazyMeasurement:
+    """Returns a measurement with only its metadata read.
+
+    The data is read on first access to `.data`.
+
+    Args:
+        filename: name without extension
+        dirpath: directory, defaults to PATH.labdata
+    """
+    store, path = find(filename, dirpath or PATH.labdata)
+    metadata = resolve(store.read_metadata(path), path)
+    return LazyMeasurement(metadata=metadata, path=path)
+
+
+def _nbytes(measurement: Measurement) -> int:
+    """Returns in-memory size of the measurement data without loading it."""
+    data = (
+        vars(measurement).get("_data")
+        if isinstance(measurement, LazyMeasurement)
+        else measurement.data
+    )
+    if isinstance(data, pd.DataFrame):
+        return int(data.memory_usage(deep=True).sum())
+    return 0
+
+
+def _unloaded(measurement: Measurement) -> bool:
+    """Returns True for a LazyMeasurement whose data is not read yet."""
+    return (
+        isinstance(measurement, LazyMeasurement)
+        and vars(measurement).get("_data") is None
+    )
+
+
+@dataclasses.dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    spills: int = 0
+    reloads: int = 0
+
+
+class MeasurementCache:
+    """LRU cache of measurements keyed by metadata.name with a memory budget.
+
+    When the budget is exceeded the least recently used measurements are
+    evicted. With a dirpath, evicted measurements are spilled to disk (or just
+    remembered if they are already written in a binary format) and reloaded
+    on access.
+
+    Args:
+        max_bytes: memory budget for the cached DataFrames
+        dirpath: spill directory, evicted measurements are dropped if None
+        backend: spill storage backend, defaults to parquet (csv without pyarrow)
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = CACHE_MAX_BYTES,
+        dirpath: Optional[pathlib.Path] = None,
+        backend: Optional[str] = None,
+    ) -> None:
+        self.max_bytes = max_bytes
+        self.dirpath = pathlib.Path(dirpath) if dirpath else None
+        self.backend = backend
+        self.nbytes = 0
+        self.stats = CacheStats()
+        self._entries: "collections.OrderedDict[str, Measurement]" = (
+            collections.OrderedDict()
+        )
+        self._sizes: Dict[str, int] = {}
+        self._spilled: Dict[str, pathlib.Path] = {}
+        self._unloaded: Dict[str, LazyMeasurement] = {}
+        self._lock = threading.RLock()
+
+    def __setitem__(self, name: str, measurement: Measurement) -> None:
+        with self._lock:
+            self._remove(name)
+            self._spilled.pop(name, None)
+            self._entries[name] = measurement
+            self._sizes[name] = _nbytes(measurement)
+            self.nbytes += self._sizes[name]
+            if _unloaded(measurement):
+                self._unloaded[name] = measurement
+            self.recount()
+
+    def recount(self) -> None:
+        """Counts the lazy measurements loaded since they were cached.
+
+        Runs on every insert and lookup, evicting if over budget.
+        """
+        with self._lock:
+            for name, measurement in list(self._unloaded.items()):
+                if not _unloaded(measurement):
+                    del self._unloaded[name]
+                    size = _nbytes(measurement)
+                    self.nbytes += size - self._sizes[name]
+                    self._sizes[name] = size
+            while self.nbytes > self.max_bytes and len(self._entries) > 1:
+                self._evict()
+
+    def __getitem__(self, name: str) -> Measurement:
+        with self._lock:
+            self.recount()
+            if name in self._entries:
+                self.stats.hits += 1
+                self._entries.move_to_end(name)
+                return self._entries[name]
+            if name in self._spilled:
+                self.stats.hits += 1
+                self.stats.reloads += 1
+                path = self._spilled.pop(name)
+                logger.info(f"Reloading {name} from {path}")
+                store = backend_for(path)
+                data, metadata = store.read(path)
+                if store.name == "csv":
+                    data = csv_index(data)
+                metadata = resolve(metadata, path)
+                measurement = Measurement(data=data, metadata=metadata, path=path)
+                self[name] = measurement
+                return measurement
+            self.stats.misses += 1
+            raise KeyError(name)
+
+    def get(
+        self, name: str, default: Optional[Measurement] = None
+    ) -> Optional[Measurement]:
+        try:
+            return self[name]
+        except KeyError:
+            return default
+
+    def __delitem__(self, name: str) -> None:
+        with self._lock:
+            if name not in self:
+                raise KeyError(name)
+            self._remove(name)
+            self._spilled.pop(name, None)
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._entries or name in self._spilled
+
+    def __len__(self) -> int:
+        return len(self._entries) + len(self._spilled)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self._entries) + list(self._spilled))
+
+    def keys(self) -> Iterable[str]:
+        return list(self)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+            self._spilled.clear()
+            self._unloaded.clear()
+            self.nbytes = 0
+
+    def _remove(self, name: str) -> None:
+        if name in self._entries:
+            del self._entries[name]
+            self.nbytes -= self._sizes.pop(name)
+            self._unloaded.pop(name, None)
+
+    def _evict(self) -> None:
+        name, measurement = next(iter(self._entries.items()))
+        self._remove(name)
+        self.stats.evictions += 1
+        if self.dirpath is None:
+            return
+
+        path = measurement.path
+        # csv files are read back without their index, spill them again
+        if path is None or not path.exists() or backend_for(path).name == "csv":
+            store = get_backend(self.backend or _default_spill_backend())
+            self.dirpath.mkdir(parents=True, exist_ok=True)
+            path = self.dirpath / f"{name}{store.suffix}"
+            logger.info(f"Spilling {name} to {path}")
+            store.write(
+                measurement.data, dedupe(measurement.metadata, self.dirpath), path
+            )
+            self.stats.spills += 1
+        self._spilled[name] = path
+
+
+def _default_spill_backend() -> str:
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return "csv"
+    return "parquet"
+
+
+CACHE = MeasurementCache(**CONFIG.get("cache", {}))
 
 
 _remap = {
@@ -77,73 +522,374 @@ _remap = {
 }
 
 
-def measurement_without_validator(func):
+def measurement_name(function: str, kwargs: Dict[str, Any]) -> str:
+    """Returns the measurement name for a function called with kwargs."""
+    # timestamp = time.strftime("%y%m%d%H%M%S", time.localtime())
+    kwargs_copy = kwargs.copy()
+    kwargs_copy.pop("description", "")
+    kwargs_repr = [f"{k}={v!r}" for k, v in kwargs_copy.items()]
+    name = f"{function}_{'_'.join(kwargs_repr)}"
+    if len(name) > MAX_NAME_LENGTH:
+        name_hash = hashlib.md5(name.encode()).hexdigest()[:8]
+        name = f"{function[:(MAX_NAME_LENGTH - 9)]}_{name_hash}"
+
+    for k, v in _remap.items():
+        name = name.replace(k, v)
+    return name
+
+
+def _time_dict(t0: float, t1: float, timestamp: Optional[str] = None) -> Dict[str, Any]:
+    timestamp = timestamp or time.strftime("%y-%m-%d_%H:%M:%S", time.localtime())
+    return dict(t0=t0, t1=t1, dt=t1 - t0, timestamp=timestamp)
+
+
+def _metadata(
+    name: str,
+    function: str,
+    t0: float,
+    t1: float,
+    settings: Dict[str, Any],
+    memo_key: Optional[str] = None,
+) -> omegaconf.DictConfig:
+    time_dict = _time_dict(t0=t0, t1=t1)
+    metadata = OmegaConf.create(
+        dict(
+            name=name,
+            function=function,
+            time=time_dict,
+            settings=settings,
+            config=CONFIG,
+        )
+    )
+    if memo_key:
+        metadata.memo_key = memo_key
+    return metadata
+
+
+def _settings(kwargs: Dict[str, Any]) -> Dict[str, Any]:
+    """Returns kwargs for metadata, with callables (instrument factories) by name."""
+    return {
+        key: getattr(value, "__qualname__", repr(value)) if callable(value) else value
+        for key, value in kwargs.items()
+    }
+
+
+def _column_value(value: Any) -> Any:
+    if value is None or isinstance(value, (int, float, str, bool, list, tuple, dict)):
+        return value
+    return repr(value)
+
+
+class NestedMeasurements:
+    """Columnar record of the measurements called inside an outer measurement.
+
+    One set of columns per function: name, t0, dt and one list per setting,
+    filled with None for points that do not have that setting.
+    """
+
+    def __init__(self) -> None:
+        self.functions: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def append(
+        self, function: str, name: str, t0: float, t1: float, settings: Dict[str, Any]
+    ) -> None:
+        with self._lock:
+            columns = self.functions.setdefault(
+                function, dict(name=[], t0=[], dt=[], settings={})
+            )
+            n = len(columns["name"])
+            columns["name"].append(name)
+            columns["t0"].append(t0)
+            columns["dt"].append(t1 - t0)
+            for key, value in settings.items():
+                columns["settings"].setdefault(key, [None] * n).append(
+                    _column_value(value)
+                )
+            for values in columns["settings"].values():
+                if len(values) == n:
+                    values.append(None)
+
+    def __len__(self) -> int:
+        return sum(len(columns["name"]) for columns in self.functions.values())
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                function: dict(
+                    columns, n=len(columns["name"]), settings=dict(columns["settings"])
+                )
+                for function, columns in self.functions.items()
+            }
+
+
+def nested_dataframe(metadata: Any, function: str) -> pd.DataFrame:
+    """Returns the nested measurements of function as a DataFrame (one row per call).
+
+    Args:
+        metadata: outer measurement metadata
+        function: nested measurement function name
+    """
+    columns = metadata.nested[function]
+    data = dict(name=list(columns.name), t0=list(columns.t0), dt=list(columns.dt))
+    data.update({key: list(values) for key, values in columns.settings.items()})
+    return pd.DataFrame(data)
+
+
+def _memo_key(
+    function: str, settings: Dict[str, Any], config_keys: Optional[Iterable[str]]
+) -> str:
+    """Returns a hash of the function settings and the labstate CONFIG."""
+    config = OmegaConf.to_container(CONFIG)
+    keys = config_keys or [k for k in config if k not in MEMOIZE_IGNORE_CONFIG_KEYS]
+    state = dict(
+        function=function,
+        settings=settings,
+        config={key: config.get(key) for key in sorted(keys)},
+    )
+    text = json.dumps(
+        state, sort_keys=True, default=lambda o: getattr(o, "__qualname__", repr(o))
+    )
+    return hashlib.md5(text.encode()).hexdigest()
+
+
+def _is_fresh(metadata: Any, memo_key: str, ttl: Optional[float]) -> bool:
+    if metadata is None or metadata.get("memo_key") != memo_key:
+        return False
+    return ttl is None or time.time() - metadata.time.t1 < ttl
+
+
+def _memoized(name: str, memo_key: str, ttl: Optional[float]) -> Optional[Measurement]:
+    """Returns a fresh measurement with the same memo_key from CACHE or labdata."""
+    measurement = CACHE.get(name)
+    if measurement is not None and _is_fresh(measurement.metadata, memo_key, ttl):
+        return measurement
+
+    index = catalog(PATH.labdata)
+    if index is not None and index.path.exists():
+        for measurement in reversed(index.query(name=name, memo_key=memo_key)):
+            if _is_fresh(measurement.metadata, memo_key, ttl):
+                CACHE[name] = measurement
+                return measurement
+        return None
+
+    paths = sorted(
+        glob_all(PATH.labdata, f"*_{glob.escape(name)}.*"),
+        key=lambda path: path.name,
+        reverse=True,
+    )
+    for path in paths:
+        for backend in BACKENDS.values():
+            if path.suffix != backend.suffix:
+                continue
+            metadata = backend.read_metadata(path)
+            if _is_fresh(metadata, memo_key, ttl):
+                metadata = resolve(metadata, path)
+                measurement = LazyMeasurement(metadata=metadata, path=path)
+                CACHE[name] = measurement
+                return measurement
+    return None
+
+
+def measurement_without_validator(
+    func: Optional[Callable] = None,
+    *,
+    memoize: bool = False,
+    ttl: Optional[float] = None,
+    config_keys: Optional[Iterable[str]] = None,
+):
     """measurement decorator.
     Adds a measurement name based on input parameters
     logs measurement metadata into CONFIG
+
+    Args:
+        func: measurement function returning a DataFrame (or yielding chunks)
+        memoize: reuse a previous measurement with the same settings and CONFIG
+        ttl: max age in seconds of a memoized measurement (None never expires)
+        config_keys: CONFIG keys hashed for memoize, defaults to all labstate keys
     """
+    if func is None:
+        return functools.partial(
+            measurement_without_validator,
+            memoize=memoize,
+            ttl=ttl,
+            config_keys=config_keys,
+        )
 
-    @functools.wraps(func)
-    def _measurement(*args, **kwargs):
-        args_repr = [repr(a) for a in args]
-        # timestamp = time.strftime("%y%m%d%H%M%S", time.localtime())
-        kwargs_copy = kwargs.copy()
-        kwargs_copy.pop("description", "")
-        kwargs_repr = [f"{k}={v!r}" for k, v in kwargs_copy.items()]
-        name = f"{func.__name__}_{'_'.join(kwargs_repr)}"
-        if len(name) > MAX_NAME_LENGTH:
-            name_hash = hashlib.md5(name.encode()).hexdigest()[:8]
-            name = f"{func.__name__[:(MAX_NAME_LENGTH - 9)]}_{name_hash}"
-
-        for k, v in _remap.items():
-            name = name.replace(k, v)
-        arguments = ", ".join(args_repr + kwargs_repr)
+    assert callable(
+        func
+    ), f"{func} got decorated with @measurement! @measurement decorator is only for functions"
+    defaults = {
+        p.name: p.default
+        for p in inspect.signature(func).parameters.values()
+        if not callable(p.default)
+    }
 
+    def _check_args(args, kwargs):
         if args:
+            args_repr = [repr(a) for a in args]
+            kwargs_repr = [f"{k}={v!r}" for k, v in kwargs.items()]
+            arguments = ", ".join(args_repr + kwargs_repr)
             raise ValueError(
                 f"measurement supports only Keyword args for `{func.__name__}({arguments})`"
             )
 
-        assert callable(
-            func
-        ), f"{func} got decorated with @measurement! @measurement decorator is only for functions"
-        sig = inspect.signature(func)
-        t0 = time.time()
-        logger.info(f"Starting {func.__name__}({','.join(kwargs_repr)}))")
-
-        data = func(*args, **kwargs)
+    def _start(args, kwargs):
+        """Returns name, settings, memo_key and a memoized measurement or None."""
+        _check_args(args, kwargs)
+        name = measurement_name(func.__name__, kwargs)
+        arguments = ", ".join(f"{k}={v!r}" for k, v in kwargs.items())
+        settings = dict(defaults, **_settings(kwargs))
+
+        memo_key = None
+        if memoize:
+            memo_key = _memo_key(func.__name__, settings, config_keys)
+            measurement = _memoized(name, memo_key, ttl)
+            if measurement is not None:
+                logger.info(f"Reusing {measurement.metadata.name} ({memo_key})")
+                return name, settings, memo_key, measurement
+
+        logger.info(f"Starting {func.__name__}({arguments}))")
+        return name, settings, memo_key, None
+
+    def _finish(name, settings, memo_key, data, t0, profiler: Profiler):
+        if inspect.isgenerator(data):
+            metadata = _metadata(
+                name=name,
+                function=func.__name__,
+                t0=t0,
+                t1=t0,
+                settings=settings,
+                memo_key=memo_key,
+            )
+            measurement = LazyMeasurement(metadata=metadata)
+            rows = measurement.write_stream(data)
+            metadata.time = _time_dict(
+                t0=t0, t1=time.time(), timestamp=metadata.time.timestamp
+            )
+            metadata.rows = rows
+            if profiler.samples:
+                metadata.time.profile = profiler.summary(dt=metadata.time.dt)
+            measurement.write_metadata()
+        else:
+            if not isinstance(data, pd.DataFrame):
+                logger.warning(f"{func.__name__} needs to return a pandas.DataFrame")
+            metadata = _metadata(
+                name=name,
+                function=func.__name__,
+                t0=t0,
+                t1=time.time(),
+                settings=settings,
+                memo_key=memo_key,
+            )
+            if isinstance(data, pd.DataFrame) and data.attrs:
+                metadata.attrs = dict(data.attrs)
+            measurement = Measurement(data=data, metadata=metadata)
+            if profiler.samples:
+                metadata.time.profile = profiler.summary(dt=metadata.time.dt)
 
-        if not isinstance(data, pd.DataFrame):
-            logger.warning(f"{func.__name__} needs to return a pandas.DataFrame")
+        logger.info(f"Finished {name}, took {metadata.time.dt}")
+        CACHE[name] = measurement
+        return measurement
 
+    def _finish_nested(nested, kwargs, data, t0):
+        """Records a measurement called inside another one and returns it."""
+        name = measurement_name(func.__name__, kwargs)
+        settings = dict(defaults, **_settings(kwargs))
+        if inspect.isgenerator(data):
+            return _finish(name, settings, None, data, t0, Profiler())
         t1 = time.time()
-        dt = t1 - t0
-        logger.info(f"Finished {func.__name__}({','.join(kwargs_repr)})), took {dt}")
-
-        settings = {}
-        settings.update(
-            **{
-                p.name: p.default
-                for p in sig.parameters.values()
-                if not callable(p.default)
-            }
+        nested.append(func.__name__, name, t0, t1, settings)
+        metadata = NestedMetadata(
+            name=name,
+            function=func.__name__,
+            time=_time_dict(t0=t0, t1=t1),
+            settings=settings,
         )
-        settings.update(**kwargs)
+        return Measurement(data=data, metadata=metadata)
 
-        timestamp = time.strftime("%y-%m-%d_%H:%M:%S", time.localtime())
-        time_dict = dict(t0=t0, t1=t1, dt=dt, timestamp=timestamp)
-        metadata = OmegaConf.create(
-            dict(name=name, time=time_dict, settings=settings, config=CONFIG)
-        )
-        measurement = Measurement(data=data, metadata=metadata)
-        CACHE[name] = measurement
+    def _attach_nested(measurement: Measurement, nested: NestedMeasurements):
+        if len(nested):
+            measurement.metadata.nested = nested.to_dict()
+            if measurement.path is not None:
+                measurement.write_metadata()
         return measurement
 
+    @functools.wraps(func)
+    def _measurement(*args, **kwargs):
+        nested = _NESTED.get()
+        if nested is not None:
+            _check_args(args, kwargs)
+            t0 = time.time()
+            return _finish_nested(nested, kwargs, func(*args, **kwargs), t0)
+
+        name, settings, memo_key, measurement = _start(args, kwargs)
+        if measurement is not None:
+            return measurement
+        nested = NestedMeasurements()
+        token = _NESTED.set(nested)
+        try:
+            with profile() as profiler:
+                t0 = time.time()
+                data = func(*args, **kwargs)
+                measurement = _finish(name, settings, memo_key, data, t0, profiler)
+        finally:
+            _NESTED.reset(token)
+        return _attach_nested(measurement, nested)
+
+    @functools.wraps(func)
+    async def _measurement_async(*args, **kwargs):
+        nested = _NESTED.get()
+        if nested is not None:
+            _check_args(args, kwargs)
+            t0 = time.time()
+            return _finish_nested(nested, kwargs, await func(*args, **kwargs), t0)
+
+        name, settings, memo_key, measurement = _start(args, kwargs)
+        if measurement is not None:
+            return measurement
+        nested = NestedMeasurements()
+        token = _NESTED.set(nested)
+        try:
+            with profile() as profiler:
+                t0 = time.time()
+                data = await func(*args, **kwargs)
+                measurement = _finish(name, settings, memo_key, data, t0, profiler)
+        finally:
+            _NESTED.reset(token)
+        return _attach_nested(measurement, nested)
+
+    if inspect.iscoroutinefunction(inspect.unwrap(func)):
+        return _measurement_async
     return _measurement
 
 
-def measurement(func, *args, **kwargs) -> Measurement:
-    return measurement_without_validator(validate_arguments(func), *args, **kwargs)
+async def gather(*measurements: Awaitable[Measurement]) -> List[Measurement]:
+    """Runs measurement coroutines concurrently.
+
+    Each measurement records its own t0/t1. Blocking driver calls inside an
+    `async def` measurement should go through `loop.run_in_executor` so they
+    do not stall the other measurements.
+
+    Args:
+        measurements: coroutines from `async def` @measurement functions
+    """
+    return list(await asyncio.gather(*measurements))
+
+
+def run(*measurements: Awaitable[Measurement]) -> List[Measurement]:
+    """Runs measurement coroutines concurrently from synchronous code."""
+    return asyncio.run(gather(*measurements))
+
+
+def measurement(func: Optional[Callable] = None, **kwargs):
+    """measurement decorator with pydantic argument validation.
+
+    Use as `@measurement` or `@measurement(memoize=True, ttl=3600)`.
+    """
+    if func is None:
+        return functools.partial(measurement, **kwargs)
+    return measurement_without_validator(validate_arguments(func), **kwargs)
 
 
 @measurement
@@ -1,3 +1,11 @@
-from .agilent_8164B_power_meter import PowerMeterAgilent8164B
-from .newport_2832c import Newport2832c
-from .pm100 import Pm100Usb
+from plab.lazy import lazy_dir, lazy_getattr
+
+_DRIVERS = {
+    "PowerMeterAgilent8164B": "agilent_8164B_power_meter",
+    "Newport2832c": "newport_2832c",
+    "Pm100Usb": "pm100",
+}
+
+__all__ = list(_DRIVERS)
+__getattr__ = lazy_getattr(__name__, _DRIVERS)
+__dir__ = lazy_dir(globals(), _DRIVERS)
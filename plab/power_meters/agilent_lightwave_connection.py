@@ -1,5 +1,6 @@
 import pygpib as gpib
 import serial as ser
+from plab.profiler import profiled
 
 
 class AgilentLightWaveConnection:
@@ -12,12 +13,14 @@ class AgilentLightWaveConnection:
             self._dev = ser.Serial(f"/dev/{serial_port}", 38400)
             self._gpib_used = False
 
+    @profiled
     def _write(self, cmd):
         if self._gpib_used:
             gpib.write(self._dev, cmd)
         else:
             self._dev.write(cmd.encode())
 
+    @profiled
     def _read(self, num_bytes=100):
         if self._gpib_used:
             data = gpib.read(self._dev, num_bytes)
@@ -25,6 +28,7 @@ class AgilentLightWaveConnection:
             data = self._dev.readline(num_bytes)
         return data.decode("ascii")
 
+    @profiled
     def _read_raw(self, num_bytes=100):
         return (
             gpib.read(self._dev, num_bytes)
@@ -32,10 +36,12 @@ class AgilentLightWaveConnection:
             else self._dev.read(num_bytes)
         )
 
+    @profiled
     def _query(self, cmd, num_bytes=100):
         self._write(cmd)
         return self._read(num_bytes)
 
+    @profiled
     def _query_raw(self, cmd, num_bytes=100):
         self._write(cmd)
         return self._read_raw(num_bytes)
@@ -3,6 +3,7 @@ import pyvisa as visa
 import serial as ser
 import time
 import numpy as np
+from plab.profiler import profiled
 
 
 class Newport2832c(pm.PowerMeter):
@@ -60,11 +61,13 @@ class Newport2832c(pm.PowerMeter):
     def get_rs232_echo(self):
         return self._query("ECHO?")
 
+    @profiled
     def _read(self):
         reply = self._dev.read() if self.gpib_mode else self._dev.readline()
         reply = reply.decode().strip()
         return reply
 
+    @profiled
     def _write(self, cmd):
         self._dev.write((cmd + "\r").encode())
         time.sleep(0.01)  # Needed otherwise messes up if a read directly follows.
@@ -72,6 +75,7 @@ class Newport2832c(pm.PowerMeter):
         # when the status bit says there's a reply.
         return cmd
 
+    @profiled
     def _query(self, cmd):
         cmd = self._write(cmd)
         return self._read()
@@ -1,6 +1,7 @@
 from . import power_meter as pm
 from ..usb_usbtmc_info import usbtmc_from_serial
 import os
+from plab.profiler import profiled
 
 
 class _Usbtmc(object):
@@ -19,6 +20,7 @@ class _Usbtmc(object):
         usbtmc = f"/dev/usbtmc{str(usbtmc_dev_number)}"
         self._dev = os.open(usbtmc, os.O_RDWR)
 
+    @profiled
     def write(self, command):
         """
         Send a string to the USBTMC device.
@@ -28,6 +30,7 @@ class _Usbtmc(object):
         """
         os.write(self._dev, str.encode(command))
 
+    @profiled
     def read(self, number_of_characters=16):
         """
         Read a string from the USBTMC device.
@@ -41,6 +44,7 @@ class _Usbtmc(object):
         """
         return os.read(self._dev, number_of_characters)
 
+    @profiled
     def ask(self, command, number_of_characters=16):
         """
         Write to, and then read from the USBTMC device.
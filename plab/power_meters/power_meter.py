@@ -1,6 +1,6 @@
 import abc
-import time
 import math
+from plab import profiler
 
 
 class PowerMeter(object, metaclass=abc.ABCMeta):
@@ -104,7 +104,7 @@ class PowerMeter(object, metaclass=abc.ABCMeta):
         powers = []
         for _ in range(average):
             powers.append(self._get_power_W())
-            time.sleep(read_period_ms / 1000.0)
+            profiler.sleep(read_period_ms / 1000.0, reason="read_period")
         return sum(powers) / float(len(powers))
 
     def get_power_mW(self, average=1, read_period_ms=None):
@@ -0,0 +1,244 @@
+"""Timing breakdown of measurements per instrument and command.
+
+@measurement runs the measurement function inside `profile()`. Instrument I/O
+decorated with `@profiled` and settling delays done with `profiler.sleep`
+report into the active profiler, and the summary ends up in
+`metadata.time.profile`:
+
+- instruments: {instrument: {command: count, total, mean, p50, p90, p99, max}}
+- io: total instrument time [s]
+- sleep: total settling time [s]
+- python: remaining measurement time [s]
+
+Nested instrumented calls (a `_query` calling `_write` and `_read`) are only
+recorded once, by the outermost call. Outside a measurement nothing is recorded.
+"""
+
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+import collections
+import contextlib
+import contextvars
+import functools
+import json
+import pathlib
+import threading
+import time
+
+import numpy as np
+
+SLEEP = "sleep"
+QUANTILES = {"0.5": "p50", "0.9": "p90", "0.99": "p99"}
+_PROFILER: contextvars.ContextVar = contextvars.ContextVar("profiler", default=None)
+_INSIDE: contextvars.ContextVar = contextvars.ContextVar("inside", default=False)
+
+
+class Profiler:
+    """Collects call latencies per (instrument, command)."""
+
+    def __init__(self) -> None:
+        self.samples: Dict[Tuple[str, str], List[float]] = collections.defaultdict(list)
+        self._lock = threading.Lock()
+
+    def record(self, instrument: str, command: str, dt: float) -> None:
+        with self._lock:
+            self.samples[(instrument, command)].append(dt)
+
+    def summary(self, dt: Optional[float] = None) -> Dict[str, Any]:
+        """Returns the per instrument and command breakdown.
+
+        Args:
+            dt: total measurement time, to compute the python overhead
+        """
+        instruments: Dict[str, Dict[str, Any]] = collections.defaultdict(dict)
+        io = sleep = 0.0
+        with self._lock:
+            samples = dict(self.samples)
+        for (instrument, command), latencies in sorted(samples.items()):
+            values = np.array(latencies)
+            p50, p90, p99 = np.percentile(values, [50, 90, 99])
+            total = float(values.sum())
+            instruments[instrument][command] = dict(
+                count=len(values),
+                total=total,
+                mean=total / len(values),
+                p50=float(p50),
+                p90=float(p90),
+                p99=float(p99),
+                max=float(values.max()),
+            )
+            if instrument == SLEEP:
+                sleep += total
+            else:
+                io += total
+        summary = dict(instruments=dict(instruments), io=io, sleep=sleep)
+        if dt is not None:
+            summary["python"] = max(dt - io - sleep, 0.0)
+        return summary
+
+
+@contextlib.contextmanager
+def profile() -> Iterator[Profiler]:
+    """Makes a new Profiler active for the current context."""
+    profiler = Profiler()
+    token = _PROFILER.set(profiler)
+    try:
+        yield profiler
+    finally:
+        _PROFILER.reset(token)
+
+
+def record(instrument: str, command: str, dt: float) -> None:
+    """Records a call into the active profiler, if any."""
+    profiler = _PROFILER.get()
+    if profiler is not None:
+        profiler.record(instrument, command, dt)
+
+
+@contextlib.contextmanager
+def timed(instrument: str, command: str) -> Iterator[None]:
+    """Times the block as one instrument call."""
+    if _PROFILER.get() is None or _INSIDE.get():
+        yield
+        return
+    token = _INSIDE.set(True)
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(instrument, command, time.perf_counter() - t0)
+        _INSIDE.reset(token)
+
+
+def _command(args: Tuple[Any, ...], default: str) -> str:
+    if args and isinstance(args[0], (str, bytes)):
+        words = str(args[0] if isinstance(args[0], str) else args[0].decode()).split()
+        return words[0][:32] if words else default
+    return default
+
+
+def profiled(func: Callable) -> Callable:
+    """Decorates instrument I/O methods to report into the active profiler.
+
+    The instrument is the class name, the command is the first word of the
+    command string argument, or the method name.
+    """
+
+    @functools.wraps(func)
+    def _profiled(self, *args, **kwargs):
+        if _PROFILER.get() is None:
+            return func(self, *args, **kwargs)
+        with timed(type(self).__name__, _command(args, func.__name__)):
+            return func(self, *args, **kwargs)
+
+    return _profiled
+
+
+def profile_calls(
+    func: Callable, instrument: str, command: Callable[..., str]
+) -> Callable:
+    """Wraps a bound method or function of a third party driver.
+
+    Args:
+        func: callable to wrap
+        instrument: instrument label
+        command: returns the command label from the call arguments
+    """
+
+    @functools.wraps(func)
+    def _profiled(*args, **kwargs):
+        if _PROFILER.get() is None:
+            return func(*args, **kwargs)
+        with timed(instrument, command(*args, **kwargs)):
+            return func(*args, **kwargs)
+
+    return _profiled
+
+
+def sleep(seconds: float, reason: str = "settle") -> None:
+    """time.sleep that reports into the active profiler.
+
+    Sleeps inside an instrumented call are part of that call.
+    """
+    t0 = time.perf_counter()
+    time.sleep(seconds)
+    if not _INSIDE.get():
+        record(SLEEP, reason, time.perf_counter() - t0)
+
+
+def to_json(summary: Dict[str, Any]) -> str:
+    return json.dumps(summary, indent=2, sort_keys=True)
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels: Dict[str, Any]) -> str:
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+def to_prometheus(
+    summary: Dict[str, Any],
+    labels: Optional[Dict[str, Any]] = None,
+    prefix: str = "plab",
+) -> str:
+    """Returns the summary in Prometheus text exposition format.
+
+    Args:
+        summary: Profiler.summary() or metadata.time.profile
+        labels: extra labels, such as the measurement name
+        prefix: metric name prefix
+    """
+    labels = dict(labels or {})
+    metric = f"{prefix}_instrument_seconds"
+    lines = [
+        f"# HELP {metric} Instrument call latency per instrument and command.",
+        f"# TYPE {metric} summary",
+    ]
+    for instrument, commands in summary["instruments"].items():
+        for command, stats in commands.items():
+            call = dict(labels, instrument=instrument, command=command)
+            for quantile, key in QUANTILES.items():
+                lines.append(
+                    f"{metric}{_labels(dict(call, quantile=quantile))} {stats[key]}"
+                )
+            lines.append(f"{metric}_sum{_labels(call)} {stats['total']}")
+            lines.append(f"{metric}_count{_labels(call)} {stats['count']}")
+
+    metric = f"{prefix}_measurement_seconds"
+    lines += [
+        f"# HELP {metric} Measurement time split into io, sleep and python.",
+        f"# TYPE {metric} gauge",
+    ]
+    for part in ["io", "sleep", "python"]:
+        if part in summary:
+            lines.append(f"{metric}{_labels(dict(labels, part=part))} {summary[part]}")
+    return "\n".join(lines) + "\n"
+
+
+def export(measurement: Any, path: pathlib.Path) -> None:
+    """Writes the profile of a measurement as JSON (.json) or Prometheus (.prom)."""
+    from omegaconf import OmegaConf
+
+    summary = OmegaConf.to_container(measurement.metadata.time.profile)
+    path = pathlib.Path(path)
+    if path.suffix == ".json":
+        path.write_text(to_json(summary))
+    else:
+        path.write_text(
+            to_prometheus(summary, labels=dict(measurement=measurement.metadata.name))
+        )
+
+
+__all__ = [
+    "Profiler",
+    "export",
+    "profile",
+    "profile_calls",
+    "profiled",
+    "record",
+    "sleep",
+    "timed",
+    "to_json",
+    "to_prometheus",
+]
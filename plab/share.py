@@ -0,0 +1,178 @@
+"""Share measurements between processes through Arrow IPC files in shared memory.
+
+The acquisition process publishes, live analysis and dashboards attach:
+
+```
+# acquisition
+m = sweep_voltage(vmax=2)
+m.publish()
+
+# analysis (another process)
+from plab import share
+
+share.available()                  # {name: {rows, columns, nbytes, t, function}}
+m = share.attach("sweep_voltage_vmax=2")
+m.data["i_0"]                      # memory mapped, no copy until converted
+```
+
+Measurements are uncompressed Arrow IPC files (metadata in the schema) under
+CONFIG.share.dirpath, by default /dev/shm/plab (tmpfs) or the temp directory.
+Files are written under a temporary name and renamed, so an attached file is
+always complete. `index.json` lists the available measurements. Publishing
+beyond max_bytes removes the oldest ones. Processes that attached them keep
+their mapping until they drop it.
+"""
+
+from typing import Any, Dict, Iterator, Optional
+import contextlib
+import json
+import os
+import pathlib
+import tempfile
+import time
+
+from plab.config import CONFIG, logger
+from plab.storage import get_backend
+
+try:
+    import fcntl
+except ImportError:  # windows: publishing from a single process
+    fcntl = None
+
+INDEX_FILENAME = "index.json"
+SHARE_MAX_BYTES = 2**30
+SUFFIX = ".arrow"
+
+
+def _unlink(path: pathlib.Path) -> None:
+    with contextlib.suppress(FileNotFoundError):
+        path.unlink()
+
+
+def _default_dirpath() -> pathlib.Path:
+    shm = pathlib.Path("/dev/shm")
+    root = shm if shm.is_dir() else pathlib.Path(tempfile.gettempdir())
+    return root / "plab"
+
+
+class Share:
+    """Directory of measurements published as Arrow IPC files.
+
+    Args:
+        dirpath: directory, defaults to /dev/shm/plab
+        max_bytes: oldest measurements are removed beyond this size
+    """
+
+    def __init__(
+        self,
+        dirpath: Optional[pathlib.Path] = None,
+        max_bytes: int = SHARE_MAX_BYTES,
+    ) -> None:
+        self.dirpath = pathlib.Path(dirpath or _default_dirpath())
+        self.max_bytes = max_bytes
+        self.index_path = self.dirpath / INDEX_FILENAME
+
+    @contextlib.contextmanager
+    def _locked(self) -> Iterator[Dict[str, Any]]:
+        """Yields the index for update, locked against other processes."""
+        self.dirpath.mkdir(parents=True, exist_ok=True)
+        with open(self.dirpath / ".lock", "w") as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            index = self.available()
+            yield index
+            tmp = self.index_path.with_suffix(".tmp")
+            tmp.write_text(json.dumps(index, indent=1))
+            os.replace(tmp, self.index_path)
+
+    def path(self, name: str) -> pathlib.Path:
+        return self.dirpath / f"{name}{SUFFIX}"
+
+    def available(self) -> Dict[str, Dict[str, Any]]:
+        """Returns the published measurements, oldest first."""
+        try:
+            return json.loads(self.index_path.read_text())
+        except FileNotFoundError:
+            return {}
+
+    def publish(self, measurement: Any, name: Optional[str] = None) -> pathlib.Path:
+        """Writes measurement data and metadata into shared memory.
+
+        Args:
+            measurement: Measurement with a DataFrame
+            name: defaults to metadata.name, replaces a measurement with that name
+        """
+        name = name or measurement.metadata.name
+        path = self.path(name)
+        self.dirpath.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{path.name}.{os.getpid()}")
+        get_backend("feather").write(measurement.data, measurement.metadata, tmp)
+        os.replace(tmp, path)
+        with self._locked() as index:
+            index.pop(name, None)
+            index[name] = dict(
+                rows=len(measurement.data),
+                columns=[str(c) for c in measurement.data.columns],
+                nbytes=path.stat().st_size,
+                t=time.time(),
+                function=measurement.metadata.get("function"),
+            )
+            self._evict(index)
+        logger.info(f"Published {name} to {path}")
+        return path
+
+    def _evict(self, index: Dict[str, Dict[str, Any]]) -> None:
+        while len(index) > 1 and sum(e["nbytes"] for e in index.values()) > (
+            self.max_bytes
+        ):
+            name = next(iter(index))
+            del index[name]
+            _unlink(self.path(name))
+            logger.info(f"Unpublished {name}, share is over {self.max_bytes} bytes")
+
+    def attach(self, name: str) -> "LazyMeasurement":  # noqa: F821
+        """Returns a published measurement, memory mapped without copies.
+
+        Args:
+            name: published name
+        """
+        from plab.measurement import LazyMeasurement
+
+        path = self.path(name)
+        if not path.exists():
+            raise KeyError(f"{name!r} is not published in {self.dirpath}")
+        backend = get_backend("feather")
+        data = backend.open(path)
+        return LazyMeasurement(data=data, metadata=backend.read_metadata(path))
+
+    def remove(self, name: str) -> None:
+        with self._locked() as index:
+            index.pop(name, None)
+            _unlink(self.path(name))
+
+    def clear(self) -> None:
+        with self._locked() as index:
+            for name in list(index):
+                _unlink(self.path(name))
+            index.clear()
+
+
+SHARE = Share(**CONFIG.get("share", {}))
+
+
+def publish(measurement: Any, name: Optional[str] = None) -> pathlib.Path:
+    """Publishes a measurement to the default SHARE."""
+    return SHARE.publish(measurement, name)
+
+
+def attach(name: str) -> Any:
+    """Attaches a measurement of the default SHARE."""
+    return SHARE.attach(name)
+
+
+def available() -> Dict[str, Dict[str, Any]]:
+    """Returns the measurements of the default SHARE."""
+    return SHARE.available()
+
+
+__all__ = ["SHARE", "Share", "attach", "available", "publish"]
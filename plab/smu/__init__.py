@@ -1,6 +1,16 @@
-from plab.smu.plot_iv import plot_iv
-from plab.smu.plot_iv import plot_iv_max
-from plab.smu.sweep_voltage import sweep_voltage
+from plab.lazy import lazy_dir, lazy_getattr
 
+_ATTRIBUTES = {
+    "IVRenderer": "render",
+    "features": "analysis",
+    "features_many": "analysis",
+    "plot_iv": "plot_iv",
+    "plot_iv_max": "plot_iv",
+    "render_many": "render",
+    "sweep_voltage": "sweep_voltage",
+    "sweep_voltage_sharded": "sweep_voltage",
+}
 
-__all__ = ["plot_iv", "plot_iv_max", "sweep_voltage"]
+__all__ = list(_ATTRIBUTES)
+__getattr__ = lazy_getattr(__name__, _ATTRIBUTES)
+__dir__ = lazy_dir(globals(), _ATTRIBUTES)
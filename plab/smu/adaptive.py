@@ -0,0 +1,108 @@
+"""Adaptive sweep: few points where the curve is flat, many where it bends.
+
+Starts with a coarse grid of `n_initial` points, then repeatedly measures the
+midpoint of the interval with the largest loss until every loss is below
+`tolerance` or `max_points` are measured. On the curve normalized to the
+measured x and y ranges, the loss of an interval is:
+
+- its |dy| (steep slope)
+- plus the slope change to its neighbors (curvature) times its width
+
+Intervals narrower than `min_step` are not split. With `ymax`, the sweep
+stops going up at the first point where |y| >= ymax (compliance). The curve
+ends at the lowest point over ymax found while refining.
+"""
+
+from typing import Callable, List, Optional
+import dataclasses
+
+import numpy as np
+
+STOP_CONVERGED = "converged"
+STOP_BUDGET = "max_points"
+STOP_YMAX = "ymax"
+
+
+@dataclasses.dataclass
+class AdaptiveResult:
+    x: np.ndarray
+    y: np.ndarray
+    stop: str
+
+
+def _losses(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """Returns the loss of each interval [x[k], x[k+1]]."""
+    xn = (x - x[0]) / max(x[-1] - x[0], np.finfo(float).tiny)
+    yspan = y.max() - y.min()
+    yn = (y - y.min()) / yspan if yspan > 0 else np.zeros_like(y)
+    dx = np.diff(xn)
+    dy = np.diff(yn)
+    slopes = dy / np.maximum(dx, np.finfo(float).tiny)
+    bend = np.zeros_like(dx)
+    if len(dx) > 1:
+        change = np.abs(np.diff(slopes))
+        bend[:-1] = np.maximum(bend[:-1], change)
+        bend[1:] = np.maximum(bend[1:], change)
+    return np.abs(dy) + bend * dx
+
+
+def adaptive_sweep(
+    measure: Callable[[float], float],
+    xmin: float,
+    xmax: float,
+    n_initial: int = 5,
+    max_points: int = 50,
+    tolerance: float = 0.02,
+    min_step: Optional[float] = None,
+    ymax: Optional[float] = None,
+    stop: Optional[Callable[[List[float]], Optional[str]]] = None,
+) -> AdaptiveResult:
+    """Measures y = measure(x) on an adaptive grid between xmin and xmax.
+
+    Args:
+        measure: sets x and returns the measured y
+        xmin: first x
+        xmax: last x
+        n_initial: points of the initial coarse grid
+        max_points: point budget
+        tolerance: max interval loss (normalized |dy| + curvature)
+        min_step: narrowest interval to split, defaults to (xmax - xmin) / 1e4
+        ymax: stops at the first |y| >= ymax going up the coarse grid
+        stop: returns a stop reason for the coarse grid y so far, or None.
+            Curves stopped below ymax are not refined.
+    """
+    min_step = min_step if min_step is not None else abs(xmax - xmin) / 1e4
+    xs: List[float] = []
+    ys: List[float] = []
+    reason = STOP_CONVERGED
+    for x in np.linspace(xmin, xmax, max(min(n_initial, max_points), 2)):
+        xs.append(float(x))
+        ys.append(float(measure(float(x))))
+        over = ymax is not None and abs(ys[-1]) >= ymax
+        stopped = stop(ys) if stop is not None else None
+        if stopped is not None and not over:
+            return AdaptiveResult(x=np.array(xs), y=np.array(ys), stop=stopped)
+        if over:
+            reason = stopped or STOP_YMAX
+            break
+
+    while len(xs) < max_points and len(xs) > 1:
+        x, y = np.array(xs), np.array(ys)
+        losses = _losses(x, y)
+        losses[np.abs(np.diff(x)) <= min_step] = 0
+        k = int(np.argmax(losses))
+        if losses[k] <= tolerance:
+            break
+        xmid = (x[k] + x[k + 1]) / 2
+        xs.insert(k + 1, float(xmid))
+        ys.insert(k + 1, float(measure(float(xmid))))
+        if ymax is not None and abs(ys[k + 1]) >= ymax:
+            del xs[k + 2 :], ys[k + 2 :]
+    else:
+        if len(xs) >= max_points and reason == STOP_CONVERGED:
+            reason = STOP_BUDGET
+
+    return AdaptiveResult(x=np.array(xs), y=np.array(ys), stop=reason)
+
+
+__all__ = ["AdaptiveResult", "adaptive_sweep"]
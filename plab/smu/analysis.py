@@ -0,0 +1,174 @@
+"""IV features of all channels at once.
+
+```
+from plab.smu.analysis import features, features_many
+
+m = sweep_voltage(vmax=2, channels=64)
+features(m.data)                     # one row per channel
+features_many(Collection.from_query(function="sweep_voltage"))
+```
+
+The i_{channel} columns of a sweep are one (voltage x channel) array and
+every feature is a NumPy reduction over the voltage axis. NaN currents
+(stopped channels, adaptive grids) are ignored. Features, in the sweep units:
+
+- points: measured points
+- imax: max |i|
+- vlast: last measured voltage
+- leakage: max |i| with |v| <= vleak
+- turn_on: voltage where |i| first reaches ion, interpolated
+- rs: series resistance, dv/di fitted on the points with |i| >= rs_fraction imax
+  and |i| >= ion
+- resistance: v/i fitted through the origin on all points
+- r_low, r_high: v/i at the first and last nonzero voltage (heaters heat up,
+  r_high > r_low)
+"""
+
+from typing import Any, Iterable, List, Mapping, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+FEATURES = (
+    "points",
+    "imax",
+    "vlast",
+    "leakage",
+    "turn_on",
+    "rs",
+    "resistance",
+    "r_low",
+    "r_high",
+)
+
+
+def channel_matrix(
+    df: pd.DataFrame, prefix: str = "i_"
+) -> Tuple[np.ndarray, np.ndarray, List[int]]:
+    """Returns voltages (n_v,), currents (n_v, n_channels) and channels.
+
+    Args:
+        df: sweep with {prefix}{channel} columns and voltages as index, or as
+            a v column (sweeps read back from csv)
+        prefix: column prefix
+    """
+    columns = [c for c in df.columns if str(c).startswith(prefix)]
+    channels = [int(str(c)[len(prefix) :]) for c in columns]
+    v = (df["v"] if "v" in df.columns else df.index).to_numpy(dtype=float)
+    i = df[columns].to_numpy(dtype=float).reshape(len(v), len(columns))
+    return v, i, channels
+
+
+def _max(values: np.ndarray, mask: np.ndarray) -> np.ndarray:
+    result = np.where(mask, values, -np.inf).max(axis=0, initial=-np.inf)
+    return np.where(np.isfinite(result), result, np.nan)
+
+
+def _at(values: np.ndarray, index: np.ndarray) -> np.ndarray:
+    return np.take_along_axis(values, index[None, :], axis=0)[0]
+
+
+def _slope(x: np.ndarray, y: np.ndarray, mask: np.ndarray) -> np.ndarray:
+    """Least squares dy/dx per column over the masked points."""
+    n = mask.sum(axis=0)
+    x = np.where(mask, x, 0.0)
+    y = np.where(mask, y, 0.0)
+    xm = x.sum(axis=0) / np.maximum(n, 1)
+    ym = y.sum(axis=0) / np.maximum(n, 1)
+    sxx = np.where(mask, (x - xm) ** 2, 0.0).sum(axis=0)
+    sxy = np.where(mask, (x - xm) * (y - ym), 0.0).sum(axis=0)
+    return np.where((n >= 2) & (sxx > 0), sxy / np.where(sxx > 0, sxx, 1), np.nan)
+
+
+def features(
+    df: pd.DataFrame,
+    ion: float = 1e-4,
+    vleak: float = 0.1,
+    rs_fraction: float = 0.5,
+) -> pd.DataFrame:
+    """Returns the IV features of every channel, one row per channel.
+
+    Args:
+        df: sweep_voltage data (index v, columns i_{channel})
+        ion: turn on current
+        vleak: max |voltage| of the leakage points
+        rs_fraction: series resistance fit on |i| >= rs_fraction * imax
+    """
+    v, i, channels = channel_matrix(df)
+    V = np.broadcast_to(v[:, None], i.shape)
+    finite = np.isfinite(i)
+    a = np.where(finite, np.abs(i), 0.0)
+    imax = _max(a, finite)
+
+    on = finite & (a >= ion)
+    k1 = on.argmax(axis=0)
+    k0 = np.maximum(k1 - 1, 0)
+    v0, v1 = v[k0], v[k1]
+    a0, a1 = _at(np.where(finite, a, np.nan), k0), _at(a, k1)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        interpolate = (k1 > 0) & np.isfinite(a0) & (a1 > a0)
+        t = np.where(interpolate, (ion - a0) / (a1 - a0), 1.0)
+        turn_on = np.where(on.any(axis=0), v0 + t * (v1 - v0), np.nan)
+
+        fit = on & (a >= rs_fraction * np.nan_to_num(imax))
+        rs = _slope(np.where(finite, i, 0.0), V, fit)
+
+        nonzero = finite & (V != 0)
+        vi = np.where(nonzero, V * i, 0.0).sum(axis=0)
+        resistance = np.where(
+            nonzero.any(axis=0) & (vi != 0),
+            np.where(nonzero, V * V, 0.0).sum(axis=0) / vi,
+            np.nan,
+        )
+
+        first = nonzero.argmax(axis=0)
+        last = len(v) - 1 - nonzero[::-1].argmax(axis=0)
+        has = nonzero.any(axis=0)
+        i_filled = np.where(finite, i, np.nan)
+        r_low = np.where(has, v[first] / _at(i_filled, first), np.nan)
+        r_high = np.where(has, v[last] / _at(i_filled, last), np.nan)
+
+    return pd.DataFrame(
+        dict(
+            points=finite.sum(axis=0),
+            imax=imax,
+            vlast=_max(V, finite),
+            leakage=_max(a, finite & (np.abs(V) <= vleak)),
+            turn_on=turn_on,
+            rs=rs,
+            resistance=resistance,
+            r_low=np.where(np.isfinite(r_low), r_low, np.nan),
+            r_high=np.where(np.isfinite(r_high), r_high, np.nan),
+        ),
+        index=pd.Index(channels, name="channel"),
+    )
+
+
+def features_many(
+    measurements: Union[Any, Mapping[str, Any], Iterable[Any]], **kwargs: Any
+) -> pd.DataFrame:
+    """Returns the features of many sweeps, indexed by (name, channel).
+
+    Args:
+        measurements: a plab.collection.Collection (read chunk by chunk),
+            {name: DataFrame or Measurement} or Measurements
+        kwargs: features arguments
+    """
+    if hasattr(measurements, "chunks"):
+        items = measurements.chunks()
+    elif isinstance(measurements, Mapping):
+        items = measurements.items()
+    else:
+        items = ((m.metadata.name, m) for m in measurements)
+
+    names, frames = [], []
+    for name, data in items:
+        names.append(name)
+        frames.append(features(getattr(data, "data", data), **kwargs))
+    if not frames:
+        return pd.DataFrame(columns=list(FEATURES))
+    return pd.concat(frames, keys=names, names=["name"])
+
+
+__all__ = ["FEATURES", "channel_matrix", "features", "features_many"]
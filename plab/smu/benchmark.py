@@ -0,0 +1,99 @@
+"""Sweep throughput of the sweep_voltage modes on a simulated SMU.
+
+```
+python -m plab.smu.benchmark --channels 32 --vsteps 21 --latency 2e-3
+```
+
+Reports per mode the points measured, serial transactions, simulated I/O
+time, wall time and points per second (of the wall time, sleeping for the
+latency with --sleep, else of the simulated I/O time).
+"""
+
+from typing import Optional, Sequence
+import itertools
+import time
+
+import pandas as pd
+
+from plab.smu.simulator import DEVICES, SimulatedSMU
+from plab.smu.sweep_voltage import SWEEP_MODES, sweep_voltage
+
+
+def benchmark(
+    modes: Sequence[str] = SWEEP_MODES,
+    n_chs: int = 16,
+    vmax: float = 2.0,
+    vsteps: int = 21,
+    latency: float = 2e-3,
+    sleep: bool = False,
+    devices: Optional[Sequence[str]] = None,
+    **kwargs,
+) -> pd.DataFrame:
+    """Returns the throughput of each sweep mode, one row per mode.
+
+    Args:
+        modes: sweep_voltage modes
+        n_chs: channels to sweep
+        vmax: max voltage
+        vsteps: voltage steps (adaptive: initial steps)
+        latency: seconds per serial transaction
+        sleep: sleeps for the latency, else only counts it
+        devices: device names cycled over the channels, defaults to all kinds
+        kwargs: more sweep_voltage arguments (group_size, max_points, imax...)
+    """
+    kinds = list(itertools.islice(itertools.cycle(devices or DEVICES), n_chs))
+    rows = []
+    for mode in modes:
+        smu = SimulatedSMU(devices=kinds, latency=latency, sleep=sleep)
+        t0 = time.perf_counter()
+        m = sweep_voltage(
+            vmax=vmax,
+            vsteps=vsteps,
+            channels=n_chs,
+            get_instrument=lambda: smu,
+            mode=mode,
+            **kwargs,
+        )
+        wall = time.perf_counter() - t0
+        points = int(m.data.notna().sum().sum())
+        elapsed = wall if sleep else smu.time
+        rows.append(
+            dict(
+                mode=mode,
+                points=points,
+                transactions=smu.transactions,
+                io=smu.time,
+                wall=wall,
+                points_per_s=points / elapsed if elapsed else float("inf"),
+            )
+        )
+    return pd.DataFrame(rows).set_index("mode")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--modes", nargs="+", default=list(SWEEP_MODES))
+    parser.add_argument("--channels", type=int, default=16)
+    parser.add_argument("--vmax", type=float, default=2.0)
+    parser.add_argument("--vsteps", type=int, default=21)
+    parser.add_argument("--latency", type=float, default=2e-3)
+    parser.add_argument("--sleep", action="store_true", help="sleep the latency")
+    parser.add_argument("--devices", nargs="+", choices=list(DEVICES))
+    parser.add_argument("--max-points", type=int, default=50)
+    parser.add_argument("--imax", type=float, help="stop current")
+    args = parser.parse_args()
+    print(
+        benchmark(
+            modes=args.modes,
+            n_chs=args.channels,
+            vmax=args.vmax,
+            vsteps=args.vsteps,
+            latency=args.latency,
+            sleep=args.sleep,
+            devices=args.devices,
+            max_points=args.max_points,
+            imax=args.imax,
+        ).to_string()
+    )
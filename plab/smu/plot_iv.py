@@ -1,14 +1,16 @@
 from typing import Iterable, Optional
+import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
 import plab
+from plab.smu.analysis import channel_matrix
 
 
 def plot_iv_max(df: pd.DataFrame, title: Optional[str] = None) -> None:
     """Plots max value for IV."""
-    x = range(len(df.keys()))
-    imax = [df[f"i_{i}"].max() for i in x]
-    plt.plot(x, imax, "o")
+    import matplotlib.pyplot as plt
+
+    _, currents, channels = channel_matrix(df)
+    plt.plot(channels, np.nanmax(currents, axis=0), "o")
     if title:
         plt.title(title)
     plt.xlabel("channel #")
@@ -16,7 +18,12 @@ def plot_iv_max(df: pd.DataFrame, title: Optional[str] = None) -> None:
 
 
 def plot_iv(df: pd.DataFrame, keys: Optional[Iterable[str]]) -> None:
-    """Plots all IV curves in separate plots."""
+    """Plots all IV curves in separate plots.
+
+    For many channels, plab.smu.render.IVRenderer draws them in one figure.
+    """
+    import matplotlib.pyplot as plt
+
     keys = keys or df.keys()
     for key in keys:
         plt.figure()
@@ -27,8 +34,7 @@ def plot_iv(df: pd.DataFrame, keys: Optional[Iterable[str]]) -> None:
 
 
 if __name__ == "__main__":
-    for csv in plab.config.PATH.labdata.glob("*.csv"):
-        print(csv.stem)
+    plab.config.ls()
 
     print("\a")
     # df = pd.read_csv("")
@@ -0,0 +1,235 @@
+"""Fast IV rendering: all channels in one figure, straight to PNG/SVG.
+
+```
+from plab.smu.render import IVRenderer, render_many
+
+IVRenderer().render(m.data, "iv.png")               # one LineCollection
+IVRenderer(layout="grid").render(m.data, "iv.svg")  # one panel per channel
+render_many(Collection.from_glob("*sweep_voltage*").paths, "plots")
+```
+
+- overlay: every channel is a segment of one LineCollection, colored by channel
+- grid: one reusable figure with a panel per channel (ncols per row)
+
+Figures are drawn with the Agg canvas, without pyplot or interactive
+backends. A renderer keeps its figure and only updates the line data, so
+rendering many sweeps with the same channels does not rebuild it. Curves
+longer than max_points are reduced to the min and max of each bucket, which
+keeps spikes and compliance steps. render_many renders stored measurements
+in worker processes, with one renderer per process.
+"""
+
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import concurrent.futures
+import math
+import pathlib
+
+import numpy as np
+import pandas as pd
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import LineCollection
+from matplotlib.figure import Figure
+
+from plab.smu.analysis import channel_matrix
+
+LAYOUTS = ("overlay", "grid")
+
+
+def downsample(
+    x: np.ndarray, y: np.ndarray, max_points: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Returns at most max_points per column, the min and max of each bucket.
+
+    Args:
+        x: (n,) sorted x
+        y: (n, columns) values, NaN allowed
+        max_points: points kept per column
+    """
+    n = len(x)
+    buckets = max(max_points // 2, 1)
+    if n <= max_points:
+        return x, y
+    size = math.ceil(n / buckets)
+    pad = size * buckets - n
+    xb = np.concatenate([x, np.full(pad, x[-1])]).reshape(buckets, size)
+    yb = np.concatenate([y, np.full((pad, y.shape[1]), np.nan)]).reshape(
+        buckets, size, y.shape[1]
+    )
+    empty = np.isnan(yb).all(axis=1)
+    filled = np.where(np.isnan(yb), np.inf, yb)
+    lo = np.where(empty, np.nan, filled.min(axis=1))
+    filled = np.where(np.isnan(yb), -np.inf, yb)
+    hi = np.where(empty, np.nan, filled.max(axis=1))
+    xs = np.stack([xb[:, 0], xb[:, -1]], axis=1).reshape(-1)
+    ys = np.stack([lo, hi], axis=1).reshape(-1, y.shape[1])
+    return xs, ys
+
+
+def _limits(values: np.ndarray) -> Tuple[float, float]:
+    finite = values[np.isfinite(values)]
+    if not len(finite):
+        return 0.0, 1.0
+    lo, hi = float(finite.min()), float(finite.max())
+    margin = (hi - lo) * 0.05 or abs(hi) * 0.05 or 1.0
+    return lo - margin, hi + margin
+
+
+class IVRenderer:
+    """Draws all the channels of IV sweeps into one reusable figure.
+
+    Args:
+        layout: overlay (one LineCollection) or grid (one panel per channel)
+        ncols: grid panels per row
+        max_points: points per curve, longer curves are downsampled
+        scale: current scale, 1e3 plots mA
+        panel_size: grid panel (width, height) in inches
+        figsize: overlay figure size in inches
+        dpi: PNG resolution
+        cmap: overlay colormap, by channel
+    """
+
+    def __init__(
+        self,
+        layout: str = "overlay",
+        ncols: int = 8,
+        max_points: int = 2000,
+        scale: float = 1e3,
+        panel_size: Tuple[float, float] = (2.0, 1.5),
+        figsize: Tuple[float, float] = (8.0, 5.0),
+        dpi: int = 100,
+        cmap: str = "viridis",
+    ) -> None:
+        if layout not in LAYOUTS:
+            raise ValueError(f"Unknown layout {layout!r}, try {LAYOUTS}")
+        self.layout = layout
+        self.ncols = ncols
+        self.max_points = max_points
+        self.scale = scale
+        self.panel_size = panel_size
+        self.figsize = figsize
+        self.dpi = dpi
+        self.cmap = cmap
+        self.figure: Optional[Figure] = None
+        self._channels: Optional[List[int]] = None
+        self._artists: List[Any] = []
+
+    def _setup(self, channels: List[int]) -> None:
+        if self.figure is not None and channels == self._channels:
+            return
+        if self.layout == "overlay":
+            figure = Figure(figsize=self.figsize, dpi=self.dpi)
+            ax = figure.add_subplot()
+            collection = LineCollection([], cmap=self.cmap, linewidths=0.8)
+            collection.set_array(np.asarray(channels, dtype=float))
+            ax.add_collection(collection)
+            figure.colorbar(collection, ax=ax, label="channel")
+            ax.set_xlabel("V")
+            ax.set_ylabel("I (mA)" if self.scale == 1e3 else "I")
+            self._artists = [collection]
+        else:
+            ncols = min(self.ncols, len(channels))
+            nrows = math.ceil(len(channels) / ncols)
+            width, height = self.panel_size
+            figure = Figure(figsize=(width * ncols, height * nrows), dpi=self.dpi)
+            axes = figure.subplots(nrows, ncols, sharex=True, squeeze=False).ravel()
+            self._artists = []
+            for ax, channel in zip(axes, channels):
+                (line,) = ax.plot([], [], linewidth=0.8)
+                ax.set_title(f"i_{channel}", fontsize="small")
+                ax.tick_params(labelsize="x-small")
+                self._artists.append(line)
+            for ax in axes[len(channels) :]:
+                ax.set_visible(False)
+            figure.supxlabel("V")
+            figure.supylabel("I (mA)" if self.scale == 1e3 else "I")
+        FigureCanvasAgg(figure)
+        self.figure = figure
+        self._channels = channels
+
+    def render(
+        self,
+        df: pd.DataFrame,
+        path: Optional[pathlib.Path] = None,
+        title: Optional[str] = None,
+    ) -> Figure:
+        """Draws a sweep (index v, columns i_{channel}) and returns the figure.
+
+        Args:
+            df: sweep data
+            path: writes the figure, format from the suffix (.png, .svg, .pdf)
+            title: figure title
+        """
+        v, i, channels = channel_matrix(df)
+        v, i = downsample(v, i * self.scale, self.max_points)
+        self._setup(channels)
+        figure = self.figure
+
+        if self.layout == "overlay":
+            (collection,) = self._artists
+            segments = np.empty((len(channels), len(v), 2))
+            segments[:, :, 0] = v
+            segments[:, :, 1] = i.T
+            collection.set_segments(list(segments))
+            ax = collection.axes
+            ax.set_xlim(*_limits(v))
+            ax.set_ylim(*_limits(i))
+        else:
+            for line, column in zip(self._artists, i.T):
+                line.set_data(v, column)
+                line.axes.set_xlim(*_limits(v))
+                line.axes.set_ylim(*_limits(column))
+
+        figure.suptitle(title or "")
+        if path is not None:
+            path = pathlib.Path(path)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            figure.savefig(path, dpi=self.dpi)
+        return figure
+
+
+_RENDERERS: Dict[Tuple[Tuple[str, Any], ...], IVRenderer] = {}
+
+
+def _render_file(
+    path: pathlib.Path, target: pathlib.Path, kwargs: Dict[str, Any]
+) -> pathlib.Path:
+    """Renders one stored measurement, reusing the renderer of this process."""
+    from plab.collection import read
+
+    key = tuple(sorted(kwargs.items()))
+    renderer = _RENDERERS.get(key)
+    if renderer is None:
+        renderer = _RENDERERS[key] = IVRenderer(**kwargs)
+    renderer.render(read(path), target, title=target.stem)
+    return target
+
+
+def render_many(
+    paths: Iterable[pathlib.Path],
+    dirpath: pathlib.Path,
+    fmt: str = "png",
+    max_workers: Optional[int] = None,
+    **kwargs: Any,
+) -> List[pathlib.Path]:
+    """Renders stored measurements in worker processes.
+
+    Args:
+        paths: stored sweeps (see plab.collection)
+        dirpath: output directory, one {stem}.{fmt} per measurement
+        fmt: png, svg or pdf
+        max_workers: processes, defaults to the number of CPUs
+        kwargs: IVRenderer arguments
+    """
+    dirpath = pathlib.Path(dirpath)
+    dirpath.mkdir(parents=True, exist_ok=True)
+    paths = [pathlib.Path(path) for path in paths]
+    targets = [dirpath / f"{path.stem}.{fmt}" for path in paths]
+    with concurrent.futures.ProcessPoolExecutor(max_workers) as pool:
+        futures = [
+            pool.submit(_render_file, path, target, kwargs)
+            for path, target in zip(paths, targets)
+        ]
+        return [future.result() for future in futures]
+
+
+__all__ = ["IVRenderer", "downsample", "render_many"]
@@ -0,0 +1,237 @@
+"""Simulated qontrol SMU, to run and benchmark sweeps without hardware.
+
+```
+from plab.smu.simulator import SimulatedSMU
+from plab.smu.sweep_voltage import sweep_voltage
+
+smu = SimulatedSMU(devices=["diode", "resistor", "open", "short", "heater"])
+m = sweep_voltage(vmax=2, channels=5, get_instrument=lambda: smu)
+```
+
+SimulatedSMU has the QXOutput interface used by the sweeps: `v` and `i`
+channel vectors (int or slice), `set_all_values`, `get_all_values` (unsigned,
+like the qontrol all-channel readback), `n_chs` and `imax` compliance. Each channel drives a device model:
+
+- resistor: i = v / r
+- diode: i = i_s (exp(v / (n vt)) - 1)
+- open: leakage only
+- short: 1 mOhm, so the current sits at the compliance
+- heater: resistance r0 (1 + alpha T), T lags the dissipated power with time
+  constant tau
+
+Every command is one serial transaction: the simulated clock advances by
+`latency` (and sleeps for it with `sleep=True`). Single channel access
+costs one transaction per channel, like QXOutput.
+"""
+
+from typing import Any, List, Optional, Sequence, Union
+import dataclasses
+import math
+import time
+
+import numpy as np
+
+from plab.config import logger
+
+
+@dataclasses.dataclass
+class Resistor:
+    r: float = 1e3
+
+    def current(self, v: float, t: float) -> float:
+        return v / self.r
+
+
+@dataclasses.dataclass
+class Diode:
+    i_s: float = 1e-12
+    n: float = 1.5
+    vt: float = 0.02585
+
+    def current(self, v: float, t: float) -> float:
+        return self.i_s * math.expm1(min(v / (self.n * self.vt), 700.0))
+
+
+@dataclasses.dataclass
+class Open:
+    leakage: float = 1e-9
+
+    def current(self, v: float, t: float) -> float:
+        return self.leakage * float(np.sign(v))
+
+
+@dataclasses.dataclass
+class Short(Resistor):
+    r: float = 1e-3
+
+
+@dataclasses.dataclass
+class Heater:
+    """Thermo-optic heater, heating up with a first order lag.
+
+    Args:
+        r0: cold resistance [Ohm]
+        alpha: resistance temperature coefficient [1/K]
+        rth: thermal resistance [K/W]
+        tau: thermal time constant [s]
+    """
+
+    r0: float = 1e3
+    alpha: float = 4e-3
+    rth: float = 2e3
+    tau: float = 50e-3
+    temperature: float = 0.0
+    t: Optional[float] = None
+
+    def current(self, v: float, t: float) -> float:
+        if self.t is not None:
+            r = self.r0 * (1 + self.alpha * self.temperature)
+            steady = self.rth * v**2 / r
+            decay = math.exp(-(t - self.t) / self.tau)
+            self.temperature = steady + (self.temperature - steady) * decay
+        self.t = t
+        return v / (self.r0 * (1 + self.alpha * self.temperature))
+
+
+DEVICES = dict(resistor=Resistor, diode=Diode, open=Open, short=Short, heater=Heater)
+
+
+def device(kind: Union[str, Any]) -> Any:
+    """Returns a device model from its name, or the model itself."""
+    if isinstance(kind, str):
+        if kind not in DEVICES:
+            raise ValueError(f"Unknown device {kind!r}, try {list(DEVICES)}")
+        return DEVICES[kind]()
+    return kind
+
+
+class _ChannelVector:
+    """Channel values with one transaction per channel accessed."""
+
+    def __init__(self, smu: "SimulatedSMU", para: str) -> None:
+        self.smu = smu
+        self.para = para
+
+    def __len__(self) -> int:
+        return self.smu.n_chs
+
+    def _channels(self, key: Union[int, slice]) -> List[int]:
+        if isinstance(key, slice):
+            return list(range(self.smu.n_chs))[key]
+        if not -self.smu.n_chs <= key < self.smu.n_chs:
+            raise IndexError(f"channel {key} not in 0..{self.smu.n_chs - 1}")
+        return [key % self.smu.n_chs]
+
+    def __getitem__(self, key: Union[int, slice]) -> Union[float, List[float]]:
+        values = [self.smu.get_value(ch, self.para) for ch in self._channels(key)]
+        return values if isinstance(key, slice) else values[0]
+
+    def __setitem__(self, key: Union[int, slice], value: Any) -> None:
+        channels = self._channels(key)
+        values = value if np.ndim(value) else [value] * len(channels)
+        if len(values) != len(channels):
+            raise ValueError(f"{len(values)} values for {len(channels)} channels")
+        for ch, v in zip(channels, values):
+            self.smu.set_value(ch, self.para, v)
+
+    def __iter__(self):
+        return iter(self[:])
+
+
+class SimulatedSMU:
+    """Voltage source with current readback per channel, like qontrol QXOutput.
+
+    Args:
+        devices: device model or name per channel, defaults to resistors
+        n_chs: number of channels when devices is None
+        latency: seconds per serial transaction
+        sleep: sleeps for the latency, for wall time benchmarks
+        imax: current compliance [A]
+        vmax: max voltage [V]
+        serial_port_name: label only
+    """
+
+    def __init__(
+        self,
+        devices: Optional[Sequence[Union[str, Any]]] = None,
+        n_chs: int = 8,
+        latency: float = 2e-3,
+        sleep: bool = False,
+        imax: Optional[float] = 50e-3,
+        vmax: float = 10.0,
+        serial_port_name: str = "simulated",
+    ) -> None:
+        devices = devices if devices is not None else ["resistor"] * n_chs
+        self.devices = [device(kind) for kind in devices]
+        self.n_chs = len(self.devices)
+        self.latency = latency
+        self.sleep = sleep
+        self.imax = imax
+        self.vmax = vmax
+        self.serial_port_name = serial_port_name
+        self.device_id = "Q8iv-SIM"
+        self.firmware = "simulated"
+        self.voltages = np.zeros(self.n_chs)
+        self.time = 0.0
+        self.transactions = 0
+        self.v = _ChannelVector(self, "V")
+        self.i = _ChannelVector(self, "I")
+
+    def _transaction(self) -> None:
+        self.transactions += 1
+        self.time += self.latency
+        if self.sleep and self.latency > 0:
+            time.sleep(self.latency)
+
+    def _current(self, ch: int) -> float:
+        current = self.devices[ch].current(float(self.voltages[ch]), self.time)
+        if self.imax is not None:
+            current = max(-self.imax, min(self.imax, current))
+        return current
+
+    def set_value(self, ch: int, para: str = "V", new: float = 0) -> None:
+        if para.upper() != "V":
+            raise ValueError(f"Only voltage can be set, not {para!r}")
+        self._transaction()
+        self.voltages[ch] = max(-self.vmax, min(self.vmax, float(new)))
+
+    def get_value(self, ch: int, para: str = "V") -> float:
+        self._transaction()
+        return float(self.voltages[ch]) if para.upper() == "V" else self._current(ch)
+
+    def set_all_values(self, para: str = "V", values: Any = 0) -> None:
+        values = values if np.ndim(values) else [values] * self.n_chs
+        if len(values) != self.n_chs:
+            raise AttributeError(f"{len(values)} values for {self.n_chs} channels")
+        self._transaction()
+        self.voltages[:] = np.clip(values, -self.vmax, self.vmax)
+
+    def get_all_values(self, para: str = "V") -> List[float]:
+        self._transaction()
+        if para.upper() == "V":
+            return list(self.voltages)
+        # the qontrol all-channel readback has no sign
+        return [abs(self._current(ch)) for ch in range(self.n_chs)]
+
+    def close(self) -> None:
+        pass
+
+
+def simulated_smu(serial_port_name: str = "simulated", **kwargs: Any) -> SimulatedSMU:
+    """Returns a new SimulatedSMU, as get_instrument for the sweeps."""
+    smu = SimulatedSMU(serial_port_name=serial_port_name, **kwargs)
+    logger.info(f"Simulated SMU with {smu.n_chs} channels on {serial_port_name}")
+    return smu
+
+
+__all__ = [
+    "DEVICES",
+    "Diode",
+    "Heater",
+    "Open",
+    "Resistor",
+    "Short",
+    "SimulatedSMU",
+    "device",
+    "simulated_smu",
+]
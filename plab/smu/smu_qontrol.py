@@ -1,18 +1,59 @@
-from typing import Iterable, Union, Optional
-from time import strftime, localtime
-import pandas as pd
-import numpy as np
-from tqdm import tqdm
-import qontrol
+"""Qontrol SMU sessions.
+
+`smu_qontrol()` returns one open QXOutput per serial port for the whole
+process, so helpers that call it per channel do not repeat the serial
+handshake. Configure the sessions with CONFIG.qontrol_sessions
+(check_interval).
+
+connect_qontrol records every controller in CONFIG.qontrol keyed by serial
+port, so the metadata of a measurement names all the controllers it used:
+
+```
+qontrol:
+  /dev/ttyUSB0: {device_id: Q8iv-0001, n_chs: 64, serial_port_name: /dev/ttyUSB0}
+  /dev/ttyUSB1: {device_id: Q8iv-0002, n_chs: 64, serial_port_name: /dev/ttyUSB1}
+```
+
+Measurements stored before held one controller as
+`qontrol: {device_id, n_chs, serial_port_name}`. `qontrol_devices` reads both
+shapes, and catalog queries on the older measurements use
+`config.qontrol.device_id` while newer ones use
+`config.qontrol.{serial_port_name}.device_id`.
+"""
+
+from typing import Any, Callable, Dict, Optional, Tuple
+import atexit
+import functools
+import threading
+import time
+
+from omegaconf import OmegaConf
+
 from plab.config import logger, CONFIG
-from plab.measurement import measurement, Measurement
+from plab.profiler import profile_calls
 
+_CONFIG_LOCK = threading.Lock()
+
+
+def _command(command_id: Any = "", ch: Any = None, operator: str = "", **kwargs) -> str:
+    return f"{command_id}{operator}"
+
+
+def _binary_command(command_id: Any = "", *args, RW: int = 0, **kwargs) -> str:
+    return f"binary_{command_id}_{'read' if RW else 'write'}"
 
-def smu_qontrol(serial_port_name: str = "/dev/ttyUSB0", imax: Optional[float] = 50e-3):
-    """Returns qontrol SMU.
+
+def connect_qontrol(
+    serial_port_name: str = "/dev/ttyUSB0", imax: Optional[float] = 50e-3
+):
+    """Opens a new qontrol SMU connection (handshake, firmware and channels).
+
+    The device info of each controller is kept in CONFIG.qontrol[serial_port_name].
 
     https://github.com/takeqontrol/api
     """
+    import qontrol
+
     q = qontrol.QXOutput(
         serial_port_name=serial_port_name, response_timeout=0.1, imax=imax
     )
@@ -23,9 +64,157 @@ def smu_qontrol(serial_port_name: str = "/dev/ttyUSB0", imax: Optional[float] =
     device_info = dict(
         device_id=q.device_id, n_chs=q.n_chs, serial_port_name=serial_port_name
     )
-    CONFIG.qontrol = device_info
+    with _CONFIG_LOCK:
+        if CONFIG.get("qontrol") is None:
+            CONFIG.qontrol = {}
+        CONFIG.qontrol[serial_port_name] = device_info
+    q.issue_command = profile_calls(q.issue_command, "qontrol", _command)
+    q.issue_binary_command = profile_calls(
+        q.issue_binary_command, "qontrol", _binary_command
+    )
     return q
 
 
+def qontrol_devices(config: Any) -> Dict[str, Dict[str, Any]]:
+    """Returns the qontrol device info of a config by serial port.
+
+    Args:
+        config: CONFIG or the config of stored metadata, in either shape
+    """
+    devices = config.get("qontrol") or {}
+    if OmegaConf.is_config(devices):
+        devices = OmegaConf.to_container(devices)
+    if "device_id" in devices:
+        return {devices.get("serial_port_name"): devices}
+    return dict(devices)
+
+
+def _probe(q) -> None:
+    """Raises if the instrument does not answer a query (one transaction)."""
+    if q.serial_port is None or not q.serial_port.is_open:
+        raise ConnectionError(f"{q.serial_port_name} is closed")
+    if not q.issue_command("vfull", operator="?", n_lines_requested=1):
+        raise ConnectionError(f"{q.serial_port_name} does not answer")
+
+
+class Sessions:
+    """Open instruments keyed by serial port, shared by the whole process.
+
+    `get` returns the open instrument of a port. It is probed at most every
+    check_interval seconds and reconnected when the probe fails or the
+    settings change. An I/O call (io_methods) that raises invalidates the
+    session, so the next get probes it right away. All sessions are closed
+    at exit.
+
+    Args:
+        connect: opens an instrument, called with serial_port_name and settings
+        probe: raises if an instrument is not healthy
+        check_interval: seconds between probes of a session
+        io_methods: instrument methods that talk to the port
+    """
+
+    def __init__(
+        self,
+        connect: Callable[..., Any] = connect_qontrol,
+        probe: Callable[[Any], None] = _probe,
+        check_interval: float = 60.0,
+        io_methods: Tuple[str, ...] = ("issue_command", "issue_binary_command"),
+    ) -> None:
+        self.connect = connect
+        self.probe = probe
+        self.check_interval = check_interval
+        self.io_methods = io_methods
+        self._sessions: Dict[str, Tuple[Any, Dict[str, Any], float]] = {}
+        self._lock = threading.RLock()
+
+    def get(self, serial_port_name: str, **settings: Any) -> Any:
+        """Returns the open instrument of a port, connecting if needed.
+
+        Args:
+            serial_port_name: port
+            settings: connect arguments, a change reconnects
+        """
+        with self._lock:
+            session = self._sessions.get(serial_port_name)
+            if session is not None:
+                q, session_settings, checked = session
+                if session_settings == settings and self._healthy(q, checked):
+                    self._sessions[serial_port_name] = (q, settings, time.time())
+                    return q
+                logger.info(f"Reconnecting {serial_port_name}")
+                self.close(serial_port_name)
+            q = self.connect(serial_port_name=serial_port_name, **settings)
+            self._watch(q, serial_port_name)
+            self._sessions[serial_port_name] = (q, settings, time.time())
+            return q
+
+    def _watch(self, q: Any, serial_port_name: str) -> None:
+        """Invalidates the session when one of its I/O calls raises."""
+        for name in self.io_methods:
+            method = getattr(q, name, None)
+            if method is None:
+                continue
+
+            @functools.wraps(method)
+            def call(*args, _method=method, **kwargs):
+                try:
+                    return _method(*args, **kwargs)
+                except Exception:
+                    self.invalidate(serial_port_name)
+                    raise
+
+            setattr(q, name, call)
+
+    def _healthy(self, q: Any, checked: float) -> bool:
+        if time.time() - checked < self.check_interval:
+            return True
+        try:
+            self.probe(q)
+        except Exception as error:
+            logger.warning(f"Session check failed: {error!r}")
+            return False
+        return True
+
+    def invalidate(self, serial_port_name: str) -> None:
+        """Forces a probe on the next get, for example after an I/O error."""
+        with self._lock:
+            session = self._sessions.get(serial_port_name)
+            if session is not None:
+                self._sessions[serial_port_name] = session[:2] + (0.0,)
+
+    def close(self, serial_port_name: Optional[str] = None) -> None:
+        """Closes one session, or all of them."""
+        with self._lock:
+            ports = (
+                list(self._sessions) if serial_port_name is None else [serial_port_name]
+            )
+            for port in ports:
+                session = self._sessions.pop(port, None)
+                if session is None:
+                    continue
+                try:
+                    session[0].close()
+                except Exception as error:
+                    logger.warning(f"Closing {port} failed: {error!r}")
+
+    def __contains__(self, serial_port_name: str) -> bool:
+        return serial_port_name in self._sessions
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+
+SESSIONS = Sessions(**CONFIG.get("qontrol_sessions", {}))
+atexit.register(SESSIONS.close)
+
+
+def smu_qontrol(serial_port_name: str = "/dev/ttyUSB0", imax: Optional[float] = 50e-3):
+    """Returns the qontrol SMU session of a port, connecting on first use.
+
+    https://github.com/takeqontrol/api
+    """
+    return SESSIONS.get(serial_port_name, imax=imax)
+
+
 if __name__ == "__main__":
     q = smu_qontrol()
@@ -0,0 +1,68 @@
+"""Per-channel early stop criteria for SMU sweeps.
+
+A channel stops, is set to 0 V and keeps NaN for the remaining points when:
+
+- compliance: |i| reaches the SMU current limit (smu_qontrol imax), within
+  COMPLIANCE_MARGIN, as for shorted devices
+- imax: |i| reaches a current threshold
+- open: |i| <= iopen for the first open_points points, as for open devices
+
+Currents are in the units of the SMU readback.
+"""
+
+from typing import Optional, Sequence
+import dataclasses
+
+import numpy as np
+
+STOP_COMPLIANCE = "compliance"
+STOP_IMAX = "imax"
+STOP_OPEN = "open"
+COMPLIANCE_MARGIN = 0.98
+
+
+@dataclasses.dataclass
+class StopCriteria:
+    """Early stop criteria, None disables a criterion.
+
+    Args:
+        compliance: SMU current limit
+        imax: current threshold
+        open_points: points without current before a channel is open
+        iopen: max |current| of an open channel
+    """
+
+    compliance: Optional[float] = None
+    imax: Optional[float] = None
+    open_points: Optional[int] = None
+    iopen: float = 1e-6
+
+    @property
+    def ymax(self) -> Optional[float]:
+        """Lowest |current| that stops a channel."""
+        limits = [] if self.imax is None else [self.imax]
+        if self.compliance is not None:
+            limits.append(COMPLIANCE_MARGIN * self.compliance)
+        return min(limits) if limits else None
+
+    def check(self, currents: Sequence[float]) -> Optional[str]:
+        """Returns the stop reason of a channel or None to go on.
+
+        Args:
+            currents: channel currents measured so far, last one included
+        """
+        i = abs(currents[-1])
+        if self.compliance is not None and i >= COMPLIANCE_MARGIN * self.compliance:
+            return STOP_COMPLIANCE
+        if self.imax is not None and i >= self.imax:
+            return STOP_IMAX
+        if (
+            self.open_points
+            and len(currents) == self.open_points
+            and np.all(np.abs(currents) <= self.iopen)
+        ):
+            return STOP_OPEN
+        return None
+
+
+__all__ = ["StopCriteria"]
@@ -1,17 +1,37 @@
-from typing import Iterable, Union, Optional
-from time import strftime, localtime
+"""Current sweeps with voltage readback on a qontrol q8iv.
+
+mode:
+
+- sequential: np.linspace(imin, imax, steps) per channel
+- adaptive: starts from steps points and adds points where the voltage bends
+  (see plab.smu.adaptive), up to max_points per channel. Each channel gets
+  its own currents, so the DataFrame index is their union with NaN where a
+  channel was not measured.
+"""
+
+from typing import Callable, Iterable, Union
 import pandas as pd
 import numpy as np
 from tqdm import tqdm
-import qontrol
-from plab.config import logger, CONFIG
-from plab.measurement import measurement, Measurement
-from plab.smu.smu_control import smu_control
+from plab.config import logger
+from plab.measurement import measurement
+from plab.smu.adaptive import adaptive_sweep
+from plab.smu.smu_qontrol import smu_qontrol
+from plab.smu.sweep_voltage import zero_voltage
+
+SWEEP_MODES = ("sequential", "adaptive")
 
 
 @measurement
 def sweep_current(
-    imin: float = 0, imax: float = 50e-3, steps: int = 20, n: int = 1
+    imin: float = 0,
+    imax: float = 50e-3,
+    steps: int = 20,
+    n: Union[Iterable[int], int] = 1,
+    get_instrument: Callable = smu_qontrol,
+    mode: str = "sequential",
+    max_points: int = 50,
+    tolerance: float = 0.02,
 ) -> pd.DataFrame:
     """Sweep current and measure voltage. works only for q8iv
 
@@ -19,44 +39,44 @@ def sweep_current(
         imin: min current
         imax: max current
         steps: number of steps
-        n: number of channels to sweep
+        n: number of channels to sweep or specific channels (iterable)
+        mode: sequential or adaptive (refined grid)
+        max_points: adaptive mode point budget per channel
+        tolerance: adaptive mode max normalized voltage step between points
     """
-    currents = np.linspace(imin, imax, steps)
-    df = pd.DataFrame(dict(i=currents))
-
+    if mode not in SWEEP_MODES:
+        raise ValueError(f"mode {mode!r} not in {SWEEP_MODES}")
+    q = get_instrument()
     channels = range(n) if isinstance(n, int) else n
-    for channel in channels:
-        currents = np.zeros_like(currents)
-        # set all channels to zero
-        q.v[:] = 0
-        for j, voltage in enumerate(currents):
-            q.i[channel] = float(voltage)
-            measured_voltage = q.v[channel]
-            measured_current = q.i[channel]
-            currents[j] = measured_current
+    columns = {}
 
-        df[f"i_{channel}"] = currents
-    return df
+    for channel in tqdm(channels):
 
+        def measure(current: float) -> float:
+            q.i[channel] = float(current)
+            return q.v[channel]
 
-def get_current(channel: int, voltage: float) -> float:
-    """Sets voltage for a channel and returns measured current.
+        if mode == "adaptive":
+            result = adaptive_sweep(
+                measure,
+                imin,
+                imax,
+                n_initial=steps,
+                max_points=max_points,
+                tolerance=tolerance,
+            )
+            logger.info(f"channel {channel}: {len(result.x)} points, {result.stop}")
+            currents, voltages = result.x, result.y
+        else:
+            currents = np.linspace(imin, imax, steps)
+            voltages = np.array([measure(current) for current in currents])
 
-    Args:
-        channel:
-        voltage:
-
-    """
-    q = smu_qontrol()
-    q.v[channel] = voltage
-    return q.i[channel]
+        q.i[channel] = 0
+        columns[f"v_{channel}"] = pd.Series(voltages, index=currents)
 
-
-def zero_voltage() -> None:
-    """Sets all voltage channels to zero."""
-    q = smu_qontrol()
-    q.v[:] = 0
-    return
+    df = pd.DataFrame(columns).sort_index()
+    df.index.name = "i"
+    return df
 
 
 if __name__ == "__main__":
@@ -1,12 +1,205 @@
-from typing import Iterable, Union, Callable
+"""Voltage sweeps with current readback on a multichannel SMU.
+
+mode:
+
+- sequential: one channel at a time, the other channels at 0 V
+- parallel: a group of channels at a time (group_size, all channels by
+  default) with one vector set and one all-channel readback per voltage step.
+  Same results as sequential for independent channels, in
+  vsteps * n_groups instead of vsteps * n_channels round trips.
+  group_size limits the total current drawn at once.
+- adaptive: one channel at a time, starting from vsteps points and adding
+  points where the current bends (see plab.smu.adaptive) up to max_points
+  per channel. Stops going up at the first stopping current. Each channel gets
+  its own voltages, so the DataFrame index is their union with NaN where a
+  channel was not measured.
+
+sweep_voltage_sharded splits a global channel list over several controllers
+(serial ports) and sweeps them at the same time, one thread each. Each
+controller is recorded in CONFIG.qontrol[serial_port_name] (see
+plab.smu.smu_qontrol).
+
+Stop criteria (plab.smu.stop) end a channel early in every mode: compliance
+reached (shorts), current above imax, or no current for open_points (opens).
+"""
+
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union, Callable
+import concurrent.futures
+import contextvars
+import dataclasses
 from time import strftime, localtime
 import pandas as pd
 import numpy as np
 from tqdm import tqdm
-import qontrol
 from plab.config import logger, CONFIG
 from plab.measurement import measurement, Measurement
+from plab.smu.adaptive import STOP_BUDGET, STOP_CONVERGED, adaptive_sweep
 from plab.smu.smu_qontrol import smu_qontrol
+from plab.smu.stop import StopCriteria
+
+SWEEP_MODES = ("sequential", "parallel", "adaptive")
+
+
+def set_voltages(q, voltages: Sequence[float]) -> None:
+    """Sets all channel voltages with one vector command per module."""
+    voltages = [float(v) for v in voltages]
+    if hasattr(q, "set_all_values"):
+        q.set_all_values("V", voltages)
+    else:
+        q.v[:] = voltages
+
+
+def get_currents(q, voltages: Sequence[float]) -> List[float]:
+    """Returns all channel currents with one readback.
+
+    qontrol get_all_values drops the sign of the readback, so each current
+    takes the sign of its applied voltage, as for passive devices.
+    Without get_all_values, reads the signed currents channel by channel.
+
+    Args:
+        q: qontrol QXOutput
+        voltages: applied voltage per channel
+    """
+    if hasattr(q, "get_all_values"):
+        currents = q.get_all_values("I")
+        if currents is not None:
+            currents = np.abs(np.asarray(currents, dtype=float))
+            return list(np.where(np.asarray(voltages) < 0, -currents, currents))
+    return q.i[:]
+
+
+def instrument_compliance(q, channels: Iterable[int]) -> Optional[float]:
+    """Returns the current limit (imax) of an instrument, None if unknown.
+
+    qontrol QXOutput has one limit per channel, read once per swept channel.
+    With different limits, returns the largest one, so that no channel stops
+    below its own limit.
+
+    Args:
+        q: instrument
+        channels: swept channels
+    """
+    imax = getattr(q, "imax", None)
+    if imax is None:
+        return None
+    if isinstance(imax, (int, float)):
+        return float(imax) if imax > 0 else None
+    limits = [float(imax[channel]) for channel in channels]
+    limits = [limit for limit in limits if limit > 0]
+    return max(limits) if limits else None
+
+
+def _with_compliance(q, channels: List[int], criteria: StopCriteria) -> StopCriteria:
+    if criteria.compliance is not None:
+        return criteria
+    compliance = instrument_compliance(q, channels)
+    if compliance is not None:
+        logger.info(f"compliance {compliance} from the instrument imax")
+    return dataclasses.replace(criteria, compliance=compliance)
+
+
+def _stopped(criteria: StopCriteria, channel: int, currents, stops: Dict[str, str]):
+    reason = criteria.check(currents)
+    if reason is not None:
+        stops[f"i_{channel}"] = reason
+        logger.info(
+            f"channel {channel}: stopped after {len(currents)} points, {reason}"
+        )
+    return reason is not None
+
+
+def _sweep_sequential(
+    q,
+    voltages: np.ndarray,
+    channels: Iterable[int],
+    df,
+    criteria: StopCriteria,
+    stops: Dict[str, str],
+) -> None:
+    for channel in tqdm(channels):
+        currents = np.full_like(voltages, np.nan)
+
+        for j, voltage in enumerate(voltages):
+            q.v[channel] = float(voltage)
+            currents[j] = q.i[channel]
+            if _stopped(criteria, channel, currents[: j + 1], stops):
+                break
+
+        q.v[channel] = 0
+        df[f"i_{channel}"] = currents
+
+
+def _sweep_parallel(
+    q,
+    voltages: np.ndarray,
+    channels: Sequence[int],
+    df,
+    group_size: Optional[int],
+    criteria: StopCriteria,
+    stops: Dict[str, str],
+) -> None:
+    group_size = group_size or len(channels)
+    groups = [channels[i : i + group_size] for i in range(0, len(channels), group_size)]
+    n_chs = q.n_chs if hasattr(q, "n_chs") else len(q.v)
+    currents = {channel: np.full_like(voltages, np.nan) for channel in channels}
+
+    for group in tqdm(groups):
+        values = np.zeros(n_chs)
+        active = list(group)
+        for j, voltage in enumerate(voltages):
+            values[active] = voltage
+            set_voltages(q, values)
+            readback = get_currents(q, values)
+            for channel in list(active):
+                currents[channel][j] = readback[channel]
+                if _stopped(criteria, channel, currents[channel][: j + 1], stops):
+                    active.remove(channel)
+                    values[channel] = 0
+            if not active:
+                break
+        set_voltages(q, np.zeros(n_chs))
+
+    for channel in channels:
+        df[f"i_{channel}"] = currents[channel]
+
+
+def _sweep_adaptive(
+    q,
+    vmin: float,
+    vmax: float,
+    vsteps: int,
+    channels: Iterable[int],
+    max_points: int,
+    tolerance: float,
+    criteria: StopCriteria,
+    stops: Dict[str, str],
+) -> pd.DataFrame:
+    columns = {}
+    for channel in tqdm(channels):
+
+        def measure(voltage: float) -> float:
+            q.v[channel] = voltage
+            return q.i[channel]
+
+        result = adaptive_sweep(
+            measure,
+            vmin,
+            vmax,
+            n_initial=vsteps,
+            max_points=max_points,
+            tolerance=tolerance,
+            ymax=criteria.ymax,
+            stop=criteria.check,
+        )
+        q.v[channel] = 0
+        logger.info(f"channel {channel}: {len(result.x)} points, {result.stop}")
+        if result.stop not in (STOP_CONVERGED, STOP_BUDGET):
+            stops[f"i_{channel}"] = result.stop
+        columns[f"i_{channel}"] = pd.Series(result.y, index=result.x)
+
+    df = pd.DataFrame(columns).sort_index()
+    df.index.name = "v"
+    return df
 
 
 @measurement
@@ -16,36 +209,221 @@ def sweep_voltage(
     vsteps: int = 3,
     channels: Union[Iterable[int], int] = 64,
     get_instrument: Callable = smu_qontrol,
+    mode: str = "sequential",
+    group_size: Optional[int] = None,
+    max_points: int = 50,
+    tolerance: float = 0.02,
+    compliance: Optional[float] = None,
+    imax: Optional[float] = None,
+    open_points: Optional[int] = None,
+    iopen: float = 1e-6,
     **kwargs,
 ) -> Measurement:
     """Sweep voltage and measure current.
 
+    Channels that meet a stop criterion are set to 0 V with NaN for the rest
+    of the sweep. The reasons are in metadata.attrs.stop ({column: reason}).
+
     Args:
         vmin: min voltage
         vmax: max voltage
         vsteps: number of steps
         channels: number of channels to sweep or specific channels (iterable)
+        mode: sequential, parallel (channel groups) or adaptive (refined grid)
+        group_size: parallel mode channels driven at once, defaults to all
+        max_points: adaptive mode point budget per channel
+        tolerance: adaptive mode max normalized current step between points
+        compliance: SMU current limit, stops shorted channels when reached,
+            defaults to the instrument imax when it has one
+        imax: stops a channel at the first |current| >= imax
+        open_points: stops a channel with |current| <= iopen for that many points
+        iopen: max |current| of an open channel
         **kwargs: captures labstate metadata in @measurement
     """
+    if mode not in SWEEP_MODES:
+        raise ValueError(f"mode {mode!r} not in {SWEEP_MODES}")
     q = get_instrument()
+    if isinstance(channels, int):
+        channels = range(channels)
+    channels = list(channels)
+    criteria = StopCriteria(
+        compliance=compliance, imax=imax, open_points=open_points, iopen=iopen
+    )
+    criteria = _with_compliance(q, channels, criteria)
+
+    df, stops = _sweep(
+        q,
+        channels,
+        vmin,
+        vmax,
+        vsteps,
+        mode,
+        group_size,
+        max_points,
+        tolerance,
+        criteria,
+    )
+    if stops:
+        df.attrs["stop"] = stops
+    return df
+
+
+def _sweep(
+    q,
+    channels: List[int],
+    vmin: float,
+    vmax: float,
+    vsteps: int,
+    mode: str,
+    group_size: Optional[int],
+    max_points: int,
+    tolerance: float,
+    criteria: StopCriteria,
+) -> Tuple[pd.DataFrame, Dict[str, str]]:
+    """Returns the currents (index v, columns i_{channel}) and the stops."""
+    stops: Dict[str, str] = {}
+    if mode == "adaptive":
+        df = _sweep_adaptive(
+            q, vmin, vmax, vsteps, channels, max_points, tolerance, criteria, stops
+        )
+        return df, stops
+
     voltages = np.linspace(vmin, vmax, vsteps)
     df = pd.DataFrame(dict(v=voltages))
+    if mode == "parallel":
+        _sweep_parallel(q, voltages, channels, df, group_size, criteria, stops)
+    else:
+        _sweep_sequential(q, voltages, channels, df, criteria, stops)
+    df.set_index(df["v"], inplace=True)
+    df.pop("v")
+    return df, stops
+
+
+def shard_channels(
+    channels: Sequence[int], n_chs: Sequence[int]
+) -> List[Dict[int, int]]:
+    """Maps global channels onto controllers chained in order.
+
+    Controller k has the global channels sum(n_chs[:k]) to sum(n_chs[:k+1]) - 1.
+
+    Args:
+        channels: global channels
+        n_chs: channels of each controller
+
+    Returns:
+        per controller {local channel: global channel}
+    """
+    offsets = np.concatenate([[0], np.cumsum(n_chs)])
+    shards: List[Dict[int, int]] = [{} for _ in n_chs]
+    for channel in channels:
+        k = int(np.searchsorted(offsets, channel, side="right")) - 1
+        if channel < 0 or k >= len(n_chs):
+            raise ValueError(f"channel {channel} not in 0..{offsets[-1] - 1}")
+        shards[k][channel - int(offsets[k])] = channel
+    return shards
+
+
+@measurement
+def sweep_voltage_sharded(
+    vmin: float = 0.0,
+    vmax: float = 2.0,
+    vsteps: int = 3,
+    channels: Union[Iterable[int], int] = 64,
+    ports: Sequence[str] = ("/dev/ttyUSB0", "/dev/ttyUSB1"),
+    get_instrument: Callable = smu_qontrol,
+    mode: str = "sequential",
+    group_size: Optional[int] = None,
+    max_points: int = 50,
+    tolerance: float = 0.02,
+    compliance: Optional[float] = None,
+    imax: Optional[float] = None,
+    open_points: Optional[int] = None,
+    iopen: float = 1e-6,
+    **kwargs,
+) -> Measurement:
+    """Sweep voltage on several controllers at once, one thread per controller.
+
+    Global channels number the channels of the controllers in ports order.
+    Each controller sweeps its own channels over its own serial link, and
+    the results are merged into global i_{channel} columns, so the sweep takes
+    as long as the largest shard.
 
+    Args:
+        vmin: min voltage
+        vmax: max voltage
+        vsteps: number of steps
+        channels: number of global channels to sweep or specific ones (iterable)
+        ports: controller serial ports
+        get_instrument: returns the controller of a serial_port_name
+        mode: sequential, parallel (channel groups) or adaptive (refined grid)
+        group_size: parallel mode channels driven at once per controller
+        max_points: adaptive mode point budget per channel
+        tolerance: adaptive mode max normalized current step between points
+        compliance: SMU current limit, stops shorted channels when reached,
+            defaults to the imax of each controller when it has one
+        imax: stops a channel at the first |current| >= imax
+        open_points: stops a channel with |current| <= iopen for that many points
+        iopen: max |current| of an open channel
+        **kwargs: captures labstate metadata in @measurement
+    """
+    if mode not in SWEEP_MODES:
+        raise ValueError(f"mode {mode!r} not in {SWEEP_MODES}")
+    criteria = StopCriteria(
+        compliance=compliance, imax=imax, open_points=open_points, iopen=iopen
+    )
     if isinstance(channels, int):
         channels = range(channels)
+    channels = list(channels)
+    if not channels:
+        raise ValueError("No channels to sweep")
+    if not ports:
+        raise ValueError("No controller ports")
 
-    for channel in tqdm(channels):
-        currents = np.zeros_like(voltages)
+    def _connect(port: str):
+        return get_instrument(serial_port_name=port)
 
-        for j, voltage in enumerate(voltages):
-            q.v[channel] = float(voltage)
-            currents[j] = q.i[channel]
+    def _shard(q, mapping: Dict[int, int]) -> Tuple[pd.DataFrame, Dict[str, str]]:
+        df, stops = _sweep(
+            q,
+            list(mapping),
+            vmin,
+            vmax,
+            vsteps,
+            mode,
+            group_size,
+            max_points,
+            tolerance,
+            _with_compliance(q, list(mapping), criteria),
+        )
+        names = {f"i_{local}": f"i_{channel}" for local, channel in mapping.items()}
+        return df.rename(columns=names), {names[k]: v for k, v in stops.items()}
 
-        q.v[channel] = 0
-        df[f"i_{channel}"] = currents
+    with concurrent.futures.ThreadPoolExecutor(
+        len(ports), thread_name_prefix="plab-smu"
+    ) as pool:
+        # each thread runs in a copy of this context, to record into the profiler
+        instruments = [
+            future.result()
+            for future in [
+                pool.submit(contextvars.copy_context().run, _connect, port)
+                for port in ports
+            ]
+        ]
+        n_chs = [q.n_chs if hasattr(q, "n_chs") else len(q.v) for q in instruments]
+        shards = shard_channels(channels, n_chs)
+        futures = [
+            pool.submit(contextvars.copy_context().run, _shard, q, mapping)
+            for q, mapping in zip(instruments, shards)
+            if mapping
+        ]
+        results = [future.result() for future in futures]
 
-    df.set_index(df["v"], inplace=True)
-    df.pop("v")
+    df = pd.concat([result[0] for result in results], axis=1).sort_index()
+    df.index.name = "v"
+    df = df[[f"i_{channel}" for channel in channels]]
+    stops = {k: v for result in results for k, v in result[1].items()}
+    if stops:
+        df.attrs["stop"] = stops
     return df
 
 
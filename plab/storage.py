@@ -0,0 +1,717 @@
+"""Storage backends for Measurement data and metadata.
+
+- csv: text file with a metadata sidecar (default, readable everywhere)
+- parquet: compressed columnar file, metadata embedded in the footer
+- feather: Arrow IPC file, metadata embedded in the schema
+- hdf5: pandas HDFStore, metadata embedded as a node attribute
+- arrows: Arrow IPC stream with a metadata sidecar, appendable chunk by chunk
+
+Metadata is serialized as yaml (default), json or msgpack (CONFIG.metadata_format),
+as a sidecar file with the format suffix or embedded in the binary file.
+Readers detect the format from the content. `read_headers` reads the metadata
+of many files in a thread pool without their data:
+name, function, time, settings and config_hash (config itself is left out).
+
+Binary backends round-trip dtypes, index and float values exactly.
+`Backend.open` returns a MappedData view for lazy column and row access:
+feather (written uncompressed) and arrows are memory mapped, parquet reads only
+the requested columns and row groups.
+csv and arrows can be written incrementally with `Backend.open_stream`, every
+appended chunk is flushed and fsynced so a crash only loses the chunk in flight.
+Compacted files (`{function}.compacted.parquet`, see plab.layout) hold many
+measurements, each one is addressed as `{file}#{member}` and read on its own.
+pyarrow (parquet, feather), pytables (hdf5) and msgpack are optional dependencies.
+"""
+
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+import concurrent.futures
+import functools
+import json
+import os
+import pathlib
+
+import pandas as pd
+from omegaconf import OmegaConf
+import omegaconf
+from plab.config import CONFIG, logger
+
+Metadata = Union[omegaconf.DictConfig, omegaconf.ListConfig]
+METADATA_KEY = b"plab"
+PARQUET_ROW_GROUP_SIZE = 2**16
+COMPACTED_SUFFIX = ".compacted.parquet"
+MEMBER_SEPARATOR = "#"
+
+
+METADATA_SUFFIXES = {"json": ".json", "msgpack": ".msgpack", "yaml": ".yml"}
+HEADER_KEYS = ("name", "function", "time", "settings", "config_hash")
+_MSGPACK_MAP = (0xDE, 0xDF)
+
+
+def _import_msgpack():
+    try:
+        import msgpack
+    except ImportError as error:
+        raise ImportError(
+            "msgpack is needed for msgpack metadata: `pip install msgpack`"
+        ) from error
+    return msgpack
+
+
+def metadata_format(name: Optional[str] = None) -> str:
+    """Returns a metadata format, defaults to CONFIG.metadata_format or yaml."""
+    name = name or CONFIG.get("metadata_format", None) or "yaml"
+    if name not in METADATA_SUFFIXES:
+        raise ValueError(
+            f"Unknown metadata format {name!r}, try {list(METADATA_SUFFIXES)}"
+        )
+    return name
+
+
+def dumps(metadata: Metadata, fmt: Optional[str] = None) -> bytes:
+    """Serializes metadata as json, msgpack or yaml.
+
+    Args:
+        metadata: measurement metadata
+        fmt: defaults to CONFIG.metadata_format or yaml
+    """
+    fmt = metadata_format(fmt)
+    if fmt == "yaml":
+        return OmegaConf.to_yaml(metadata).encode()
+    container = OmegaConf.to_container(metadata, resolve=True)
+    if fmt == "msgpack":
+        return _import_msgpack().packb(container, default=str, use_bin_type=True)
+    return json.dumps(container, default=str, separators=(",", ":")).encode()
+
+
+def detect_format(raw: Union[str, bytes]) -> str:
+    """Returns the format (json, msgpack or yaml) of serialized metadata."""
+    if isinstance(raw, str):
+        raw = raw.encode()
+    if raw[:1] and (0x80 <= raw[0] <= 0x8F or raw[0] in _MSGPACK_MAP):
+        return "msgpack"
+    if raw.lstrip()[:1] == b"{":
+        return "json"
+    return "yaml"
+
+
+def loads(raw: Union[str, bytes]) -> Dict[str, Any]:
+    """Returns metadata as plain python containers, detecting its format."""
+    fmt = detect_format(raw)
+    if fmt == "msgpack":
+        return _import_msgpack().unpackb(raw, raw=False, strict_map_key=False)
+    if fmt == "json":
+        return json.loads(raw)
+    return OmegaConf.to_container(OmegaConf.create(_decode(raw)))
+
+
+def _decode(raw: Union[str, bytes]) -> str:
+    return raw.decode() if isinstance(raw, bytes) else raw
+
+
+def _from_str(raw: Union[str, bytes]) -> Metadata:
+    if detect_format(raw) == "yaml":
+        return OmegaConf.create(_decode(raw))
+    return OmegaConf.create(loads(raw))
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+    except ImportError as error:
+        raise ImportError(
+            "pyarrow is needed for parquet/feather storage: `pip install pyarrow`"
+        ) from error
+    return pyarrow
+
+
+class Backend:
+    """Writes and reads one Measurement (data + metadata) from a file."""
+
+    name: str = ""
+    suffix: str = ""
+
+    def write(self, data: pd.DataFrame, metadata: Metadata, path: pathlib.Path) -> None:
+        raise NotImplementedError
+
+    def read(self, path: pathlib.Path) -> Tuple[pd.DataFrame, Metadata]:
+        raise NotImplementedError
+
+    def read_metadata(self, path: pathlib.Path) -> Metadata:
+        return _from_str(self.read_raw_metadata(path))
+
+    def read_raw_metadata(self, path: pathlib.Path) -> bytes:
+        """Returns the serialized metadata, without reading the data."""
+        raise NotImplementedError
+
+    def read_header(self, path: pathlib.Path) -> Dict[str, Any]:
+        """Returns the HEADER_KEYS of the metadata and the path."""
+        metadata = loads(self.read_raw_metadata(path))
+        header = {key: metadata.get(key) for key in HEADER_KEYS}
+        header["path"] = path
+        return header
+
+    def write_metadata(self, metadata: Metadata, path: pathlib.Path) -> None:
+        """Updates metadata of a stored measurement (sidecar backends only)."""
+        raise NotImplementedError(f"{self.name} backend embeds its metadata")
+
+    def open_stream(self, path: pathlib.Path, metadata: Metadata) -> "StreamWriter":
+        """Returns a writer that appends DataFrame chunks to path."""
+        raise NotImplementedError(f"{self.name} backend does not support streaming")
+
+    def open(self, path: pathlib.Path) -> "MappedData":
+        """Returns a lazy view of the data, without reading it."""
+        raise NotImplementedError(
+            f"{self.name} backend can not be read lazily, use feather, arrows or parquet"
+        )
+
+    def paths(self, path: pathlib.Path) -> Tuple[pathlib.Path, ...]:
+        """Returns all files written for a measurement stored in path."""
+        return (path,)
+
+
+class MappedData:
+    """Lazy, read-only view of stored data.
+
+    - `data["i_0"]` reads one column (Series)
+    - `data[["i_0", "i_1"]]` reads some columns (DataFrame)
+    - `data[1000:2000]` reads a range of rows (DataFrame)
+    - `data.to_pandas()` reads everything
+    """
+
+    columns: List[str] = []
+    index_columns: List[str] = []
+    range_index: Optional[Dict] = None
+
+    def __len__(self) -> int:
+        raise NotImplementedError
+
+    def _read(
+        self, columns: Optional[List[str]], start: int, stop: int
+    ) -> pd.DataFrame:
+        raise NotImplementedError
+
+    def _set_schema(self, schema) -> None:
+        index_columns = (
+            schema.pandas_metadata["index_columns"] if schema.pandas_metadata else []
+        )
+        self.index_columns = [c for c in index_columns if isinstance(c, str)]
+        self.range_index = next((c for c in index_columns if isinstance(c, dict)), None)
+        self.columns = [c for c in schema.names if c not in self.index_columns]
+
+    def _to_pandas(self, table, start: int) -> pd.DataFrame:
+        """Returns the rows of a table starting at row start, with their index."""
+        data = table.to_pandas()
+        if self.range_index:
+            r = self.range_index
+            data.index = pd.RangeIndex(
+                r["start"] + start * r["step"],
+                r["start"] + (start + len(data)) * r["step"],
+                r["step"],
+                name=r["name"],
+            )
+        return data
+
+    def __getitem__(self, key: Union[str, Sequence[str], slice]):
+        if isinstance(key, str):
+            return self._read([key], 0, len(self))[key]
+        if isinstance(key, slice):
+            rows = range(*key.indices(len(self)))
+            if not rows:
+                return self._read(None, 0, 0)
+            # reads the covering rows, a negative step starts from the last one
+            data = self._read(None, min(rows), max(rows) + 1)
+            return data if rows.step == 1 else data.iloc[:: rows.step]
+        return self._read(list(key), 0, len(self))
+
+    def head(self, n: int = 5) -> pd.DataFrame:
+        return self[:n]
+
+    def to_pandas(self) -> pd.DataFrame:
+        return self._read(None, 0, len(self))
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({len(self)} rows, columns={self.columns})"
+
+
+class ArrowData(MappedData):
+    """View of an Arrow table backed by a memory map."""
+
+    def __init__(self, table) -> None:
+        self.table = table
+        self._set_schema(table.schema)
+
+    def __len__(self) -> int:
+        return self.table.num_rows
+
+    def _read(
+        self, columns: Optional[List[str]], start: int, stop: int
+    ) -> pd.DataFrame:
+        table = self.table.slice(start, stop - start)
+        if columns is not None:
+            table = table.select(columns + self.index_columns)
+        return self._to_pandas(table, start)
+
+
+class ParquetData(MappedData):
+    """View of a parquet file that reads only the requested columns and row groups."""
+
+    def __init__(self, path: pathlib.Path) -> None:
+        _import_pyarrow()
+        import pyarrow.parquet as pq
+
+        self.file = pq.ParquetFile(path, memory_map=True)
+        self._set_schema(self.file.schema_arrow)
+        metadata = self.file.metadata
+        self.offsets = [0]
+        for i in range(metadata.num_row_groups):
+            self.offsets.append(self.offsets[-1] + metadata.row_group(i).num_rows)
+
+    def __len__(self) -> int:
+        return self.offsets[-1]
+
+    def _read(
+        self, columns: Optional[List[str]], start: int, stop: int
+    ) -> pd.DataFrame:
+        groups = [
+            i
+            for i in range(len(self.offsets) - 1)
+            if self.offsets[i] < stop and self.offsets[i + 1] > start
+        ]
+        if columns is not None:
+            columns = columns + self.index_columns
+        table = self.file.read_row_groups(groups, columns=columns)
+        first = self.offsets[groups[0]] if groups else 0
+        return self._to_pandas(table.slice(start - first, stop - start), start)
+
+
+class StreamWriter:
+    """Appends DataFrame chunks to an open file, fsyncing after each chunk."""
+
+    def __init__(self, path: pathlib.Path) -> None:
+        self.path = path
+        self.file = open(path, "wb")
+        self.rows = 0
+
+    def _append(self, data: pd.DataFrame) -> None:
+        raise NotImplementedError
+
+    def append(self, data: pd.DataFrame) -> None:
+        self._append(data)
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.rows += len(data)
+
+    def close(self) -> None:
+        self.file.close()
+
+    def __enter__(self) -> "StreamWriter":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+
+class CsvStreamWriter(StreamWriter):
+    def _append(self, data: pd.DataFrame) -> None:
+        data.to_csv(self.file, header=self.rows == 0)
+
+
+def _stream_schema(schema: "pa.Schema") -> "pa.Schema":  # noqa: F821
+    """Returns the schema of a stream from the one of its first chunk.
+
+    Integer columns become float64, so that later chunks can hold floats or
+    NaN in them. Index columns keep their type.
+    """
+    pa = _import_pyarrow()
+    index = (schema.pandas_metadata or {}).get("index_columns", [])
+    return pa.schema(
+        [
+            (
+                field.with_type(pa.float64())
+                if pa.types.is_integer(field.type) and field.name not in index
+                else field
+            )
+            for field in schema
+        ],
+        metadata=schema.metadata,
+    )
+
+
+class ArrowStreamWriter(StreamWriter):
+    def __init__(self, path: pathlib.Path) -> None:
+        super().__init__(path)
+        self.writer = None
+        self.schema = None
+
+    def _append(self, data: pd.DataFrame) -> None:
+        pa = _import_pyarrow()
+        if self.writer is None:
+            table = pa.Table.from_pandas(data, preserve_index=True)
+            self.schema = _stream_schema(table.schema)
+            table = table.cast(self.schema)
+            self.writer = pa.ipc.new_stream(self.file, self.schema)
+        else:
+            table = pa.Table.from_pandas(data, schema=self.schema, preserve_index=True)
+        self.writer.write_table(table)
+
+    def close(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+        super().close()
+
+
+class CsvBackend(Backend):
+    name = "csv"
+    suffix = ".csv"
+
+    def write(self, data: pd.DataFrame, metadata: Metadata, path: pathlib.Path) -> None:
+        data.to_csv(path)
+        self.write_metadata(metadata, path)
+
+    def read(self, path: pathlib.Path) -> Tuple[pd.DataFrame, Metadata]:
+        return pd.read_csv(path), self.read_metadata(path)
+
+    def sidecar(self, path: pathlib.Path) -> pathlib.Path:
+        """Returns the metadata file of path, in any format."""
+        for suffix in METADATA_SUFFIXES.values():
+            if path.with_suffix(suffix).exists():
+                return path.with_suffix(suffix)
+        raise FileNotFoundError(f"No metadata for {path}")
+
+    def read_raw_metadata(self, path: pathlib.Path) -> bytes:
+        return self.sidecar(path).read_bytes()
+
+    def write_metadata(self, metadata: Metadata, path: pathlib.Path) -> None:
+        fmt = metadata_format()
+        sidecar = path.with_suffix(METADATA_SUFFIXES[fmt])
+        sidecar.write_bytes(dumps(metadata, fmt))
+        for suffix in METADATA_SUFFIXES.values():
+            if suffix != sidecar.suffix and path.with_suffix(suffix).exists():
+                path.with_suffix(suffix).unlink()
+
+    def open_stream(self, path: pathlib.Path, metadata: Metadata) -> StreamWriter:
+        self.write_metadata(metadata, path)
+        return CsvStreamWriter(path)
+
+    def paths(self, path: pathlib.Path) -> Tuple[pathlib.Path, ...]:
+        try:
+            return (path, self.sidecar(path))
+        except FileNotFoundError:
+            return (path,)
+
+
+class ArrowBackend(Backend):
+    """Base for pyarrow backends. Metadata lives in the schema metadata."""
+
+    def _to_table(self, data: pd.DataFrame, metadata: Metadata):
+        pa = _import_pyarrow()
+        table = pa.Table.from_pandas(data)
+        schema_metadata = dict(table.schema.metadata or {})
+        schema_metadata[METADATA_KEY] = dumps(metadata)
+        return table.replace_schema_metadata(schema_metadata)
+
+    def _from_table(self, table) -> Tuple[pd.DataFrame, Metadata]:
+        return table.to_pandas(), _from_str(table.schema.metadata[METADATA_KEY])
+
+
+class ParquetBackend(ArrowBackend):
+    name = "parquet"
+    suffix = ".parquet"
+
+    def write(self, data: pd.DataFrame, metadata: Metadata, path: pathlib.Path) -> None:
+        _import_pyarrow()
+        import pyarrow.parquet as pq
+
+        pq.write_table(
+            self._to_table(data, metadata), path, row_group_size=PARQUET_ROW_GROUP_SIZE
+        )
+
+    def read(self, path: pathlib.Path) -> Tuple[pd.DataFrame, Metadata]:
+        _import_pyarrow()
+        import pyarrow.parquet as pq
+
+        return self._from_table(pq.read_table(path))
+
+    def read_raw_metadata(self, path: pathlib.Path) -> bytes:
+        _import_pyarrow()
+        import pyarrow.parquet as pq
+
+        return pq.read_schema(path).metadata[METADATA_KEY]
+
+    def open(self, path: pathlib.Path) -> MappedData:
+        return ParquetData(path)
+
+
+class FeatherBackend(ArrowBackend):
+    name = "feather"
+    suffix = ".feather"
+
+    def write(self, data: pd.DataFrame, metadata: Metadata, path: pathlib.Path) -> None:
+        _import_pyarrow()
+        import pyarrow.feather as feather
+
+        # uncompressed so that `open` can memory map it without copies
+        feather.write_feather(
+            self._to_table(data, metadata), path, compression="uncompressed"
+        )
+
+    def read(self, path: pathlib.Path) -> Tuple[pd.DataFrame, Metadata]:
+        _import_pyarrow()
+        import pyarrow.feather as feather
+
+        return self._from_table(feather.read_table(path))
+
+    def read_raw_metadata(self, path: pathlib.Path) -> bytes:
+        pa = _import_pyarrow()
+        with pa.ipc.open_file(path) as reader:
+            return reader.schema.metadata[METADATA_KEY]
+
+    def open(self, path: pathlib.Path) -> MappedData:
+        pa = _import_pyarrow()
+        return ArrowData(pa.ipc.open_file(pa.memory_map(str(path))).read_all())
+
+
+class Hdf5Backend(Backend):
+    name = "hdf5"
+    suffix = ".h5"
+    key = "data"
+
+    def write(self, data: pd.DataFrame, metadata: Metadata, path: pathlib.Path) -> None:
+        with pd.HDFStore(path, mode="w") as store:
+            store.put(self.key, data)
+            store.get_storer(self.key).attrs.plab = dumps(metadata)
+
+    def read(self, path: pathlib.Path) -> Tuple[pd.DataFrame, Metadata]:
+        with pd.HDFStore(path, mode="r") as store:
+            data = store.get(self.key)
+            metadata = _from_str(store.get_storer(self.key).attrs.plab)
+        return data, metadata
+
+    def read_raw_metadata(self, path: pathlib.Path) -> bytes:
+        with pd.HDFStore(path, mode="r") as store:
+            return store.get_storer(self.key).attrs.plab
+
+
+class ArrowStreamBackend(CsvBackend):
+    """Arrow IPC stream format. Readable up to the last complete chunk."""
+
+    name = "arrows"
+    suffix = ".arrows"
+
+    def write(self, data: pd.DataFrame, metadata: Metadata, path: pathlib.Path) -> None:
+        with self.open_stream(path, metadata) as writer:
+            writer.append(data)
+
+    def _read_table(self, source):
+        pa = _import_pyarrow()
+        batches = []
+        with pa.ipc.open_stream(source) as reader:
+            try:
+                for batch in reader:
+                    batches.append(batch)
+            except (pa.ArrowInvalid, OSError):
+                logger.warning(f"{source} is truncated, read {len(batches)} chunks")
+            return pa.Table.from_batches(batches, schema=reader.schema)
+
+    def read(self, path: pathlib.Path) -> Tuple[pd.DataFrame, Metadata]:
+        pa = _import_pyarrow()
+        table = self._read_table(pa.OSFile(str(path)))
+        return table.to_pandas(), self.read_metadata(path)
+
+    def open(self, path: pathlib.Path) -> MappedData:
+        pa = _import_pyarrow()
+        return ArrowData(self._read_table(pa.memory_map(str(path))))
+
+    def open_stream(self, path: pathlib.Path, metadata: Metadata) -> StreamWriter:
+        self.write_metadata(metadata, path)
+        return ArrowStreamWriter(path)
+
+
+class CompactedBackend(Backend):
+    """One measurement (member) of a compacted parquet file.
+
+    Paths are `{file}#{member}`. The compacted data has a `member` index level
+    and its metadata maps each member to its rows, columns and metadata.
+    """
+
+    name = "compacted"
+    suffix = COMPACTED_SUFFIX
+
+    @staticmethod
+    def split(path: pathlib.Path) -> Tuple[pathlib.Path, str]:
+        filename, member = str(path).rsplit(MEMBER_SEPARATOR, 1)
+        return pathlib.Path(filename), member
+
+    def members(self, path: pathlib.Path) -> Dict[str, Any]:
+        """Returns the members of a compacted file."""
+        stat = path.stat()
+        return _compacted_members(path, stat.st_mtime_ns, stat.st_size)
+
+    def _member(self, path: pathlib.Path) -> Tuple[pathlib.Path, Dict[str, Any]]:
+        filename, member = self.split(path)
+        members = self.members(filename)
+        if member not in members:
+            raise FileNotFoundError(f"No member {member!r} in {filename}")
+        return filename, members[member]
+
+    def write(self, data: pd.DataFrame, metadata: Metadata, path: pathlib.Path) -> None:
+        raise NotImplementedError("compacted files are written by plab.layout.compact")
+
+    def read(self, path: pathlib.Path) -> Tuple[pd.DataFrame, Metadata]:
+        filename, member = self._member(path)
+        data = ParquetData(filename)[member["start"] : member["stop"]]
+        data = data.droplevel("member")[member["columns"]]
+        data.index.names = member["index_names"]
+        return data, OmegaConf.create(member["metadata"])
+
+    def read_raw_metadata(self, path: pathlib.Path) -> bytes:
+        _, member = self._member(path)
+        return json.dumps(member["metadata"]).encode()
+
+    def open(self, path: pathlib.Path) -> "MappedData":
+        pa = _import_pyarrow()
+        return ArrowData(pa.Table.from_pandas(self.read(path)[0]))
+
+    def paths(self, path: pathlib.Path) -> Tuple[pathlib.Path, ...]:
+        return (self.split(path)[0],)
+
+
+@functools.lru_cache(maxsize=64)
+def _compacted_members(path: pathlib.Path, mtime_ns: int, size: int) -> Dict[str, Any]:
+    return loads(BACKENDS["parquet"].read_raw_metadata(path))["members"]
+
+
+COMPACTED = CompactedBackend()
+
+BACKENDS: Dict[str, Backend] = {
+    backend.name: backend
+    for backend in [
+        CsvBackend(),
+        ParquetBackend(),
+        FeatherBackend(),
+        Hdf5Backend(),
+        ArrowStreamBackend(),
+    ]
+}
+
+
+def get_backend(name: Optional[str] = None) -> Backend:
+    """Returns a storage backend by name, defaults to CONFIG.storage or csv."""
+    name = name or CONFIG.get("storage", None) or "csv"
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown storage backend {name!r}, try {list(BACKENDS)}")
+    return BACKENDS[name]
+
+
+def get_stream_backend(name: Optional[str] = None) -> Backend:
+    """Returns a streaming backend, defaults to CONFIG.stream_storage.
+
+    Falls back to arrows when pyarrow is installed and csv otherwise.
+    """
+    name = name or CONFIG.get("stream_storage", None)
+    if not name:
+        try:
+            _import_pyarrow()
+            name = "arrows"
+        except ImportError:
+            name = "csv"
+    return get_backend(name)
+
+
+def backend_for(path: pathlib.Path) -> Backend:
+    """Returns the backend that wrote path, based on its suffix."""
+    if MEMBER_SEPARATOR in path.name:
+        return COMPACTED
+    for backend in BACKENDS.values():
+        if path.suffix == backend.suffix:
+            return backend
+    raise ValueError(f"No storage backend for {path}")
+
+
+def find(filename: str, dirpath: pathlib.Path) -> Tuple[Backend, pathlib.Path]:
+    """Returns backend and path of a stored measurement.
+
+    Args:
+        filename: name with or without the backend suffix
+        dirpath: directory to look in
+    """
+    for backend in BACKENDS.values():
+        if filename.endswith(backend.suffix) and (dirpath / filename).exists():
+            return backend, dirpath / filename
+
+    for backend in BACKENDS.values():
+        path = dirpath / f"{filename}{backend.suffix}"
+        if path.exists():
+            return backend, path
+    raise FileNotFoundError(f"No stored measurement {filename!r} in {dirpath}")
+
+
+def csv_index(data: pd.DataFrame) -> pd.DataFrame:
+    """Returns data read from csv with its index, written as the first column."""
+    data = data.set_index(data.columns[0])
+    if str(data.index.name).startswith("Unnamed"):
+        data.index.name = None
+    return data
+
+
+def fsync(paths: Iterable[pathlib.Path]) -> None:
+    """Flushes files (and directories, for new entries) to disk."""
+    for path in paths:
+        if not path.exists():
+            continue
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+
+def _read_header(path: pathlib.Path) -> Optional[Dict[str, Any]]:
+    try:
+        return backend_for(path).read_header(path)
+    except Exception as error:
+        logger.warning(f"Skipping {path}: {error}")
+        return None
+
+
+def read_headers(
+    paths: Iterable[pathlib.Path], max_workers: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """Returns the metadata headers of many stored measurements.
+
+    Only the metadata is read (sidecar, parquet footer or arrow schema) in a
+    thread pool. Unreadable files are skipped.
+
+    Args:
+        paths: stored measurement paths
+        max_workers: thread pool size
+    """
+    paths = [pathlib.Path(path) for path in paths]
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as pool:
+        headers = pool.map(_read_header, paths)
+        return [header for header in headers if header is not None]
+
+
+__all__ = [
+    "ArrowData",
+    "Backend",
+    "BACKENDS",
+    "COMPACTED",
+    "COMPACTED_SUFFIX",
+    "CompactedBackend",
+    "HEADER_KEYS",
+    "MappedData",
+    "ParquetData",
+    "StreamWriter",
+    "backend_for",
+    "csv_index",
+    "detect_format",
+    "dumps",
+    "find",
+    "fsync",
+    "get_backend",
+    "get_stream_backend",
+    "loads",
+    "metadata_format",
+    "read_headers",
+]
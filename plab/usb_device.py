@@ -1,5 +1,6 @@
 import usb.core
 import usb.util
+from plab.profiler import profiled
 
 
 class UsbDevice:
@@ -32,20 +33,25 @@ class UsbDevice:
         assert self._ep_out is not None
         assert self._ep_in is not None
 
+    @profiled
     def write(self, data):
         return self._dev.write(self._ep_out.bEndpointAddress, data)
 
+    @profiled
     def read_raw(self):
         return self._dev.read(self._ep_in.bEndpointAddress, self._ep_in.wMaxPacketSize)
 
+    @profiled
     def read(self):
         data_raw = self.read_raw()
         return "".join([chr(d) for d in data_raw])
 
+    @profiled
     def write_read(self, data):
         self.write(data)
         return self.read()
 
+    @profiled
     def write_read_raw(self, data):
         self.write(data)
         return self.read_raw()
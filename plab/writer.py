@@ -0,0 +1,138 @@
+"""Background writer pool for Measurement.write.
+
+`m.write_async()` queues the measurement and returns at once, so the next
+device can be measured while the previous measurement serializes.
+
+- backpressure: at most `max_queued` writes are pending, submit blocks beyond
+- flush(): waits for all pending writes
+- errors: a failed write is raised by the next submit or flush
+- fsync: passed to Measurement.write, or set for every write with
+  CONFIG.writer.fsync
+
+Pending writes are flushed at exit. Configure the default WRITER with
+CONFIG.writer (max_workers, max_queued, fsync).
+"""
+
+from typing import Any, List, Optional, Set
+import atexit
+import concurrent.futures
+import threading
+
+from plab.config import CONFIG, logger
+
+
+class WriterPool:
+    """Writes measurements in background threads.
+
+    Args:
+        max_workers: writer threads
+        max_queued: pending writes before submit blocks
+        fsync: flushes every written file to disk
+    """
+
+    def __init__(
+        self, max_workers: int = 2, max_queued: int = 8, fsync: bool = False
+    ) -> None:
+        self.max_workers = max_workers
+        self.max_queued = max_queued
+        self.fsync = fsync
+        self._pool: Optional[concurrent.futures.ThreadPoolExecutor] = None
+        self._slots = threading.BoundedSemaphore(max_queued)
+        self._lock = threading.Lock()
+        self._pending: Set[concurrent.futures.Future] = set()
+        self._errors: List[BaseException] = []
+
+    def submit(
+        self, measurement: Any, timeout: Optional[float] = None, **kwargs: Any
+    ) -> concurrent.futures.Future:
+        """Queues measurement.write(**kwargs), blocking while the queue is full.
+
+        Args:
+            measurement: Measurement to write
+            timeout: max seconds to wait for a free slot (None waits forever)
+            kwargs: Measurement.write arguments
+        """
+        self.raise_errors()
+        if not self._slots.acquire(timeout=timeout):
+            raise TimeoutError(f"writer queue full ({self.max_queued} pending)")
+        kwargs.setdefault("fsync", self.fsync)
+        try:
+            with self._lock:
+                if self._pool is None:
+                    self._pool = concurrent.futures.ThreadPoolExecutor(
+                        self.max_workers, thread_name_prefix="plab-writer"
+                    )
+                future = self._pool.submit(measurement.write, **kwargs)
+                self._pending.add(future)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(self._done)
+        return future
+
+    def _record(self, future: concurrent.futures.Future) -> None:
+        """Records the error of a finished write once, holding the lock."""
+        if future not in self._pending:
+            return
+        self._pending.discard(future)
+        error = None if future.cancelled() else future.exception()
+        if error is not None:
+            logger.error(f"Background write failed: {error!r}")
+            self._errors.append(error)
+
+    def _done(self, future: concurrent.futures.Future) -> None:
+        with self._lock:
+            self._record(future)
+        self._slots.release()
+
+    def raise_errors(self) -> None:
+        """Raises the first error of the failed writes since the last call."""
+        with self._lock:
+            errors, self._errors = self._errors, []
+        if errors:
+            if len(errors) > 1:
+                logger.error(f"{len(errors) - 1} more background writes failed")
+            raise errors[0]
+
+    def flush(self, timeout: Optional[float] = None) -> None:
+        """Waits for all pending writes and raises the first error.
+
+        Args:
+            timeout: max seconds to wait (None waits forever)
+        """
+        with self._lock:
+            pending = set(self._pending)
+        done, not_done = concurrent.futures.wait(pending, timeout=timeout)
+        # waiters can wake up before the done callbacks run
+        with self._lock:
+            for future in done:
+                self._record(future)
+        if not_done:
+            raise TimeoutError(f"{len(not_done)} writes still pending")
+        self.raise_errors()
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def close(self) -> None:
+        """Flushes pending writes and stops the threads."""
+        try:
+            self.flush()
+        finally:
+            with self._lock:
+                pool, self._pool = self._pool, None
+            if pool is not None:
+                pool.shutdown(wait=True)
+
+
+WRITER = WriterPool(**CONFIG.get("writer", {}))
+atexit.register(WRITER.close)
+
+
+def flush(timeout: Optional[float] = None) -> None:
+    """Waits for all pending background writes of WRITER."""
+    WRITER.flush(timeout)
+
+
+__all__ = ["WRITER", "WriterPool", "flush"]
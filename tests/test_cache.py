@@ -0,0 +1,123 @@
+import pytest
+import numpy as np
+import pandas as pd
+import plab.config
+import plab.measurement
+from plab.measurement import LazyMeasurement, MeasurementCache, Measurement
+from plab.measurement import measurement
+
+
+@measurement
+def demo_frame(rows: int = 1000) -> pd.DataFrame:
+    return pd.DataFrame(dict(v=np.arange(rows, dtype=float)))
+
+
+def test_lru_eviction_and_spill(tmp_path):
+    pytest.importorskip("pyarrow")
+    cache = MeasurementCache(max_bytes=20_000, dirpath=tmp_path)
+    for rows in [1000, 1001, 1002]:
+        m = demo_frame(rows=rows)
+        cache[m.metadata.name] = m
+
+    assert cache.stats.evictions == 1
+    assert cache.nbytes <= 20_000
+    assert "demo_frame_rows=1000" in cache
+    assert (tmp_path / "demo_frame_rows=1000.parquet").exists()
+
+    reloaded = cache["demo_frame_rows=1000"]
+    assert isinstance(reloaded, Measurement)
+    assert len(reloaded.data) == 1000
+    assert cache.stats.reloads == 1
+    assert cache.get("missing") is None
+    assert cache.stats.misses == 1
+
+
+@pytest.mark.parametrize("backend", [None, "csv"])
+def test_written_csv_entries_reload_equal(backend, tmp_path):
+    if backend is None:
+        pytest.importorskip("pyarrow")
+    cache = MeasurementCache(
+        max_bytes=20_000, dirpath=tmp_path / "spill", backend=backend
+    )
+    m = demo_frame(rows=1000)
+    m.data = m.data.assign(i=m.data.v / 2).set_index("v")
+    m.write(dirpath=tmp_path, backend="csv", timestamp=False)
+    cache[m.metadata.name] = m
+    cache["other"] = demo_frame(rows=2000)
+    assert cache.stats.evictions == 1
+
+    reloaded = cache[m.metadata.name]
+    pd.testing.assert_frame_equal(reloaded.data, m.data)
+
+
+def test_eviction_without_spill_drops_entry():
+    cache = MeasurementCache(max_bytes=10_000)
+    cache["a"] = demo_frame(rows=1000)
+    cache["b"] = demo_frame(rows=1001)
+    assert "a" not in cache
+    assert list(cache) == ["b"]
+
+
+calls = []
+
+
+@measurement(memoize=True, ttl=3600)
+def demo_memoized(rows: int = 10) -> pd.DataFrame:
+    calls.append(rows)
+    return pd.DataFrame(dict(v=np.arange(rows, dtype=float)))
+
+
+def test_memoize_skips_identical_measurement(tmp_path, monkeypatch):
+    monkeypatch.setattr("plab.measurement.PATH.labdata", tmp_path)
+    m1 = demo_memoized(rows=5)
+    m2 = demo_memoized(rows=5)
+    assert m2 is m1
+    assert calls == [5]
+
+    m1.write(dirpath=tmp_path)
+    del plab.measurement.CACHE[m1.metadata.name]
+    m3 = demo_memoized(rows=5)
+    assert m3.path == m1.path
+    assert calls == [5]
+
+    monkeypatch.setitem(plab.config.CONFIG, "sample", "another_chip")
+    demo_memoized(rows=5)
+    assert calls == [5, 5]
+
+
+acquisitions = []
+
+
+def connect_fake(serial_port_name: str = "COM3"):
+    plab.config.CONFIG.qontrol[serial_port_name] = dict(device_id="Q8iv-0001")
+    acquisitions.append(serial_port_name)
+    return np.arange(3, dtype=float)
+
+
+@measurement(memoize=True)
+def demo_memoized_instrument(get_instrument=connect_fake) -> pd.DataFrame:
+    return pd.DataFrame(dict(i=get_instrument()))
+
+
+def test_memoize_ignores_config_written_while_measuring(tmp_path, monkeypatch):
+    monkeypatch.setattr("plab.measurement.PATH.labdata", tmp_path)
+    monkeypatch.setitem(plab.config.CONFIG, "qontrol", {})
+    m = demo_memoized_instrument()
+    monkeypatch.setitem(plab.config.CONFIG, "layout", "flat")
+    for _ in range(2):
+        assert demo_memoized_instrument() is m
+    assert acquisitions == ["COM3"]
+
+
+def test_lazy_measurements_are_counted_once_loaded(tmp_path):
+    cache = MeasurementCache(max_bytes=100_000)
+    for k in range(5):
+        m = demo_frame(rows=5000 + k)
+        m.write(dirpath=tmp_path, backend="csv", layout="flat", timestamp=False)
+        lazy = LazyMeasurement(metadata=m.metadata, path=m.path)
+        cache[m.metadata.name] = lazy
+        assert cache._sizes[m.metadata.name] == 0
+        assert len(lazy.data) == 5000 + k
+    cache.recount()
+    assert 0 < cache.nbytes <= 100_000
+    assert cache.stats.evictions == 4
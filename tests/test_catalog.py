@@ -0,0 +1,52 @@
+import time
+import numpy as np
+import pandas as pd
+import plab.config
+from plab.catalog import Catalog
+from plab.measurement import measurement
+
+
+@measurement
+def demo_sweep(vmax: float = 1.0, vsteps: int = 5, **kwargs) -> pd.DataFrame:
+    return pd.DataFrame(dict(v=np.linspace(0, vmax, vsteps)))
+
+
+def test_write_updates_catalog(tmp_path, monkeypatch):
+    t0 = time.time()
+    monkeypatch.setitem(plab.config.CONFIG, "sample", "chip1")
+    demo_sweep(vmax=1.0).write(dirpath=tmp_path)
+    demo_sweep(vmax=2.0).write(dirpath=tmp_path)
+    monkeypatch.setitem(plab.config.CONFIG, "sample", "chip2")
+    demo_sweep(vmax=3.0).write(dirpath=tmp_path)
+
+    catalog = Catalog(tmp_path)
+    assert len(catalog.query(function="demo_sweep")) == 3
+    chip1 = catalog.query(function="demo_sweep", sample="chip1", since=t0 - 1)
+    assert [m.metadata.settings.vmax for m in chip1] == [1.0, 2.0]
+    assert catalog.query(vmax=3.0)[0].metadata.config.sample == "chip2"
+    assert catalog.query(until=t0 - 1) == []
+
+    df = catalog.query_df(sample="chip1")
+    assert len(df) == 10
+
+    catalog.path.unlink()
+    assert Catalog(tmp_path).rebuild() == 3
+    assert len(Catalog(tmp_path).query(sample="chip2")) == 1
+
+
+@measurement
+def demo_stream_catalog(vsteps: int = 5):
+    for voltage in np.linspace(0, 1, vsteps):
+        yield dict(v=voltage)
+
+
+def test_streamed_measurements_are_cataloged(tmp_path, monkeypatch):
+    monkeypatch.setattr("plab.measurement.PATH.labdata", tmp_path)
+    monkeypatch.setitem(plab.config.CONFIG, "layout", "sharded")
+    m = demo_stream_catalog()
+    assert m.path.parent != tmp_path
+
+    (found,) = Catalog(tmp_path).query(function="demo_stream_catalog")
+    assert found.path == m.path
+    assert found.metadata.rows == 5
+    assert not list(m.path.parent.glob("catalog.sqlite"))
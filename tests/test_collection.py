@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+import pytest
+from plab.collection import Collection
+from plab.measurement import measurement
+
+
+@measurement
+def demo_channels(
+    vmax: float = 1.0, vsteps: int = 11, sample: str = ""
+) -> pd.DataFrame:
+    v = np.linspace(0, vmax, vsteps)
+    df = pd.DataFrame(dict(v=v, i_0=v / 2, i_1=v / 4))
+    return df.set_index("v")
+
+
+@pytest.fixture(params=["csv", "parquet", "feather"])
+def stored(request, tmp_path):
+    if request.param != "csv":
+        pytest.importorskip("pyarrow")
+    measurements = [
+        demo_channels(vmax=float(vmax), sample="a" if vmax < 3 else "b")
+        for vmax in range(1, 5)
+    ]
+    for m in measurements:
+        m.write(dirpath=tmp_path, backend=request.param, timestamp=False)
+    return tmp_path, measurements
+
+
+def test_collection_pushdown(stored):
+    dirpath, measurements = stored
+    c = Collection.from_glob("*demo_channels*", dirpath=dirpath)
+    assert len(c) == 4
+    assert c.names == [m.metadata.name for m in measurements]
+
+    c = c.where(sample="a").select("i_0").filter([("i_0", ">", 0.25)])
+    assert len(c) == 2
+    df = c.to_pandas()
+    assert "i_1" not in df.columns
+    assert (df["i_0"] > 0.25).all()
+    expected = pd.concat([m.data[m.data.i_0 > 0.25][["i_0"]] for m in measurements[:2]])
+    np.testing.assert_allclose(df["i_0"], expected["i_0"])
+
+    assert c.max()["i_0"] == 1.0
+    assert c.count()["i_0"] == len(df)
+    assert c.mean()["i_0"] == pytest.approx(df["i_0"].mean())
+    per_measurement = c.apply(lambda data: data.max())
+    assert list(per_measurement["i_0"]) == [0.5, 1.0]
+
+
+def test_collection_from_query_and_names(stored):
+    dirpath, measurements = stored
+    c = Collection.from_query(dirpath=dirpath, function="demo_channels", sample="b")
+    assert c.names == [m.metadata.name for m in measurements[2:]]
+    assert c.sum()["i_1"] == pytest.approx(
+        sum(m.data.i_1.sum() for m in measurements[2:])
+    )
+
+    c = Collection.from_names([measurements[0].path.stem], dirpath=dirpath)
+    assert len(c.to_pandas()) == 11
@@ -0,0 +1,50 @@
+from omegaconf import OmegaConf
+import pandas as pd
+from plab import configs
+from plab.config import CONFIG
+from plab.measurement import Measurement, measurement
+
+
+@measurement
+def demo_point(v: float = 0.0) -> pd.DataFrame:
+    return pd.DataFrame(dict(v=[v]))
+
+
+def test_config_is_stored_once(tmp_path, monkeypatch):
+    monkeypatch.setitem(CONFIG, "sample", "chip1")
+    measurements = [demo_point(v=float(v)) for v in range(3)]
+    for m in measurements:
+        m.write(dirpath=tmp_path, timestamp=False)
+    stored = list((tmp_path / configs.CONFIGS_DIRNAME).glob("*.yml"))
+    assert len(stored) == 1
+
+    sidecar = OmegaConf.load(measurements[0].path.with_suffix(".yml"))
+    assert "config" not in sidecar
+    assert sidecar.config_hash == stored[0].stem
+
+
+def test_read_resolves_config_parsed_once(tmp_path, monkeypatch):
+    monkeypatch.setitem(CONFIG, "sample", "chip2")
+    for v in range(3):
+        demo_point(v=float(v)).write(dirpath=tmp_path, timestamp=False)
+
+    configs.clear_cache()
+    loads = []
+    load = OmegaConf.load
+    monkeypatch.setattr(
+        OmegaConf, "load", lambda path: loads.append(path) or load(path)
+    )
+    for v in range(3):
+        m = Measurement()
+        m.read(f"demo_point_v={float(v)}", dirpath=tmp_path)
+        assert m.metadata.config.sample == "chip2"
+        assert "config_hash" not in m.metadata
+    assert [p.parent.name for p in loads].count(configs.CONFIGS_DIRNAME) == 1
+
+
+def test_dedupe_disabled(tmp_path, monkeypatch):
+    monkeypatch.setitem(CONFIG, "dedupe_config", False)
+    m = demo_point(v=0.0)
+    m.write(dirpath=tmp_path, timestamp=False)
+    assert not (tmp_path / configs.CONFIGS_DIRNAME).exists()
+    assert "config" in OmegaConf.load(m.path.with_suffix(".yml"))
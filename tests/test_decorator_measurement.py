@@ -1,11 +1,12 @@
 from typing import Iterable, Union
+import asyncio
 import pydantic
 import pytest
 import pandas as pd
 import numpy as np
 import plab
 from plab.config import write_config, PATH
-from plab.measurement import measurement
+from plab.measurement import CACHE, measurement, nested_dataframe, run
 
 
 @measurement
@@ -34,6 +35,75 @@ def test_validator_error():
         demo(vmin="wrong")
 
 
+@measurement
+async def demo_async(vsteps: int = 20, wait: float = 0.2) -> pd.DataFrame:
+    await asyncio.sleep(wait)
+    return pd.DataFrame(dict(v=np.linspace(0, 1, vsteps)))
+
+
+def test_async_measurements_run_concurrently():
+    m1, m2 = run(demo_async(vsteps=3), demo_async(vsteps=4, wait=0.3))
+    assert m1.metadata.name == "demo_async_vsteps=3"
+    assert len(m2.data) == 4
+    assert m2.metadata.time.t0 < m1.metadata.time.t1
+    assert m2.metadata.time.t1 - m1.metadata.time.t0 < 0.45
+
+
+@measurement
+def scan(n: int = 10) -> pd.DataFrame:
+    measurements = [demo(vmax=float(vmax), vsteps=2) for vmax in range(n)]
+    measurements.append(demo(vsteps=3, sample="chip1"))
+    assert measurements[-1].metadata.name == "demo_vsteps=3_sample=chip1"
+    assert measurements[-1].metadata.settings.sample == "chip1"
+    assert "config" not in measurements[-1].metadata
+    return pd.concat([m.data for m in measurements], ignore_index=True)
+
+
+def test_nested_measurements_are_columns_of_the_outer_metadata():
+    m = scan(n=10)
+    assert len(m.data) == 23
+    nested = m.metadata.nested.demo
+    assert nested.n == 11
+    assert nested.name[0] == "demo_vmax=0.0_vsteps=2"
+    assert list(nested.settings.vmax) == [float(v) for v in range(10)] + [1.0]
+    assert list(nested.settings.sample) == [None] * 10 + ["chip1"]
+    df = nested_dataframe(m.metadata, "demo")
+    assert list(df.columns[:3]) == ["name", "t0", "dt"]
+    assert len(df) == 11
+    assert "demo_vmax=0.0_vsteps=2" not in CACHE
+
+    inner = demo(vsteps=2)
+    assert "config" in inner.metadata
+    assert "nested" not in inner.metadata
+
+
+def test_nested_measurements_skip_omegaconf(monkeypatch, tmp_path):
+    from omegaconf import OmegaConf
+
+    create = OmegaConf.create
+    calls = []
+
+    def counting_create(*args, **kwargs):
+        calls.append(1)
+        return create(*args, **kwargs)
+
+    monkeypatch.setattr(OmegaConf, "create", staticmethod(counting_create))
+    scan(n=10)
+    n_short = len(calls)
+    calls.clear()
+    scan(n=100)
+    assert len(calls) == n_short
+
+    @measurement
+    def outer() -> pd.DataFrame:
+        inner = demo(vsteps=2)
+        inner.write(dirpath=tmp_path, layout="flat", timestamp=False)
+        return inner.data
+
+    outer()
+    assert OmegaConf.load(tmp_path / "demo_vsteps=2.yml").settings.vsteps == 2
+
+
 if __name__ == "__main__":
     m = demo(vstep=21.5555, channels=1)
     m.write(overwrite=True, dirpath=PATH.cwd)
@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+import pytest
+from plab.grid import grid, random_points, run_grid
+from plab.measurement import measurement
+
+
+@measurement
+def demo_point(vmax: float = 1.0, vsteps: int = 3, gain: float = 1.0) -> pd.DataFrame:
+    voltages = np.linspace(0, vmax, vsteps)
+    return pd.DataFrame(dict(v=voltages, i=gain * voltages))
+
+
+calls = []
+
+
+@measurement
+def demo_flaky(vmax: float = 1.0) -> pd.DataFrame:
+    calls.append(vmax)
+    if vmax == 3.0 and calls.count(3.0) == 1:
+        raise RuntimeError("instrument lost")
+    return pd.DataFrame(dict(i=[vmax]))
+
+
+def test_grid_and_random_points():
+    assert len(grid(vmax=[1, 2, 3], gain=[1, 2])) == 6
+    points = random_points(5, seed=0, vmax=(0.0, 1.0), gain=[1, 2])
+    assert all(0 <= p["vmax"] <= 1 and p["gain"] in (1, 2) for p in points)
+
+
+@pytest.mark.parametrize("executor", ["serial", "thread", "process"])
+def test_run_grid_consolidates_points(executor, tmp_path):
+    m = run_grid(
+        demo_point,
+        dict(vmax=[1.0, 2.0], gain=[1.0, 3.0]),
+        executor=executor,
+        max_workers=2,
+        dirpath=tmp_path,
+    )
+    assert len(m.data) == 12
+    assert set(m.data["name"]) == {p.name for p in m.metadata.points}
+    df = m.data[m.data["name"] == "demo_point_vmax=2.0_gain=3.0"]
+    np.testing.assert_allclose(df["i"], [0, 3, 6])
+
+
+def test_run_grid_resumes(tmp_path):
+    space = dict(vmax=[1.0, 2.0, 3.0, 4.0])
+    with pytest.raises(RuntimeError):
+        run_grid(demo_flaky, space, dirpath=tmp_path)
+    assert calls == [1.0, 2.0, 3.0]
+
+    m = run_grid(demo_flaky, space, dirpath=tmp_path)
+    assert calls == [1.0, 2.0, 3.0, 3.0, 4.0]
+    assert list(m.data["i"]) == [1.0, 2.0, 3.0, 4.0]
+    assert len(m.metadata.points) == 4
+
+
+@pytest.mark.parametrize("backend", ["arrows", "csv"])
+def test_run_grid_mixed_int_float_settings(backend, tmp_path):
+    if backend == "arrows":
+        pytest.importorskip("pyarrow")
+    m = run_grid(demo_point, dict(vmax=[1, 2.5]), dirpath=tmp_path, backend=backend)
+    assert sorted(set(m.data["vmax"])) == [1.0, 2.5]
+    assert len(m.metadata.points) == 2
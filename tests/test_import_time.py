@@ -0,0 +1,64 @@
+"""Guards `import plab` against pulling heavy or hardware libraries back in."""
+
+import subprocess
+import sys
+
+import pytest
+
+HEAVY_MODULES = ["pandas", "matplotlib", "omegaconf", "pydantic", "qontrol", "serial"]
+MAX_IMPORT_SECONDS = 0.25
+
+
+def _import_plab(statement: str = "import plab") -> subprocess.CompletedProcess:
+    code = f"{statement}\nimport sys\nprint(' '.join(sorted(sys.modules)))"
+    return subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+
+def _cumulative_seconds(stderr: str, module: str) -> float:
+    for line in stderr.splitlines():
+        if line.split("|")[-1].strip() == module:
+            return int(line.split("|")[1]) / 1e6
+    raise ValueError(f"{module} not in -X importtime output")
+
+
+def test_import_plab_is_lazy():
+    modules = _import_plab().stdout.split()
+    assert not [m for m in HEAVY_MODULES if m in modules]
+
+
+def test_import_plab_time():
+    dt = min(_cumulative_seconds(_import_plab().stderr, "plab") for _ in range(3))
+    assert dt < MAX_IMPORT_SECONDS, f"import plab took {dt:.3f}s"
+
+
+@pytest.mark.parametrize(
+    "attribute", ["plab.lasers", "plab.power_meters", "plab.smu", "plab.config"]
+)
+def test_subpackages_are_lazy(attribute):
+    modules = _import_plab(f"import plab\n{attribute}").stdout.split()
+    assert "matplotlib" not in modules
+    assert "qontrol" not in modules
+
+
+def test_smu_is_lazy():
+    modules = _import_plab("import plab.smu").stdout.split()
+    assert not [m for m in HEAVY_MODULES if m in modules]
+    assert "plab.smu.sweep_voltage" not in modules
+
+
+def test_functions_named_like_submodules():
+    statement = (
+        "import plab.smu.sweep_current\n"
+        "import plab.smu.plot_iv\n"
+        "import plab.smu\n"
+        "from plab.smu import sweep_voltage\n"
+        "assert callable(sweep_voltage)\n"
+        "assert callable(plab.smu.sweep_voltage)\n"
+        "assert callable(plab.smu.plot_iv)"
+    )
+    _import_plab(statement)
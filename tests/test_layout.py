@@ -0,0 +1,83 @@
+import time
+import numpy as np
+import pandas as pd
+import pytest
+from plab.catalog import Catalog
+from plab.layout import compact, migrate, shard
+from plab.measurement import Measurement, measurement, read_metadata
+
+
+@measurement
+def demo_layout(vmax: float = 1.0, vsteps: int = 5) -> pd.DataFrame:
+    v = np.linspace(0, vmax, vsteps)
+    return pd.DataFrame(dict(v=v, i=v / 2)).set_index("v")
+
+
+def test_flat_is_default(tmp_path):
+    m = demo_layout(vmax=3.0)
+    m.write(dirpath=tmp_path)
+    assert m.path.parent == tmp_path
+
+
+def test_sharded_write_is_read_transparently(tmp_path):
+    m = demo_layout(vmax=2.0)
+    m.write(dirpath=tmp_path, layout="sharded")
+    day = time.strftime("%Y/%m/%d")
+    assert m.path.parent == tmp_path / day / "demo_layout"
+
+    m2 = Measurement()
+    m2.read(m.path.stem, dirpath=tmp_path)
+    assert m2.metadata == m.metadata
+
+    (tmp_path / "catalog.sqlite").unlink()
+    assert read_metadata(m.path.stem, dirpath=tmp_path).metadata == m.metadata
+
+
+def test_migrate_flat_tree(tmp_path):
+    measurements = [demo_layout(vmax=float(vmax)) for vmax in range(3)]
+    for m in measurements:
+        m.write(dirpath=tmp_path, layout="flat")
+    assert migrate(tmp_path) == 3
+    assert not list(tmp_path.glob("*.csv"))
+
+    for m in measurements:
+        m2 = Measurement()
+        m2.read(m.path.stem, dirpath=tmp_path)
+        assert m2.path.parent == tmp_path / shard(m.metadata)
+    assert len(Catalog(tmp_path).query(function="demo_layout")) == 3
+
+
+def test_compact_shard(tmp_path):
+    pytest.importorskip("pyarrow")
+    measurements = [demo_layout(vmax=float(vmax), vsteps=vmax + 2) for vmax in range(4)]
+    for m in measurements:
+        m.metadata.time.timestamp = time.strftime(
+            "%y-%m-%d_%H:%M:%S", time.localtime(time.time() - 3 * 24 * 3600)
+        )
+        m.write(dirpath=tmp_path, backend="parquet", timestamp=False, layout="sharded")
+    directory = measurements[0].path.parent
+
+    assert compact(tmp_path, days=1) == 4
+    assert [p.name for p in directory.iterdir()] == ["demo_layout.compacted.parquet"]
+
+    for m in measurements:
+        m2 = Measurement()
+        m2.read(m.path.stem, dirpath=tmp_path)
+        pd.testing.assert_frame_equal(m2.data, m.data)
+        assert m2.metadata == m.metadata
+
+    catalog = Catalog(tmp_path)
+    assert len(catalog.query_df(function="demo_layout")) == 2 + 3 + 4 + 5
+    catalog.path.unlink()
+    assert Catalog(tmp_path).rebuild() == 4
+    assert compact(tmp_path, days=1) == 0
+
+
+def test_ls_lists_sharded_files(tmp_path, monkeypatch, capsys):
+    import plab.config
+
+    m = demo_layout()
+    m.write(dirpath=tmp_path, layout="sharded")
+    monkeypatch.setattr(plab.config.PATH, "labdata", tmp_path)
+    plab.config.ls()
+    assert m.path.stem in capsys.readouterr().out.split()
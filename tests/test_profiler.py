@@ -0,0 +1,57 @@
+import time
+import pandas as pd
+from plab import profiler
+from plab.measurement import measurement
+from plab.profiler import profiled, to_prometheus
+
+
+class FakeInstrument:
+    @profiled
+    def _write(self, cmd):
+        time.sleep(0.002)
+
+    @profiled
+    def _read(self):
+        return "1.0"
+
+    @profiled
+    def _query(self, cmd):
+        self._write(cmd)
+        return self._read()
+
+
+@measurement
+def demo_profiled(n: int = 5) -> pd.DataFrame:
+    instrument = FakeInstrument()
+    values = []
+    for _ in range(n):
+        instrument._write("VOLT 1")
+        values.append(float(instrument._query("CURR?")))
+        profiler.sleep(0.001)
+    return pd.DataFrame(dict(i=values))
+
+
+def test_breakdown_in_metadata():
+    m = demo_profiled(n=5)
+    p = m.metadata.time.profile
+    commands = p.instruments.FakeInstrument
+    assert commands.VOLT["count"] == 5
+    assert commands["CURR?"]["count"] == 5
+    assert "_read" not in commands
+    assert p.instruments.sleep.settle["count"] == 5
+    assert p.io >= 10 * 0.002
+    assert p.python >= 0
+
+
+def test_prometheus_export():
+    m = demo_profiled(n=2)
+    text = to_prometheus(m.metadata.time.profile, labels=dict(measurement="demo"))
+    assert (
+        'plab_instrument_seconds_count{measurement="demo",instrument="FakeInstrument",command="VOLT"} 2'
+        in text
+    )
+    assert 'plab_measurement_seconds{measurement="demo",part="io"}' in text
+
+
+def test_nothing_recorded_outside_measurement():
+    FakeInstrument()._write("VOLT 1")
@@ -0,0 +1,56 @@
+import subprocess
+import sys
+import textwrap
+import numpy as np
+import pytest
+from plab.share import Share
+
+pa = pytest.importorskip("pyarrow")
+
+PUBLISHER = """
+import numpy as np
+import pandas as pd
+from plab.measurement import measurement
+from plab.share import Share
+
+
+@measurement
+def demo_share(n: int = 10):
+    return pd.DataFrame(dict(i=np.arange(n) / 2.0))
+
+
+share = Share({dirpath!r}, max_bytes={max_bytes})
+for n in {sizes!r}:
+    share.publish(demo_share(n=n))
+"""
+
+
+def _publish(dirpath, sizes, max_bytes=2**30):
+    code = PUBLISHER.format(dirpath=str(dirpath), sizes=sizes, max_bytes=max_bytes)
+    subprocess.run([sys.executable, "-c", textwrap.dedent(code)], check=True)
+
+
+def test_attach_from_another_process(tmp_path):
+    _publish(tmp_path, [100_000])
+    share = Share(tmp_path)
+    available = share.available()
+    assert list(available) == ["demo_share_n=100000"]
+    assert available["demo_share_n=100000"]["rows"] == 100_000
+
+    allocated = pa.total_allocated_bytes()
+    m = share.attach("demo_share_n=100000")
+    assert pa.total_allocated_bytes() == allocated
+    assert m.metadata.settings.n == 100_000
+    np.testing.assert_array_equal(m.data["i"], np.arange(100_000) / 2.0)
+
+    with pytest.raises(KeyError):
+        share.attach("missing")
+
+
+def test_oldest_are_removed_beyond_max_bytes(tmp_path):
+    _publish(tmp_path, [10_000, 20_000, 30_000], max_bytes=450_000)
+    share = Share(tmp_path)
+    assert list(share.available()) == ["demo_share_n=20000", "demo_share_n=30000"]
+    assert not share.path("demo_share_n=10000").exists()
+    share.clear()
+    assert share.available() == {}
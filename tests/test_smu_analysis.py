@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+import pytest
+from plab.collection import Collection
+from plab.measurement import Measurement, measurement
+from plab.smu.analysis import features, features_many
+
+
+def sweep():
+    v = np.linspace(0, 2, 41)
+    df = pd.DataFrame(
+        dict(
+            i_0=v / 1e3,
+            i_3=1e-12 * np.expm1(v / 0.04),
+            i_5=np.full_like(v, 1e-9),
+        ),
+        index=pd.Index(v, name="v"),
+    )
+    df.loc[1.0:, "i_3"] = np.nan  # stopped at compliance
+    return df
+
+
+def test_features():
+    f = features(sweep())
+    assert list(f.index) == [0, 3, 5]
+    assert f.loc[0, "resistance"] == pytest.approx(1e3)
+    assert f.loc[0, "rs"] == pytest.approx(1e3)
+    assert f.loc[0, "turn_on"] == pytest.approx(0.1)
+    assert f.loc[3, "vlast"] < 1.0
+    assert f.loc[3, "points"] == 20
+    assert 0.5 < f.loc[3, "turn_on"] < 0.8
+    assert f.loc[0, "leakage"] == pytest.approx(1e-4)
+    assert np.isnan(f.loc[5, "turn_on"])
+
+
+def test_features_many_channels():
+    v = np.linspace(0, 1, 11)
+    r = np.linspace(100, 1e4, 2000)
+    df = pd.DataFrame(v[:, None] / r, index=v, columns=[f"i_{c}" for c in range(2000)])
+    f = features_many({"a": df, "b": df})
+    assert f.index.names == ["name", "channel"]
+    assert f.loc["b", "resistance"].values == pytest.approx(r)
+
+
+@measurement
+def demo_resistors(vmax: float = 2.0) -> pd.DataFrame:
+    v = np.linspace(0, vmax, 5)
+    return pd.DataFrame(dict(v=v, i_0=v / 1e3, i_1=v / 2e3)).set_index("v")
+
+
+@pytest.mark.parametrize("backend", ["csv", "parquet"])
+def test_features_of_stored_measurements(backend, tmp_path):
+    if backend != "csv":
+        pytest.importorskip("pyarrow")
+    for vmax in (1.0, 2.0):
+        demo_resistors(vmax=vmax).write(
+            dirpath=tmp_path, backend=backend, timestamp=False
+        )
+    f = features_many(Collection.from_glob("*demo_resistors*", dirpath=tmp_path))
+    assert f["resistance"].values == pytest.approx([1e3, 2e3, 1e3, 2e3])
+    assert f["vlast"].values == pytest.approx([1.0, 1.0, 2.0, 2.0])
+
+    m = Measurement()
+    m.read("demo_resistors_vmax=2.0", dirpath=tmp_path)
+    assert features(m.data)["vlast"].values == pytest.approx([2.0, 2.0])
@@ -0,0 +1,97 @@
+import pytest
+from plab.smu.smu_qontrol import Sessions
+
+
+class FakeQontrol:
+    def __init__(self, serial_port_name, imax):
+        self.serial_port_name = serial_port_name
+        self.imax = imax
+        self.healthy = True
+        self.closed = False
+
+    def issue_command(self, command_id, **kwargs):
+        if not self.healthy:
+            raise OSError("write failed")
+        return [[command_id]]
+
+    def close(self):
+        self.closed = True
+
+
+def probe(q):
+    if not q.healthy:
+        raise ConnectionError("no answer")
+
+
+@pytest.fixture
+def sessions():
+    sessions = Sessions(connect=FakeQontrol, probe=probe, check_interval=0)
+    yield sessions
+    sessions.close()
+
+
+def test_sessions_are_reused_per_port(sessions):
+    q = sessions.get("/dev/ttyUSB0", imax=1)
+    assert sessions.get("/dev/ttyUSB0", imax=1) is q
+    assert sessions.get("/dev/ttyUSB1", imax=1) is not q
+    assert len(sessions) == 2
+
+
+def test_sessions_reconnect(sessions):
+    q = sessions.get("/dev/ttyUSB0", imax=1)
+    q.healthy = False
+    q2 = sessions.get("/dev/ttyUSB0", imax=1)
+    assert q2 is not q and q.closed
+
+    q3 = sessions.get("/dev/ttyUSB0", imax=2)
+    assert q3 is not q2 and q2.closed and q3.imax == 2
+
+
+def test_sessions_close(sessions):
+    q = sessions.get("/dev/ttyUSB0", imax=1)
+    sessions.close()
+    assert q.closed and "/dev/ttyUSB0" not in sessions
+
+
+def test_sessions_invalidated_on_io_errors():
+    sessions = Sessions(connect=FakeQontrol, probe=probe, check_interval=60)
+    q = sessions.get("/dev/ttyUSB0", imax=1)
+    assert q.issue_command("vfull") == [["vfull"]]
+    q.healthy = False
+    assert sessions.get("/dev/ttyUSB0", imax=1) is q
+
+    with pytest.raises(OSError):
+        q.issue_command("vfull")
+    q2 = sessions.get("/dev/ttyUSB0", imax=1)
+    assert q2 is not q and q.closed
+    sessions.close()
+
+
+def test_device_info_per_port(monkeypatch):
+    import plab.config
+    import qontrol
+    from plab.smu.smu_qontrol import connect_qontrol, qontrol_devices
+
+    class QXOutput:
+        firmware = "fake"
+        n_chs = 8
+
+        def __init__(self, serial_port_name, response_timeout, imax):
+            self.device_id = f"Q8iv-{serial_port_name}"
+
+        def issue_command(self, *args, **kwargs):
+            pass
+
+        def issue_binary_command(self, *args, **kwargs):
+            pass
+
+    monkeypatch.setattr(qontrol, "QXOutput", QXOutput)
+    monkeypatch.setitem(plab.config.CONFIG, "qontrol", {})
+    connect_qontrol("COM3")
+    connect_qontrol("COM4")
+    assert plab.config.CONFIG.qontrol.COM3.device_id == "Q8iv-COM3"
+    assert plab.config.CONFIG.qontrol.COM4.device_id == "Q8iv-COM4"
+    assert set(qontrol_devices(plab.config.CONFIG)) == {"COM3", "COM4"}
+
+    old = dict(qontrol=dict(device_id="Q8iv-0001", n_chs=8, serial_port_name="COM1"))
+    assert qontrol_devices(old)["COM1"]["device_id"] == "Q8iv-0001"
@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+import pytest
+from plab.measurement import measurement
+from plab.smu import render
+from plab.smu.render import IVRenderer, downsample, render_many
+
+
+def sweep(n_v=101, n_ch=12):
+    v = np.linspace(0, 2, n_v)
+    r = np.linspace(100, 1e3, n_ch)
+    columns = [f"i_{c}" for c in range(n_ch)]
+    return pd.DataFrame(v[:, None] / r, index=pd.Index(v, name="v"), columns=columns)
+
+
+def test_downsample_keeps_the_envelope():
+    x = np.arange(10000.0)
+    y = np.zeros((10000, 2))
+    y[1234, 0] = 5.0
+    y[:5000, 1] = np.nan
+    xs, ys = downsample(x, y, 200)
+    assert len(xs) == len(ys) == 200
+    assert np.nanmax(ys[:, 0]) == 5.0
+    assert np.isnan(ys[:100, 1]).all() and (ys[100:, 1] == 0).all()
+
+
+@pytest.mark.parametrize("layout", ["overlay", "grid"])
+@pytest.mark.parametrize("suffix", [".png", ".svg"])
+def test_render(tmp_path, layout, suffix):
+    renderer = IVRenderer(layout=layout, ncols=4)
+    path = tmp_path / f"iv{suffix}"
+    figure = renderer.render(sweep(), path)
+    assert path.stat().st_size > 0
+    assert renderer.render(sweep() * 2, path) is figure
+    if layout == "grid":
+        assert len(figure.axes) == 12
+
+
+@measurement
+def demo_sweep(n_ch: int = 12) -> pd.DataFrame:
+    return sweep(n_ch=n_ch)
+
+
+def test_render_many(tmp_path):
+    paths = []
+    for n_ch in range(1, 4):
+        m = demo_sweep(n_ch=n_ch)
+        m.write(dirpath=tmp_path, timestamp=False)
+        paths.append(m.path)
+    targets = render_many(paths, tmp_path / "plots", max_workers=2)
+    assert [t.stem for t in targets] == [p.stem for p in paths]
+    assert all(t.stat().st_size > 0 for t in targets)
+
+
+@pytest.mark.parametrize("layout", ["overlay", "grid"])
+def test_render_file_plots_stored_voltages(tmp_path, layout):
+    m = demo_sweep(n_ch=3)
+    m.write(dirpath=tmp_path, backend="csv", timestamp=False)
+    render._render_file(m.path, tmp_path / "iv.png", dict(layout=layout))
+    renderer = render._RENDERERS[(("layout", layout),)]
+    if layout == "overlay":
+        (collection,) = renderer._artists
+        x = collection.get_segments()[2][:, 0]
+    else:
+        x = renderer._artists[2].get_xdata()
+    np.testing.assert_allclose(x, np.linspace(0, 2, 101))
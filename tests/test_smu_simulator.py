@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+from plab.smu.benchmark import benchmark
+from plab.smu.simulator import Heater, SimulatedSMU
+from plab.smu.sweep_voltage import sweep_voltage
+
+
+def test_device_models():
+    smu = SimulatedSMU(
+        devices=["resistor", "diode", "open", "short"], latency=1e-3, imax=10e-3
+    )
+    smu.v[:] = 1.0
+    assert smu.transactions == 4
+    assert smu.i[0] == pytest.approx(1e-3)
+    assert 0 < smu.i[1] <= 10e-3
+    assert abs(smu.i[2]) < 1e-6
+    assert smu.i[3] == pytest.approx(10e-3)
+    assert smu.time == pytest.approx(8e-3)
+
+    smu.set_all_values("V", 0.3)
+    assert smu.get_all_values("I")[1] < 1e-6
+
+
+def test_heater_lags():
+    smu = SimulatedSMU(devices=[Heater(tau=10e-3)], latency=1e-3)
+    smu.v[0] = 5.0
+    currents = [smu.i[0] for _ in range(50)]
+    assert currents[0] == pytest.approx(5e-3)
+    assert np.all(np.diff(currents) <= 0)
+    assert currents[-1] < 0.97 * currents[0]
+
+
+def test_sweep_on_simulator():
+    smu = SimulatedSMU(devices=["diode", "open", "short"], imax=20e-3)
+    m = sweep_voltage(
+        vmax=2.0,
+        vsteps=11,
+        channels=3,
+        get_instrument=lambda: smu,
+        compliance=20e-3,
+        open_points=4,
+    )
+    assert dict(m.metadata.attrs.stop) == dict(
+        i_0="compliance", i_1="open", i_2="compliance"
+    )
+
+
+def test_benchmark():
+    df = benchmark(n_chs=4, vsteps=5, latency=1e-3, max_points=10)
+    assert list(df.index) == ["sequential", "parallel", "adaptive"]
+    assert df.loc["parallel", "points_per_s"] > df.loc["sequential", "points_per_s"]
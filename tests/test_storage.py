@@ -0,0 +1,139 @@
+import pytest
+import numpy as np
+import pandas as pd
+import plab.config
+from plab.measurement import Measurement, measurement, read_metadata
+from plab.layout import glob_all, shard
+from plab.storage import read_headers
+
+
+@measurement
+def demo_iv(vmin: float = 0.0, vmax: float = 1.0, vsteps: int = 101) -> pd.DataFrame:
+    voltages = np.linspace(vmin, vmax, vsteps)
+    df = pd.DataFrame(dict(v=voltages, i=np.exp(voltages) / 3))
+    df.set_index("v", inplace=True)
+    return df
+
+
+@pytest.mark.parametrize("backend", ["parquet", "feather", "hdf5"])
+def test_binary_roundtrip_is_lossless(backend, tmp_path):
+    pytest.importorskip("tables" if backend == "hdf5" else "pyarrow")
+    m = demo_iv(vmax=2.0)
+    m.write(dirpath=tmp_path, backend=backend, timestamp=False)
+    assert not m.path.with_suffix(".yml").exists()
+
+    m2 = Measurement()
+    m2.read(m.metadata.name, dirpath=tmp_path)
+    pd.testing.assert_frame_equal(m.data, m2.data, check_exact=True)
+    assert m2.metadata == m.metadata
+
+
+def test_csv_is_default(tmp_path):
+    m = demo_iv()
+    m.write(dirpath=tmp_path, timestamp=False)
+    assert m.path.suffix == ".csv"
+    assert m.path.with_suffix(".yml").exists()
+
+    m2 = Measurement()
+    m2.read(m.metadata.name, dirpath=tmp_path)
+    assert m2.metadata.name == m.metadata.name
+
+
+@measurement
+def demo_stream(vsteps: int = 250, fail_at: int = -1):
+    for j, voltage in enumerate(np.linspace(0, 1, vsteps)):
+        if j == fail_at:
+            raise RuntimeError("instrument lost")
+        yield dict(v=voltage, i=voltage / 2)
+
+
+@pytest.mark.parametrize("backend", ["arrows", "csv"])
+def test_stream_writes_chunks_as_they_arrive(backend, tmp_path, monkeypatch):
+    if backend == "arrows":
+        pytest.importorskip("pyarrow")
+    monkeypatch.setattr("plab.measurement.PATH.labdata", tmp_path)
+    monkeypatch.setitem(plab.config.CONFIG, "stream_storage", backend)
+    monkeypatch.setitem(plab.config.CONFIG, "layout", "sharded")
+    m = demo_stream()
+    assert m.path.parent == tmp_path / shard(m.metadata)
+    assert m.metadata.rows == 250
+    assert len(m.data) == 250
+    np.testing.assert_allclose(m.data["i"], np.linspace(0, 1, 250) / 2)
+
+    with pytest.raises(RuntimeError):
+        demo_stream(fail_at=120)
+    path = next(glob_all(tmp_path, f"*demo_stream_fail_at=120{m.path.suffix}"))
+    m2 = Measurement()
+    m2.read(path.stem, dirpath=tmp_path)
+    assert len(m2.data) == 120
+
+
+@measurement
+def demo_stream_int_then_float(n: int = 250):
+    for j in range(n):
+        yield dict(j=j, i=j if j < 100 else j / 2)
+
+
+@pytest.mark.parametrize("backend", ["arrows", "csv"])
+def test_stream_promotes_int_columns(backend, tmp_path, monkeypatch):
+    if backend == "arrows":
+        pytest.importorskip("pyarrow")
+    monkeypatch.setattr("plab.measurement.PATH.labdata", tmp_path)
+    monkeypatch.setitem(plab.config.CONFIG, "stream_storage", backend)
+    m = demo_stream_int_then_float()
+    assert m.metadata.rows == 250
+    assert m.data["i"].iloc[101] == 50.5
+    assert m.data["i"].iloc[99] == 99
+
+
+@pytest.mark.parametrize("backend", ["feather", "parquet", "arrows"])
+def test_lazy_read(backend, tmp_path):
+    pytest.importorskip("pyarrow")
+    m = demo_iv(vsteps=1001)
+    m.write(dirpath=tmp_path, backend=backend, timestamp=False)
+
+    m2 = Measurement()
+    m2.read(m.metadata.name, dirpath=tmp_path, lazy=True)
+    assert len(m2.data) == 1001
+    assert m2.data.columns == ["i"]
+    pd.testing.assert_series_equal(m2.data["i"], m.data["i"])
+    pd.testing.assert_frame_equal(m2.data[500:510], m.data[500:510])
+    pd.testing.assert_frame_equal(m2.data[::100], m.data[::100])
+    for key in [slice(None, None, -1), slice(900, 100, -7), slice(5, 5)]:
+        pd.testing.assert_frame_equal(m2.data[key], m.data[key])
+
+    m3 = read_metadata(m.metadata.name, dirpath=tmp_path)
+    assert m3.metadata.settings.vsteps == 1001
+    assert vars(m3)["_data"] is None
+
+
+@pytest.mark.parametrize("fmt", ["json", "yaml", "msgpack"])
+@pytest.mark.parametrize("backend", ["csv", "parquet"])
+def test_metadata_formats_are_detected(fmt, backend, tmp_path, monkeypatch):
+    if fmt == "msgpack":
+        pytest.importorskip("msgpack")
+    if backend == "parquet":
+        pytest.importorskip("pyarrow")
+    m = demo_iv(vmax=3.0)
+    monkeypatch.setitem(plab.config.CONFIG, "metadata_format", fmt)
+    m.write(dirpath=tmp_path, backend=backend, timestamp=False)
+    monkeypatch.setitem(plab.config.CONFIG, "metadata_format", "yaml")
+
+    m2 = Measurement()
+    m2.read(m.metadata.name, dirpath=tmp_path)
+    assert m2.metadata == m.metadata
+
+
+def test_read_headers(tmp_path):
+    paths = []
+    for vmax in range(5):
+        m = demo_iv(vmax=float(vmax))
+        m.write(dirpath=tmp_path, timestamp=False)
+        paths.append(m.path)
+    (tmp_path / "broken.csv").write_text("v,i\n")
+
+    headers = read_headers(paths + [tmp_path / "broken.csv"], max_workers=4)
+    assert [h["settings"]["vmax"] for h in headers] == [0.0, 1.0, 2.0, 3.0, 4.0]
+    assert headers[0]["path"] == paths[0]
+    assert headers[0]["config_hash"]
+    assert "config" not in headers[0]
@@ -0,0 +1,211 @@
+import numpy as np
+import pandas as pd
+import pytest
+from plab.smu.sweep_voltage import sweep_voltage
+
+
+class Channels:
+    def __init__(self, smu, values):
+        self.smu = smu
+        self.values = values
+
+    def __len__(self):
+        return len(self.values)
+
+    def __getitem__(self, channel):
+        self.smu.transactions += 1
+        return self.smu.current(channel)
+
+    def __setitem__(self, channel, value):
+        self.smu.transactions += 1
+        self.values[channel] = value
+
+
+class FakeSMU:
+    """Resistors with a different resistance per channel."""
+
+    def __init__(self, n_chs=8):
+        self.n_chs = n_chs
+        self.resistance = 100.0 * (1 + np.arange(n_chs))
+        self.voltages = np.zeros(n_chs)
+        self.v = Channels(self, self.voltages)
+        self.i = Channels(self, None)
+        self.transactions = 0
+        self.max_on = 0
+
+    def current(self, channel):
+        return self.voltages[channel] / self.resistance[channel]
+
+    def set_all_values(self, para, values):
+        self.transactions += 1
+        self.voltages[:] = values
+        self.max_on = max(self.max_on, int(np.count_nonzero(self.voltages)))
+
+    def get_all_values(self, para):
+        """Unsigned, like the qontrol all-channel readback."""
+        self.transactions += 1
+        return list(np.abs(self.voltages / self.resistance))
+
+
+@pytest.mark.parametrize("group_size", [None, 3])
+def test_parallel_sweep_matches_sequential(group_size):
+    smu = FakeSMU()
+    sequential = sweep_voltage(
+        vmin=-1.0, vmax=1.0, vsteps=5, channels=8, get_instrument=lambda: smu
+    )
+    assert (sequential.data.values[0] < 0).all()
+    n_sequential = smu.transactions
+
+    smu = FakeSMU()
+    parallel = sweep_voltage(
+        vmin=-1.0,
+        vmax=1.0,
+        vsteps=5,
+        channels=8,
+        get_instrument=lambda: smu,
+        mode="parallel",
+        group_size=group_size,
+    )
+    pd.testing.assert_frame_equal(parallel.data, sequential.data)
+    assert smu.transactions < n_sequential
+    assert smu.max_on == (group_size or 8)
+    assert not smu.voltages.any()
+
+
+def test_unknown_mode():
+    with pytest.raises(ValueError):
+        sweep_voltage(channels=1, get_instrument=FakeSMU, mode="diagonal")
+
+
+class DiodeSMU(FakeSMU):
+    def current(self, channel):
+        return 1e-12 * (np.exp(self.voltages[channel] / 0.04) - 1)
+
+
+def test_adaptive_sweep_refines_the_knee():
+    smu = DiodeSMU(n_chs=2)
+    m = sweep_voltage(
+        vmax=1.0,
+        vsteps=5,
+        channels=[0, 1],
+        get_instrument=lambda: smu,
+        mode="adaptive",
+        max_points=30,
+    )
+    v = m.data["i_0"].dropna().index.values
+    assert len(v) == 30
+    assert np.sum(v > 0.75) > np.sum(v < 0.5)
+    assert list(m.data.columns) == ["i_0", "i_1"]
+    assert not smu.voltages.any()
+
+
+def test_adaptive_sweep_imax():
+    smu = DiodeSMU(n_chs=1)
+    m = sweep_voltage(
+        vmax=1.0,
+        vsteps=11,
+        channels=1,
+        get_instrument=lambda: smu,
+        mode="adaptive",
+        max_points=20,
+        imax=1e-3,
+    )
+    i = m.data["i_0"]
+    assert (i.iloc[:-1].abs() < 1e-3).all()
+    assert i.index.max() < 1.0
+
+
+class FaultySMU(FakeSMU):
+    """Channel 0 open, channel 1 shorted (clamped at the compliance)."""
+
+    compliance = 5e-3
+
+    def current(self, channel):
+        return self.get_all_values("I")[channel]
+
+    def get_all_values(self, para):
+        self.transactions += 1
+        currents = self.voltages / self.resistance
+        currents[0] = 0.0
+        currents[1] = np.sign(self.voltages[1]) * self.compliance
+        return list(np.abs(np.clip(currents, -self.compliance, self.compliance)))
+
+
+@pytest.mark.parametrize("mode", ["sequential", "parallel"])
+def test_stop_criteria(mode):
+    smu = FaultySMU(n_chs=4)
+    m = sweep_voltage(
+        vmax=1.0,
+        vsteps=11,
+        channels=4,
+        get_instrument=lambda: smu,
+        mode=mode,
+        compliance=smu.compliance,
+        open_points=3,
+    )
+    assert dict(m.metadata.attrs.stop) == dict(i_0="open", i_1="compliance")
+    assert m.data["i_0"].notna().sum() == 3
+    assert m.data["i_1"].notna().sum() == 2
+    assert m.data["i_2"].notna().all()
+    assert not smu.voltages.any()
+
+
+def test_compliance_defaults_to_instrument_imax():
+    smu = FaultySMU(n_chs=4)
+    smu.imax = [smu.compliance] * 4
+    m = sweep_voltage(vmax=1.0, vsteps=11, channels=4, get_instrument=lambda: smu)
+    assert dict(m.metadata.attrs.stop) == dict(i_1="compliance")
+
+
+@pytest.mark.parametrize("mode", ["sequential", "adaptive"])
+def test_sweep_current(mode):
+    from plab.smu.sweep_current import sweep_current
+
+    class CurrentSMU(FakeSMU):
+        """Sources current, reads back the resistor voltages."""
+
+        def __init__(self, n_chs):
+            super().__init__(n_chs)
+            self.i = Channels(self, self.voltages)
+            self.v = Voltages(self)
+
+    class Voltages:
+        def __init__(self, smu):
+            self.smu = smu
+
+        def __getitem__(self, channel):
+            return self.smu.voltages[channel] * self.smu.resistance[channel]
+
+    smu = CurrentSMU(n_chs=2)
+    m = sweep_current(imax=1e-2, steps=5, n=2, get_instrument=lambda: smu, mode=mode)
+    data = m.data.dropna()
+    assert list(m.data.columns) == ["v_0", "v_1"]
+    assert data["v_1"].values == pytest.approx(200 * data.index.values)
+    assert not smu.voltages.any()
+
+
+def test_sharded_sweep_merges_global_channels():
+    from plab.smu.sweep_voltage import shard_channels, sweep_voltage_sharded
+
+    assert shard_channels([0, 5, 3, 9], [4, 8]) == [{0: 0, 3: 3}, {1: 5, 5: 9}]
+    with pytest.raises(ValueError):
+        shard_channels([12], [4, 8])
+
+    smus = {port: FakeSMU(n_chs=4) for port in ["a", "b"]}
+    m = sweep_voltage_sharded(
+        vmax=1.0,
+        vsteps=5,
+        channels=[6, 1, 5],
+        ports=["a", "b"],
+        get_instrument=lambda serial_port_name: smus[serial_port_name],
+        mode="parallel",
+    )
+    assert list(m.data.columns) == ["i_6", "i_1", "i_5"]
+    v = m.data.index.values
+    assert m.data["i_1"].values == pytest.approx(v / 200)
+    assert m.data["i_5"].values == pytest.approx(v / 200)
+    assert m.data["i_6"].values == pytest.approx(v / 300)
+    assert smus["a"].max_on == 1 and smus["b"].max_on == 2
+
+    with pytest.raises(ValueError, match="No channels"):
+        sweep_voltage_sharded(channels=[], ports=["a", "b"], get_instrument=smus.get)
@@ -0,0 +1,90 @@
+import threading
+import time
+import numpy as np
+import pandas as pd
+import pytest
+from plab.measurement import Measurement, measurement
+from plab.writer import WriterPool
+
+
+@measurement
+def demo_write(vsteps: int = 10) -> pd.DataFrame:
+    return pd.DataFrame(dict(v=np.linspace(0, 1, vsteps)))
+
+
+class SlowMeasurement:
+    def __init__(self, release: threading.Event) -> None:
+        self.release = release
+        self.written = False
+
+    def write(self, **kwargs) -> None:
+        self.release.wait(5)
+        self.written = True
+
+
+class FailingMeasurement:
+    def write(self, **kwargs) -> None:
+        raise OSError("disk full")
+
+
+def test_write_async(tmp_path):
+    pool = WriterPool(max_workers=2)
+    measurements = [demo_write(vsteps=n) for n in range(2, 6)]
+    futures = [pool.submit(m, dirpath=tmp_path, fsync=True) for m in measurements]
+    pool.flush()
+    assert all(f.done() for f in futures)
+    for m in measurements:
+        m2 = Measurement()
+        m2.read(m.path.stem, dirpath=tmp_path)
+        assert len(m2.data) == len(m.data)
+    pool.close()
+
+
+def test_backpressure():
+    release = threading.Event()
+    pool = WriterPool(max_workers=1, max_queued=2)
+    pool.submit(SlowMeasurement(release))
+    pool.submit(SlowMeasurement(release))
+    t0 = time.time()
+    with pytest.raises(TimeoutError):
+        pool.submit(SlowMeasurement(release), timeout=0.1)
+    assert time.time() - t0 >= 0.1
+    release.set()
+    pool.flush()
+    assert pool.pending == 0
+    pool.close()
+
+
+def test_errors_raise_on_next_call():
+    pool = WriterPool()
+    pool.submit(FailingMeasurement())
+    with pytest.raises(OSError, match="disk full"):
+        pool.flush()
+    pool.flush()
+
+    pool.submit(FailingMeasurement())
+    while pool.pending:
+        time.sleep(0.001)
+    with pytest.raises(OSError):
+        pool.submit(FailingMeasurement())
+    pool.close()
+
+
+def test_flush_raises_before_done_callbacks():
+    class SlowCallbacks(WriterPool):
+        def _done(self, future):
+            time.sleep(0.2)
+            super()._done(future)
+
+    class SlowFailingMeasurement:
+        def write(self, **kwargs):
+            time.sleep(0.05)
+            raise OSError("disk full")
+
+    pool = SlowCallbacks()
+    pool.submit(SlowFailingMeasurement())
+    with pytest.raises(OSError, match="disk full"):
+        pool.flush()
+    time.sleep(0.3)
+    pool.flush()
+    pool.close()